@@ -0,0 +1,361 @@
+"""Admission control and scheduling for the LLM and fetch stages.
+
+Work is admitted through a ``Scheduler``: a concurrency limit with a
+short, bounded wait queue per lane. Lanes are priority classes, listed in
+``LANES`` from highest to lowest:
+
+* ``interactive`` - a person waiting on ``/analyze`` (the default).
+* ``api`` - programmatic clients that ask for it with ``X-Priority: api``.
+* ``batch`` - bulk and re-analysis work.
+* ``prefetch`` - feed ingestion ahead of any request.
+
+A freed slot always goes to the highest-priority lane that has waiters,
+is under its concurrency cap (``lane_caps``, e.g. ``prefetch=1``) and has
+token budget left (``lane_tokens``, in tokens per minute). Within a lane,
+tenants (clients, or feed domains for prefetching) share the capacity by
+start-time fair queueing. Each request is tagged on arrival with
+``max(lane clock, the tenant's last finish tag)``. Its finish tag is that
+plus ``cost / weight``, where cost is estimated tokens. Requests are served
+in start-tag order. One tenant's 100-URL batch therefore takes turns with
+other tenants' requests instead of going first.
+
+The LLM stage uses an ``AdaptiveLimiter`` per backend. It is a
+``Scheduler`` whose limit is adjusted by AIMD:
+- A call that completes within ``latency_target`` while the limit was in
+  use raises the limit by ``1/limit``.
+- An error, or a call slower than the target, multiplies the limit by
+  ``backoff``. This happens at most once per observed latency, so one
+  brownout is not counted once per request in flight.
+
+A full lane queue, or a wait longer than ``max_wait``, raises
+``Overloaded``. ``/analyze`` answers that with ``503`` and ``Retry-After``,
+or with a degraded backend if one is configured for the ``overflow`` lane.
+Slow LLM calls can therefore hold at most ``max_limit`` threads of a
+worker. The remaining gunicorn threads (see ``gunicorn.conf.py``) keep
+serving ``/``, ``/about`` and ``/health`` during a brownout.
+
+Limits are per worker process. The totals are these limits times the
+number of workers.
+"""
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+LANES = ('interactive', 'api', 'batch', 'prefetch')
+DEFAULT_LANE_CAPS = {'batch': 2, 'prefetch': 1}
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_FETCH_CONCURRENCY = 4
+DEFAULT_MAX_QUEUE = 8
+DEFAULT_MAX_WAIT = 10
+DEFAULT_LATENCY_TARGET = 30
+BACKOFF = 0.75
+# Weight of the newest sample in the latency average
+LATENCY_SMOOTHING = 0.2
+MAX_RETRY_AFTER = 120
+# Queue times kept per lane for the percentiles
+QUEUE_SAMPLES = 1000
+# Longest sleep between checks of a lane waiting for its token budget to refill
+BUDGET_POLL = 0.5
+# Rough size of an analysis reply, added to the prompt's tokens when estimating cost
+COMPLETION_TOKENS_ESTIMATE = 1000
+
+
+class Overloaded(Exception):
+    """No capacity within the wait budget; retry after ``retry_after`` seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def estimate_tokens(prompt):
+    """Tokens an analysis of ``prompt`` is expected to use (Greek runs about 3 characters per token)"""
+    return len(prompt) // 3 + COMPLETION_TOKENS_ESTIMATE
+
+
+def parse_mapping(spec, convert=int):
+    """``'batch=2,prefetch=1'`` -> ``{'batch': 2, 'prefetch': 1}``"""
+    mapping = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        if not value.strip():
+            raise ValueError(f"Invalid mapping entry: {item!r}")
+        mapping[name.strip()] = convert(value.strip())
+    return mapping
+
+
+class Ticket:
+    """One request's place in a scheduler queue, then its slot"""
+
+    __slots__ = ('lane', 'tenant', 'cost', 'start', 'order', 'enqueued', 'granted', 'tokens')
+
+    def __init__(self, lane, tenant, cost, start, order):
+        self.lane = lane
+        self.tenant = tenant
+        self.cost = cost
+        self.start = start
+        self.order = order
+        self.enqueued = time.monotonic()
+        self.granted = False
+        # Set by the caller to the tokens actually used, to settle the lane's budget
+        self.tokens = None
+
+
+class LaneState:
+    def __init__(self, cap, tokens_per_minute):
+        self.cap = cap
+        self.tokens_per_minute = tokens_per_minute
+        self.budget = float(tokens_per_minute) if tokens_per_minute else None
+        self.refilled = time.monotonic()
+        self.queue = []
+        self.clock = 0.0
+        self.finish = {}
+        self.inflight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.tokens = 0
+        self.waits = deque(maxlen=QUEUE_SAMPLES)
+
+    def refill(self, now):
+        if self.budget is not None:
+            self.budget = min(self.tokens_per_minute,
+                              self.budget + (now - self.refilled) * self.tokens_per_minute / 60)
+            self.refilled = now
+
+    def eligible(self):
+        return (self.queue and (self.cap is None or self.inflight < self.cap)
+                and (self.budget is None or self.budget > 0))
+
+
+class Scheduler:
+    """Concurrency limit whose waiters are admitted by lane priority, then fair share across tenants"""
+
+    def __init__(self, max_limit=DEFAULT_MAX_CONCURRENCY, max_queue=DEFAULT_MAX_QUEUE, max_wait=DEFAULT_MAX_WAIT,
+                 lane_caps=None, lane_tokens=None, tenant_weights=None, min_limit=1, latency_target=None):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.latency_target = latency_target
+        self.tenant_weights = dict(tenant_weights or {})
+        caps = DEFAULT_LANE_CAPS if lane_caps is None else lane_caps
+        self.lanes = {lane: LaneState(caps.get(lane), (lane_tokens or {}).get(lane)) for lane in LANES}
+        self.limit = float(max_limit)
+        self.inflight = 0
+        self.latency = None
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+
+    def _capacity(self):
+        return max(self.min_limit, int(self.limit))
+
+    def retry_after(self, lane='interactive'):
+        """Seconds until a retry in ``lane`` is likely to be admitted"""
+        latency = self.latency or self.latency_target or 1
+        ahead = sum(len(state.queue) for name, state in self.lanes.items()
+                    if LANES.index(name) <= LANES.index(lane))
+        seconds = math.ceil((ahead + 1) * latency / self._capacity())
+        return min(max(seconds, 1), MAX_RETRY_AFTER)
+
+    def _dispatch(self):
+        """Grant free slots to the waiters that are next by priority and fair share"""
+        now = time.monotonic()
+        granted = False
+        while self.inflight < self._capacity():
+            state = None
+            for candidate in self.lanes.values():
+                candidate.refill(now)
+                if candidate.eligible():
+                    state = candidate
+                    break
+            if state is None:
+                break
+            ticket = min(state.queue, key=lambda queued: (queued.start, queued.order))
+            state.queue.remove(ticket)
+            state.clock = ticket.start
+            if not state.queue:
+                # The lane's busy period is over; tags restart from its clock
+                state.finish.clear()
+            if state.budget is not None:
+                state.budget -= ticket.cost
+            ticket.granted = True
+            state.inflight += 1
+            state.admitted += 1
+            state.waits.append(now - ticket.enqueued)
+            self.inflight += 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def acquire(self, lane='interactive', tenant='', cost=1):
+        """Wait for a slot and return its ``Ticket``; raises ``Overloaded`` if none frees in time"""
+        if lane not in self.lanes:
+            raise ValueError(f"Unknown lane {lane!r}")
+        with self._cond:
+            state = self.lanes[lane]
+            start = max(state.clock, state.finish.get(tenant, 0.0))
+            ticket = Ticket(lane, tenant, cost, start, next(self._order))
+            state.queue.append(ticket)
+            self._dispatch()
+            if not ticket.granted and len(state.queue) > self.max_queue:
+                state.queue.remove(ticket)
+                state.rejected += 1
+                raise Overloaded(self.retry_after(lane))
+            share = max(cost, 1) / self.tenant_weights.get(tenant, 1)
+            state.finish[tenant] = start + share
+            deadline = time.monotonic() + self.max_wait
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._withdraw(state, ticket, share)
+                    raise Overloaded(self.retry_after(lane))
+                self._cond.wait(min(remaining, BUDGET_POLL))
+                self._dispatch()
+            return ticket
+
+    def _withdraw(self, state, ticket, share):
+        """Take a timed-out ticket out of its queue as if it had never arrived"""
+        state.queue.remove(ticket)
+        state.rejected += 1
+        # Its share no longer pushes back the tenant's later requests
+        for queued in state.queue:
+            if queued.tenant == ticket.tenant and queued.order > ticket.order:
+                queued.start = max(state.clock, queued.start - share)
+        if ticket.tenant in state.finish:
+            finish = state.finish[ticket.tenant] - share
+            if finish > state.clock:
+                state.finish[ticket.tenant] = finish
+            else:
+                del state.finish[ticket.tenant]
+
+    def release(self, ticket, latency, ok=True):
+        now = time.monotonic()
+        with self._cond:
+            saturated = self.inflight >= self._capacity()
+            state = self.lanes[ticket.lane]
+            state.inflight -= 1
+            self.inflight -= 1
+            used = ticket.cost if ticket.tokens is None else ticket.tokens
+            state.tokens += used
+            if state.budget is not None:
+                state.budget -= used - ticket.cost
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+            self._adjust(latency, ok, saturated, now)
+            self._dispatch()
+
+    def _adjust(self, latency, ok, saturated, now):
+        """Hook for adaptive limits; the base scheduler's limit is fixed"""
+
+    @contextmanager
+    def slot(self, lane='interactive', tenant='', cost=1):
+        """Hold one unit of concurrency for the duration of the block; yields the ``Ticket``"""
+        ticket = self.acquire(lane, tenant, cost)
+        started = time.monotonic()
+        try:
+            yield ticket
+        except BaseException:
+            self.release(ticket, time.monotonic() - started, ok=False)
+            raise
+        self.release(ticket, time.monotonic() - started)
+
+    def stats(self):
+        with self._cond:
+            lanes = {}
+            for name, state in self.lanes.items():
+                waits = sorted(state.waits)
+                lanes[name] = {
+                    'inflight': state.inflight,
+                    'waiting': len(state.queue),
+                    'admitted': state.admitted,
+                    'rejected': state.rejected,
+                    'cap': state.cap,
+                    'tokens': state.tokens,
+                    'budget_remaining': round(state.budget) if state.budget is not None else None,
+                    'queue_p50': round(waits[len(waits) // 2], 3) if waits else None,
+                    'queue_p95': round(waits[min(int(len(waits) * 0.95), len(waits) - 1)], 3) if waits else None,
+                }
+            return {
+                'limit': round(self.limit, 2),
+                'inflight': self.inflight,
+                'waiting': sum(lane['waiting'] for lane in lanes.values()),
+                'latency': round(self.latency, 3) if self.latency is not None else None,
+                'admitted': sum(lane['admitted'] for lane in lanes.values()),
+                'rejected': sum(lane['rejected'] for lane in lanes.values()),
+                'lanes': lanes
+            }
+
+
+class AdaptiveLimiter(Scheduler):
+    """Scheduler whose limit follows the backend's latency by AIMD"""
+
+    def __init__(self, max_limit=DEFAULT_MAX_CONCURRENCY, latency_target=DEFAULT_LATENCY_TARGET, backoff=BACKOFF,
+                 **settings):
+        super().__init__(max_limit, latency_target=latency_target, **settings)
+        self.backoff = backoff
+        self._last_decrease = 0.0
+
+    def _adjust(self, latency, ok, saturated, now):
+        if not ok or latency > self.latency_target:
+            # Calls already in flight during a slowdown report it too; react once
+            if now - self._last_decrease > latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif saturated:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+class AdmissionControl:
+    """An ``AdaptiveLimiter`` per LLM backend (created on first use) and one fetch ``Scheduler``"""
+
+    def __init__(self, fetch_limit=DEFAULT_FETCH_CONCURRENCY, **settings):
+        self.settings = settings
+        # Fetches share the lanes and queue limits but not the LLM token budgets
+        self.fetch = Scheduler(fetch_limit, **{key: value for key, value in settings.items()
+                                               if key in ('max_queue', 'max_wait', 'lane_caps', 'tenant_weights')})
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        max_limit = int(os.getenv('ADMISSION_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+        if max_limit <= 0:
+            return None
+        caps = dict(DEFAULT_LANE_CAPS, **parse_mapping(os.getenv('SCHEDULER_LANE_CAPS', '')))
+        return cls(
+            fetch_limit=int(os.getenv('FETCH_MAX_CONCURRENCY', DEFAULT_FETCH_CONCURRENCY)),
+            max_limit=max_limit,
+            max_queue=int(os.getenv('ADMISSION_MAX_QUEUE', DEFAULT_MAX_QUEUE)),
+            max_wait=float(os.getenv('ADMISSION_MAX_WAIT', DEFAULT_MAX_WAIT)),
+            latency_target=float(os.getenv('ADMISSION_LATENCY_TARGET', DEFAULT_LATENCY_TARGET)),
+            lane_caps={lane: cap or None for lane, cap in caps.items()},
+            lane_tokens=parse_mapping(os.getenv('SCHEDULER_LANE_TOKENS', '')),
+            tenant_weights=parse_mapping(os.getenv('SCHEDULER_TENANT_WEIGHTS', ''), float)
+        )
+
+    def limiter(self, name):
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                limiter = self._limiters[name] = AdaptiveLimiter(**self.settings)
+            return limiter
+
+    def slot(self, name, lane='interactive', tenant='', cost=1):
+        return self.limiter(name).slot(lane, tenant, cost)
+
+    def fetch_slot(self, lane='interactive', tenant=''):
+        return self.fetch.slot(lane, tenant)
+
+    def stats(self):
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            'llm': {name: limiter.stats() for name, limiter in sorted(limiters.items())},
+            'fetch': self.fetch.stats()
+        }
@@ -0,0 +1,164 @@
+"""Append-only analytics store of every completed analysis.
+
+Rows are queued by the request thread and written in batches by a background
+thread (see ``background.BatchWriter``), so the request path never waits on
+disk. Each batch also updates hourly and daily rollup tables keyed by
+(period, domain, topic) holding counts and sums; aggregate queries read only
+the rollups, so "average score for outlet X this week" touches a few hundred
+rows no matter how many analyses have been stored.
+"""
+import logging
+import os
+import time
+
+from background import BatchWriter, SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = {'hour': 3600, 'day': 86400, 'week': 7 * 86400}
+
+ROLLUP_TABLES = {'rollup_hourly': 3600, 'rollup_daily': 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    url TEXT,
+    domain TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    score INTEGER,
+    model TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    latency REAL,
+    cache_key TEXT
+);
+CREATE INDEX IF NOT EXISTS analyses_domain_ts ON analyses (domain, ts);
+""" + "".join(f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    period INTEGER NOT NULL,
+    domain TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    scored INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    score_sq REAL NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    latency_sum REAL NOT NULL,
+    PRIMARY KEY (period, domain, topic)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS {table}_domain ON {table} (domain, period);
+""" for table in ROLLUP_TABLES)
+
+ROLLUP_UPSERT = """
+INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (period, domain, topic) DO UPDATE SET
+    n = n + excluded.n,
+    scored = scored + excluded.scored,
+    score_sum = score_sum + excluded.score_sum,
+    score_sq = score_sq + excluded.score_sq,
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens,
+    latency_sum = latency_sum + excluded.latency_sum
+"""
+
+ROW_FIELDS = ('ts', 'url', 'domain', 'topic', 'score', 'model',
+              'prompt_tokens', 'completion_tokens', 'latency', 'cache_key')
+
+
+class AnalyticsStore:
+    """SQLite-backed store with batched inserts and pre-aggregated rollups"""
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0):
+        self.path = path
+        self._connections = SQLiteConnections(path, SCHEMA)
+        self.writer = BatchWriter('epap-analytics-writer', self.write_batch,
+                                  batch_size=batch_size, flush_interval=flush_interval)
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv('ANALYTICS_DB_PATH')
+        return cls(path) if path else None
+
+    def record(self, row):
+        """Queue one analysis row (dict with ROW_FIELDS); never blocks"""
+        self.writer.submit(tuple(row.get(field) for field in ROW_FIELDS))
+
+    def write_batch(self, rows):
+        """Insert rows and fold them into the rollups in one transaction"""
+        rollups = {table: {} for table in ROLLUP_TABLES}
+        for ts, _url, domain, topic, score, _model, prompt_tokens, completion_tokens, latency, _key in rows:
+            for table, width in ROLLUP_TABLES.items():
+                key = (int(ts // width), domain, topic)
+                agg = rollups[table].get(key)
+                if agg is None:
+                    agg = rollups[table][key] = [0, 0, 0.0, 0.0, 0, 0, 0.0]
+                agg[0] += 1
+                if score is not None:
+                    agg[1] += 1
+                    agg[2] += score
+                    agg[3] += score * score
+                agg[4] += prompt_tokens or 0
+                agg[5] += completion_tokens or 0
+                agg[6] += latency or 0.0
+        conn = self._connections.get()
+        with conn:
+            conn.executemany(f"INSERT INTO analyses ({', '.join(ROW_FIELDS)}) VALUES "
+                             f"({', '.join('?' * len(ROW_FIELDS))})", rows)
+            for table, aggregates in rollups.items():
+                conn.executemany(ROLLUP_UPSERT.format(table=table),
+                                 [key + tuple(agg) for key, agg in aggregates.items()])
+
+    def flush(self):
+        """Write out everything queued (used at shutdown and in tests)"""
+        self.writer.drain()
+
+    def aggregate(self, domain=None, topic=None, since=None, until=None, bucket='day'):
+        """Time-bucketed aggregates from the coarsest rollup that fits the bucket"""
+        table, period = ('rollup_hourly', 3600) if bucket == 'hour' else ('rollup_daily', 86400)
+        width = BUCKET_SECONDS[bucket] // period
+        until = until if until is not None else time.time()
+        since = since if since is not None else until - 7 * 86400
+        clauses = ['period >= ?', 'period <= ?']
+        params = [int(since // period), int(until // period)]
+        if domain:
+            clauses.append('domain = ?')
+            params.append(domain)
+        if topic is not None:
+            clauses.append('topic = ?')
+            params.append(topic)
+        query = f"""
+            SELECT (period / {width}) * {width} * {period} AS bucket,
+                   SUM(n), SUM(scored), SUM(score_sum), SUM(score_sq),
+                   SUM(prompt_tokens), SUM(completion_tokens), SUM(latency_sum)
+            FROM {table} WHERE {' AND '.join(clauses)}
+            GROUP BY bucket ORDER BY bucket
+        """
+        results = []
+        for bucket_start, n, scored, score_sum, score_sq, prompt_tokens, completion_tokens, latency_sum \
+                in self._connections.get().execute(query, params):
+            mean = score_sum / scored if scored else None
+            variance = (score_sq / scored - mean * mean) if scored else None
+            results.append({
+                'bucket': bucket_start,
+                'count': n,
+                'avg_score': round(mean, 2) if mean is not None else None,
+                'score_stddev': round(max(variance, 0.0) ** 0.5, 2) if variance is not None else None,
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'avg_latency': round(latency_sum / n, 3) if n else None,
+            })
+        return results
+
+    def top_domains(self, since=None, until=None, limit=20):
+        """Outlets with the most analyses in the window"""
+        until = until if until is not None else time.time()
+        since = since if since is not None else until - 7 * 86400
+        rows = self._connections.get().execute(
+            """SELECT domain, SUM(n), SUM(score_sum) / NULLIF(SUM(scored), 0)
+               FROM rollup_daily WHERE period >= ? AND period <= ?
+               GROUP BY domain ORDER BY SUM(n) DESC LIMIT ?""",
+            (int(since // 86400), int(until // 86400), limit))
+        return [{'domain': d, 'count': n, 'avg_score': round(avg, 2) if avg is not None else None}
+                for d, n, avg in rows]
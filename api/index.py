@@ -3,14 +3,60 @@ import json
 import os
 import re
 import hashlib
-from mistralai import Mistral
-import requests
-from bs4 import BeautifulSoup
-# Configure Mistral AI
-mistral_client = Mistral(api_key=os.getenv('MISTRAL_API_KEY'))
+import gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Responses at least this large are gzipped when the client accepts it
+MIN_COMPRESS_SIZE = 1024
+
+def encode_json(payload):
+    """Compact UTF-8 JSON bytes (Greek text is not escaped to \\uXXXX)"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def accepts_gzip(accept_encoding):
+    """Whether ``Accept-Encoding`` allows gzip, honouring q-values (``gzip;q=0`` refuses it).
+
+    The same negotiation as ``response_encoding.choose_encoding`` without
+    brotli; that module needs Flask, which this function does not ship.
+    """
+    offered = {}
+    for part in (accept_encoding or '').lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            offered[coding] = quality
+    return offered.get('gzip', offered.get('*', 0)) > 0
+
+# Configure Mistral AI (built on first use: importing mistralai dominates cold starts,
+# and most invocations are static pages that never call the API)
+_mistral_client = None
+
+def get_mistral_client():
+    """Return the shared Mistral client, importing and creating it on first call"""
+    global _mistral_client
+    if _mistral_client is None:
+        from mistralai import Mistral
+        _mistral_client = Mistral(api_key=os.getenv('MISTRAL_API_KEY'))
+    return _mistral_client
 
 # Simple in-memory cache for analysis results
 analysis_cache = {}
+# (content hash, source) -> cache key, for clients that look up by hash before uploading
+content_index = {}
+
+def content_hash(text):
+    """SHA-256 hex of the whitespace-normalised text (same definition as the clients)"""
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
 
 def get_cache_key(text, source=""):
     """Generate a cache key for the analysis"""
@@ -19,6 +65,8 @@ def get_cache_key(text, source=""):
 
 def extract_text_from_url(url):
     """Extract text content from a news URL"""
+    import requests
+    from bs4 import BeautifulSoup
     try:
         if not url.startswith(('http://', 'https://')):
             raise ValueError("Invalid URL format")
@@ -130,7 +178,7 @@ def analyze_greek_news(text, source=""):
             }
         ]
         
-        response = mistral_client.chat.complete(
+        response = get_mistral_client().chat.complete(
             model="mistral-large-latest",
             messages=messages,
             temperature=0.7
@@ -1333,6 +1381,42 @@ class handler(BaseHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
 
+    def _send_json(self, status, payload, cors=True, etag=None):
+        """Write a JSON response, gzipped when large enough and accepted by the client"""
+        body = encode_json(payload)
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Vary', 'Accept-Encoding')
+        if len(body) >= MIN_COMPRESS_SIZE and accepts_gzip(self.headers.get('Accept-Encoding')):
+            body = gzip.compress(body, compresslevel=6, mtime=0)
+            self.send_header('Content-Encoding', 'gzip')
+            if etag:
+                etag = etag[:-1] + '-gzip"'
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'public, max-age=3600, s-maxage=86400')
+        if cors:
+            self._send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_analysis(self, key):
+        """Stored analysis by cache key with a strong ETag, so Vercel's edge can cache it"""
+        analysis = analysis_cache.get(key)
+        if analysis is None:
+            self._send_json(404, {'error': 'Η ανάλυση δεν βρέθηκε', 'success': False})
+            return
+        etag = '"' + hashlib.sha256(analysis.encode('utf-8')).hexdigest()[:32] + '"'
+        # Matches the identity tag and its "-gzip" variant
+        if etag[:-1] in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self._send_cors_headers()
+            self.end_headers()
+            return
+        self._send_json(200, {'key': key, 'analysis': analysis, 'success': True}, etag=etag)
+
     def do_OPTIONS(self):
         self.send_response(200)
         self._send_cors_headers()
@@ -1347,6 +1431,13 @@ class handler(BaseHTTPRequestHandler):
             html = self.get_main_html()
             self.wfile.write(html.encode())
             
+        elif self.path.startswith('/analysis?'):
+            from urllib.parse import parse_qs, urlparse
+            params = parse_qs(urlparse(self.path).query)
+            digest = params.get('hash', [''])[0].lower()
+            source = params.get('source', [''])[0].strip()
+            self._send_analysis(content_index.get((digest, source), ''))
+
         elif self.path.startswith('/?') or (self.path != '/' and '?' in self.path):
             # Handle main page with potential URL parameters for sharing
             self.send_response(200)
@@ -1381,15 +1472,14 @@ class handler(BaseHTTPRequestHandler):
             self.wfile.write(html.encode())
             
         elif self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            
             response = {
                 'status': 'healthy',
                 'message': 'ΕΠΑΠ is running'
             }
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json(200, response, cors=False)
+
+        elif self.path.startswith('/analysis/'):
+            self._send_analysis(self.path[len('/analysis/'):])
             
         elif self.path == '/static/manifest.json':
             self.send_response(200)
@@ -1583,11 +1673,7 @@ class handler(BaseHTTPRequestHandler):
                         'error': 'Παρακαλώ εισάγετε κείμενο ή URL',
                         'success': False
                     }
-                    self.send_response(400)
-                    self.send_header('Content-type', 'application/json')
-                    self._send_cors_headers()
-                    self.end_headers()
-                    self.wfile.write(json.dumps(error_response).encode())
+                    self._send_json(400, error_response)
                     return
                 
                 # Extract text from URL if provided
@@ -1597,11 +1683,7 @@ class handler(BaseHTTPRequestHandler):
                             'error': 'Μη έγκυρη διεύθυνση URL',
                             'success': False
                         }
-                        self.send_response(400)
-                        self.send_header('Content-type', 'application/json')
-                        self._send_cors_headers()
-                        self.end_headers()
-                        self.wfile.write(json.dumps(error_response).encode())
+                        self._send_json(400, error_response)
                         return
                     
                     text = extract_text_from_url(url)
@@ -1610,11 +1692,7 @@ class handler(BaseHTTPRequestHandler):
                             'error': text,
                             'success': False
                         }
-                        self.send_response(400)
-                        self.send_header('Content-type', 'application/json')
-                        self._send_cors_headers()
-                        self.end_headers()
-                        self.wfile.write(json.dumps(error_response).encode())
+                        self._send_json(400, error_response)
                         return
 
                 # Check minimum text length
@@ -1623,11 +1701,7 @@ class handler(BaseHTTPRequestHandler):
                         'error': 'Το κείμενο είναι πολύ σύντομο για ανάλυση (ελάχιστο 50 χαρακτήρες)',
                         'success': False
                     }
-                    self.send_response(400)
-                    self.send_header('Content-type', 'application/json')
-                    self._send_cors_headers()
-                    self.end_headers()
-                    self.wfile.write(json.dumps(error_response).encode())
+                    self._send_json(400, error_response)
                     return
 
                 # Check maximum text length
@@ -1636,28 +1710,24 @@ class handler(BaseHTTPRequestHandler):
                         'error': 'Το κείμενο είναι πολύ μεγάλο (μέγιστο 10,000 χαρακτήρες)',
                         'success': False
                     }
-                    self.send_response(400)
-                    self.send_header('Content-type', 'application/json')
-                    self._send_cors_headers()
-                    self.end_headers()
-                    self.wfile.write(json.dumps(error_response).encode())
+                    self._send_json(400, error_response)
                     return
 
                 # Perform analysis using Mistral AI
                 analysis = analyze_greek_news(text, source)
 
+                cache_key = get_cache_key(text, source)
+                if cache_key in analysis_cache:
+                    content_index[(content_hash(text), source)] = cache_key
                 response = {
+                    'key': cache_key if cache_key in analysis_cache else None,
                     'analysis': analysis,
                     'text_length': len(text),
                     'source': source if source else 'Άγνωστη',
                     'success': True
                 }
 
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                self.wfile.write(json.dumps(response).encode())
+                self._send_json(200, response)
 
             except Exception as e:
                 error_response = {
@@ -1665,11 +1735,7 @@ class handler(BaseHTTPRequestHandler):
                     'success': False
                 }
 
-                self.send_response(500)
-                self.send_header('Content-type', 'application/json')
-                self._send_cors_headers()
-                self.end_headers()
-                self.wfile.write(json.dumps(error_response).encode())
+                self._send_json(500, error_response)
         else:
             self.send_response(404)
             self.end_headers()
@@ -1,10 +1,37 @@
 // Service Worker for ΕΠΑΠ PWA
-const CACHE_NAME = 'epap-v4';
+//
+// - App shell: stale-while-revalidate (served from cache, refreshed in the background)
+// - Analyses: bounded IndexedDB cache keyed by article URL and content hash, so a
+//   repeat submission is answered locally without a round trip
+// - Offline submissions: queued in IndexedDB and resubmitted by Background Sync
+//   (or when the page reports it is back online) with the same Idempotency-Key,
+//   so a retry is never billed as a second analysis
+const CACHE_NAME = 'epap-v5';
 const urlsToCache = [
   '/',
+  '/about',
+  '/privacy',
   '/static/manifest.json'
+  // Icons will be cached on demand to avoid 404 errors
 ];
 
+const DB_NAME = 'epap';
+const DB_VERSION = 1;
+const MAX_ANALYSES = 200;
+const ANALYSIS_TTL_MS = 7 * 24 * 60 * 60 * 1000;
+const MAX_ATTEMPTS = 5;
+const SYNC_TAG = 'epap-analyze-outbox';
+// Statuses that leave a queued submission in the outbox for a later flush
+const RETRY_LATER = [409, 429, 503];
+const RETRY_BASE_MS = 30 * 1000;
+
+// Whitespace as defined by Python's str.split(), which the server normalises with
+const WHITESPACE = /[\t\n\v\f\r \x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+/g;
+
+// Responses that are never served from the shell cache
+const NETWORK_ONLY = ['/static/sw.js', '/health', '/status', '/analysis', '/sync', '/search',
+  '/stories', '/sources/', '/analytics', '/admin/'];
+
 console.log('Service Worker: Script loaded');
 
 // Install event - cache resources
@@ -12,114 +39,333 @@ self.addEventListener('install', (event) => {
   console.log('Service Worker: Install event');
   event.waitUntil(
     caches.open(CACHE_NAME)
-      .then((cache) => {
-        console.log('Service Worker: Opened cache');
-        return cache.addAll(urlsToCache);
-      })
-      .then(() => {
-        console.log('Service Worker: Cached all resources');
-        return self.skipWaiting();
-      })
+      .then((cache) => cache.addAll(urlsToCache))
+      .then(() => self.skipWaiting())
   );
 });
 
-// Activate event - clean up old caches
+// Activate event - clean up old caches and retry anything queued while no worker ran
 self.addEventListener('activate', (event) => {
-  console.log('Service Worker: Activate event');
   event.waitUntil(
-    caches.keys().then((cacheNames) => {
-      return Promise.all(
-        cacheNames.map((cacheName) => {
-          if (cacheName !== CACHE_NAME) {
-            console.log('Service Worker: Deleting old cache:', cacheName);
-            return caches.delete(cacheName);
-          }
-        })
-      );
-    }).then(() => {
-      console.log('Service Worker: Claiming clients');
-      return self.clients.claim();
-    })
+    caches.keys()
+      .then((cacheNames) => Promise.all(
+        cacheNames
+          .filter((cacheName) => cacheName !== CACHE_NAME && cacheName !== 'shared-data')
+          .map((cacheName) => caches.delete(cacheName))
+      ))
+      .then(() => self.clients.claim())
+      .then(() => flushOutbox().catch(() => {}))
   );
 });
 
-// Fetch event - serve from cache when offline
 self.addEventListener('fetch', (event) => {
-  event.respondWith(
-    caches.match(event.request)
-      .then((response) => {
-        // Return cached version or fetch from network
-        return response || fetch(event.request);
-      })
-  );
-});
+  const request = event.request;
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) {
+    return;
+  }
 
-// Handle share target
-self.addEventListener('message', (event) => {
-  if (event.data && event.data.type === 'SHARE_TARGET') {
-    const { title, text, url } = event.data;
-    
-    // Store shared data for the main app to use
-    self.registration.showNotification('ΕΠΑΠ', {
-      body: `Ανάλυση: ${title || text || url}`,
-      icon: '/static/icons/icon-192x192.png',
-      badge: '/static/icons/icon-72x72.png',
-      tag: 'news-analysis',
-      data: { title, text, url }
-    });
+  if (request.method === 'POST' && url.pathname === '/analyze') {
+    event.respondWith(analyze(request));
+    return;
+  }
+  if (request.method !== 'GET') {
+    return;
+  }
+
+  // Share target: store the shared data and redirect to the main app
+  const title = url.searchParams.get('title');
+  const text = url.searchParams.get('text');
+  const sharedUrl = url.searchParams.get('url');
+  if (url.pathname === '/' && (title || text || sharedUrl)) {
+    event.respondWith(
+      caches.open('shared-data')
+        .then((cache) => cache.put('shared-data', new Response(JSON.stringify({
+          title, text, url: sharedUrl
+        }))))
+        .then(() => Response.redirect('/', 302))
+    );
+    return;
   }
+
+  if (NETWORK_ONLY.some((prefix) => url.pathname.startsWith(prefix))) {
+    return;
+  }
+  event.respondWith(staleWhileRevalidate(event, request));
 });
 
-// Handle share target from form submission
-self.addEventListener('fetch', (event) => {
-  if (event.request.method === 'GET' && event.request.url.includes('?')) {
-    const url = new URL(event.request.url);
-    const title = url.searchParams.get('title');
-    const text = url.searchParams.get('text');
-    const sharedUrl = url.searchParams.get('url');
-    
-    if (title || text || sharedUrl) {
-      // Store the shared data and redirect to main app
-      event.respondWith(
-        caches.open('shared-data').then(cache => {
-          return cache.put('shared-data', new Response(JSON.stringify({
-            title, text, url: sharedUrl
-          })));
-        }).then(() => {
-          return Response.redirect('/', 302);
-        })
-      );
+async function staleWhileRevalidate(event, request) {
+  const cache = await caches.open(CACHE_NAME);
+  const cached = await cache.match(request);
+  const network = fetch(request).then((response) => {
+    if (response.ok && response.type === 'basic') {
+      cache.put(request, response.clone());
     }
+    return response;
+  });
+  if (cached) {
+    event.waitUntil(network.catch(() => {}));
+    return cached;
   }
-});
+  return network;
+}
 
-// Handle protocol handlers (web+greeknews://)
-self.addEventListener('message', (event) => {
-  if (event.data && event.data.type === 'PROTOCOL_HANDLER') {
-    const { url } = event.data;
-    
-    // Open the app with the URL parameter
-    self.clients.openWindow(`/?url=${encodeURIComponent(url)}`);
+// ── Analyses ──────────────────────────────────────────────────────────────────
+
+async function analyze(request) {
+  const body = await request.clone().json().catch(() => null);
+  if (!body) {
+    return fetch(request);
   }
-});
+  const ids = await analysisIds(body);
+  const stored = await findAnalysis(ids);
+  if (stored) {
+    return jsonResponse(stored, 200, { 'X-EPAP-Cache': 'local' });
+  }
+
+  const idempotencyKey = request.headers.get('Idempotency-Key') || crypto.randomUUID();
+  try {
+    const known = await lookupAnalysis(body, ids);
+    if (known) {
+      await storeAnalysis(ids, known);
+      return jsonResponse(known, 200);
+    }
+    const response = await submit(body, idempotencyKey);
+    if (response.ok) {
+      await storeAnalysis(ids, await response.clone().json());
+    }
+    return response;
+  } catch (error) {
+    // Network failure: queue the submission and answer with "accepted"
+    await enqueue({ idempotencyKey, body, ids, created: Date.now(), attempts: 0 });
+    await requestSync();
+    return jsonResponse({
+      queued: true,
+      success: false,
+      idempotency_key: idempotencyKey,
+      message: 'Είστε εκτός σύνδεσης. Η ανάλυση θα ολοκληρωθεί αυτόματα μόλις επανέλθει η σύνδεση.'
+    }, 202);
+  }
+}
+
+function submit(body, idempotencyKey) {
+  return fetch('/analyze', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
+    body: JSON.stringify(body)
+  });
+}
+
+// Hash-first lookup: pasted text is uploaded only if the server has no analysis for it
+async function lookupAnalysis(body, ids) {
+  const hash = ids.find((id) => id.startsWith('hash:'));
+  if (!hash) {
+    return null;
+  }
+  const params = new URLSearchParams({ hash: hash.slice(5).split('|')[0], source: body.source || '' });
+  const response = await fetch(`/analysis?${params}`);
+  return response.ok ? response.json() : null;
+}
+
+async function analysisIds(body) {
+  const ids = [];
+  const text = (body.text || '').replace(WHITESPACE, ' ').trim();
+  if (text) {
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+    const hex = Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+    ids.push(`hash:${hex}|${body.source || ''}`);
+  } else if (body.url) {
+    ids.push(`url:${body.url.trim().split('#')[0]}`);
+  }
+  return ids;
+}
+
+function jsonResponse(data, status, headers = {}) {
+  return new Response(JSON.stringify(data), {
+    status,
+    headers: Object.assign({ 'Content-Type': 'application/json; charset=utf-8' }, headers)
+  });
+}
+
+// ── IndexedDB ─────────────────────────────────────────────────────────────────
+
+function openDb() {
+  return new Promise((resolve, reject) => {
+    const open = indexedDB.open(DB_NAME, DB_VERSION);
+    open.onupgradeneeded = () => {
+      const db = open.result;
+      const analyses = db.createObjectStore('analyses', { keyPath: 'id' });
+      analyses.createIndex('stored', 'stored');
+      db.createObjectStore('outbox', { keyPath: 'idempotencyKey' });
+    };
+    open.onsuccess = () => resolve(open.result);
+    open.onerror = () => reject(open.error);
+  });
+}
+
+async function withStore(name, mode, callback) {
+  const db = await openDb();
+  return new Promise((resolve, reject) => {
+    const transaction = db.transaction(name, mode);
+    const result = callback(transaction.objectStore(name));
+    transaction.oncomplete = () => resolve(result && 'result' in result ? result.result : result);
+    transaction.onerror = () => reject(transaction.error);
+  });
+}
+
+async function findAnalysis(ids) {
+  for (const id of ids) {
+    const entry = await withStore('analyses', 'readonly', (store) => store.get(id));
+    if (entry && Date.now() - entry.stored < ANALYSIS_TTL_MS) {
+      return entry.data;
+    }
+  }
+  return null;
+}
+
+async function storeAnalysis(ids, data) {
+  if (!data || !data.success) {
+    return;
+  }
+  await withStore('analyses', 'readwrite', (store) => {
+    ids.forEach((id) => store.put({ id, data, stored: Date.now() }));
+    // Keep only the newest MAX_ANALYSES entries
+    const countRequest = store.count();
+    countRequest.onsuccess = () => {
+      let excess = countRequest.result - MAX_ANALYSES;
+      if (excess <= 0) {
+        return;
+      }
+      store.index('stored').openCursor().onsuccess = (event) => {
+        const cursor = event.target.result;
+        if (cursor && excess-- > 0) {
+          cursor.delete();
+          cursor.continue();
+        }
+      };
+    };
+  });
+}
+
+// ── Offline queue ─────────────────────────────────────────────────────────────
+
+function enqueue(entry) {
+  return withStore('outbox', 'readwrite', (store) => store.put(entry));
+}
+
+async function requestSync() {
+  if (self.registration.sync) {
+    try {
+      await self.registration.sync.register(SYNC_TAG);
+    } catch (error) {
+      console.log('Background sync unavailable:', error);
+    }
+  }
+}
+
+// Resubmit queued analyses; each keeps its Idempotency-Key, so a submission the
+// server already received is answered from its stored outcome, not analyzed twice
+async function flushOutbox() {
+  const entries = await withStore('outbox', 'readonly', (store) => store.getAll());
+  let deferred = false;
+  for (const entry of entries) {
+    if (entry.notBefore && entry.notBefore > Date.now()) {
+      deferred = true;
+      continue;
+    }
+    // Throws while still offline; Background Sync retries the whole queue later
+    const response = await submit(entry.body, entry.idempotencyKey);
+    if (RETRY_LATER.includes(response.status)) {
+      // Rate limited, overloaded, or the same submission is still running: keep it
+      // and wait as long as the server asks
+      await enqueue(Object.assign(entry, { notBefore: Date.now() + retryAfterMs(response, entry.attempts) }));
+      deferred = true;
+      if (response.status === 409) {
+        continue;
+      }
+      // Later entries would get the same answer
+      break;
+    }
+    if (response.status >= 500 && entry.attempts + 1 < MAX_ATTEMPTS) {
+      await enqueue(Object.assign(entry, {
+        attempts: entry.attempts + 1,
+        notBefore: Date.now() + retryAfterMs(response, entry.attempts)
+      }));
+      deferred = true;
+      continue;
+    }
+    const data = await response.json().catch(() => ({ success: false }));
+    await withStore('outbox', 'readwrite', (store) => store.delete(entry.idempotencyKey));
+    await storeAnalysis(entry.ids, data);
+    await notifyClients(entry, data);
+  }
+  if (deferred) {
+    // Rejecting makes Background Sync retry later, with its own backoff
+    throw new Error('Outbox not empty');
+  }
+}
+
+// Retry-After in seconds or as an HTTP date, else exponential backoff from RETRY_BASE_MS
+function retryAfterMs(response, attempts) {
+  const header = response.headers.get('Retry-After');
+  if (header) {
+    const seconds = Number(header);
+    const delay = Number.isNaN(seconds) ? Date.parse(header) - Date.now() : seconds * 1000;
+    if (!Number.isNaN(delay)) {
+      return Math.max(delay, 0);
+    }
+  }
+  return RETRY_BASE_MS * 2 ** attempts;
+}
+
+async function notifyClients(entry, data) {
+  const windows = await self.clients.matchAll({ type: 'window' });
+  windows.forEach((client) => client.postMessage({
+    type: 'ANALYSIS_READY', idempotencyKey: entry.idempotencyKey, data
+  }));
+  if (!windows.length && data.success && self.registration.showNotification) {
+    await self.registration.showNotification('ΕΠΑΠ', {
+      body: 'Η ανάλυση που υποβάλατε εκτός σύνδεσης ολοκληρώθηκε.',
+      icon: '/static/icons/icon-192x192.png',
+      badge: '/static/icons/icon-72x72.png',
+      tag: `analysis-${entry.idempotencyKey}`
+    });
+  }
+}
 
 // Background sync for offline analysis
 self.addEventListener('sync', (event) => {
-  if (event.tag === 'background-sync') {
-    event.waitUntil(doBackgroundSync());
+  if (event.tag === SYNC_TAG) {
+    event.waitUntil(flushOutbox());
   }
 });
 
-async function doBackgroundSync() {
-  // Handle any pending analysis requests
-  console.log('Background sync triggered');
-}
+// ── Messages ──────────────────────────────────────────────────────────────────
+
+self.addEventListener('message', (event) => {
+  const data = event.data || {};
+  if (data.type === 'FLUSH_OUTBOX') {
+    // Browsers without Background Sync: the page reports that it is back online
+    event.waitUntil(flushOutbox().catch(() => {}));
+  } else if (data.type === 'SHARE_TARGET') {
+    const { title, text, url } = data;
+
+    // Store shared data for the main app to use
+    self.registration.showNotification('ΕΠΑΠ', {
+      body: `Ανάλυση: ${title || text || url}`,
+      icon: '/static/icons/icon-192x192.png',
+      badge: '/static/icons/icon-72x72.png',
+      tag: 'news-analysis',
+      data: { title, text, url }
+    });
+  } else if (data.type === 'PROTOCOL_HANDLER') {
+    // Open the app with the URL parameter (web+greeknews://)
+    self.clients.openWindow(`/?url=${encodeURIComponent(data.url)}`);
+  }
+});
 
 // Handle notification clicks
 self.addEventListener('notificationclick', (event) => {
   event.notification.close();
-  
-  event.waitUntil(
-    clients.openWindow('/')
-  );
-});
\ No newline at end of file
+  event.waitUntil(clients.openWindow('/'));
+});
@@ -1,16 +1,46 @@
 import os
-import re
 import logging
 import hashlib
+import hmac
+import atexit
 import time
+from contextlib import nullcontext
 from functools import wraps
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g, send_file, abort, url_for, make_response, has_request_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from mistralai import Mistral
-import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from lazy_imports import LazyObject, lazy_import
+from profiling import RequestProfiler, PROFILE_MODES
+from ingestion import FeedIngester
+from url_utils import canonicalize_url, domain_of, topic_of
+from cache_snapshot import SnapshotCache
+from lookup_index import LookupIndex
+from background import PeriodicWorker
+from reputation import ReputationIndex
+from analytics import AnalyticsStore, BUCKET_SECONDS
+from search_index import SearchIndex
+from stories import StoryClusterer
+from sync_store import DEFAULT_LIMIT as SYNC_DEFAULT_LIMIT, MAX_LIMIT as SYNC_MAX_LIMIT, SyncStore, valid_token
+from extraction_templates import TemplateStore
+import idempotency_store
+from idempotency_store import IdempotencyStore
+from reanalysis import ReanalysisStore
+from article_versions import UPDATE_NOTE, VersionIndex, merge_update
+from loaded_language import LoadedLanguage
+from response_encoding import JSONProvider, cacheable_response, install_compression
+from llm_backends import BackendRegistry
+from admission import LANES, AdmissionControl, Overloaded, estimate_tokens
+from usage_meter import SpendCapReached, UsageMeter
+import article_metadata
+from greek_text import normalize_whitespace
+from score_extractor import extract_score, extract_section_scores
+import greek_text
+
+# Heavy dependencies load on first use, so /health and static files never pay for them
+mistralai = lazy_import('mistralai')
+requests = lazy_import('requests')
+bs4 = lazy_import('bs4')
 
 # Load environment variables
 load_dotenv()
@@ -20,6 +50,9 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# UTF-8 JSON (or MessagePack on request), compressed per Accept-Encoding
+app.json = JSONProvider(app)
+install_compression(app)
 
 # Configure rate limiting
 limiter = Limiter(
@@ -29,15 +62,318 @@ limiter = Limiter(
 limiter.init_app(app)
 
 # Configure Mistral API
-mistral_client = Mistral(api_key=os.getenv('MISTRAL_API_KEY'))
+mistral_client = LazyObject(lambda: mistralai.Mistral(api_key=os.getenv('MISTRAL_API_KEY')))
+
+# Model settings and prompt for the analysis; any change here produces a new
+# analysis version. Cached analyses of older versions are served until the
+# background job re-analyzes them (REANALYSIS_DB_PATH)
+ANALYSIS_MODEL = "mistral-large-latest"  # Using Mistral's latest large model
+
+# Analysis backends: Mistral, plus an OpenAI-compatible endpoint and a local CPU
+# model when configured, chosen per request or per lane (see llm_backends.py)
+llm = BackendRegistry.from_env(mistral_client, ANALYSIS_MODEL)
+
+# Adaptive concurrency limit per backend on the LLM stage, so a slow backend
+# cannot tie up every worker thread (ADMISSION_MAX_CONCURRENCY=0 disables it)
+admission = AdmissionControl.from_env()
+
+ANALYSIS_TEMPERATURE = 0.7
+ANALYSIS_PROMPT = """
+        Αναλύστε αυτό το ελληνικό άρθρο για πιθανά στοιχεία προπαγάνδας και προκατάληψης:
+
+        Κείμενο: {text}
+        Πηγή: {source}
+        {source_context}
+
+        Παρακαλώ αξιολογήστε από 1-100 (1=πιθανή προπαγάνδα, 100=αξιόπισες ειδήσεις) και δώστε λεπτομερή ανάλυση:
+
+        **ΣΥΝΟΛΙΚΗ ΑΞΙΟΛΟΓΗΣΗ: [Βαθμολογία 1-100]**
+
+        **1. ΣΥΝΑΙΣΘΗΜΑΤΙΚΗ ΧΕΙΡΑΓΩΓΗΣΗ:**
+        - Χρήση φορτωμένων λέξεων και φράσεων
+        - Εκφοβιστική γλώσσα
+        - Συναισθηματικές εκφράσεις
+        - Βαθμολογία ενότητας: [1-100]
+
+        **2. ΔΕΙΚΤΕΣ ΠΡΟΚΑΤΑΛΗΨΗΣ:**
+        - Πολιτική ή ιδεολογική κλίση
+        - Μονόπλευρη παρουσίαση γεγονότων
+        - Επιλογή πηγών και μαρτύρων
+        - Βαθμολογία ενότητας: [1-100]
+
+        **3. ΑΝΑΛΟΓΙΑ ΓΕΓΟΝΟΤΩΝ vs ΓΝΩΜΕΣ:**
+        - Ποσοστό αντικειμενικών γεγονότων
+        - Ποσοστό υποκειμενικών ερμηνειών
+        - Διαχωρισμός ειδήσεων από σχολιασμό
+        - Βαθμολογία ενότητας: [1-100]
+
+        **4. ΑΞΙΟΠΙΣΤΙΑ ΠΗΓΗΣ:**
+        - Ιστορικό αξιοπιστίας
+        - Διαφάνεια και ευθύνη
+        - Συνέπεια στην αναφορά
+        - Βαθμολογία ενότητας: [1-100]
+
+        **5. ΓΛΩΣΣΙΚΗ ΑΝΑΛΥΣΗ:**
+        - Χρήση υπερβολών και υπερθετικών
+        - Αποφυγή συγκεκριμένων όρων
+        - Επιλογή λεξιλογίου
+        - Βαθμολογία ενότητας: [1-100]
+
+        **6. ΛΟΓΙΚΕΣ ΠΛΑΝΕΣ:**
+        - Αναγνώριση λογικών σφαλμάτων
+        - Χειραγώγηση δεδομένων
+        - Αποφυγή αντίθετων επιχειρημάτων
+        - Βαθμολογία ενότητας: [1-100]
+
+        **7. ΣΥΣΤΑΣΗ:**
+        - Σύσταση για περαιτέρω έλεγχο
+        - Προτεινόμενες πηγές για επιπλέον πληροφόρηση
+
+        Απαντήστε στα ελληνικά με σαφή, κατανοητό και δομημένο τρόπο.
+        """
+
+def analysis_version(backend):
+    """Version tag of analyses made by ``backend`` with the current prompt and settings"""
+    return hashlib.sha256(
+        f"{backend.model}|{ANALYSIS_TEMPERATURE}|{ANALYSIS_PROMPT}".encode('utf-8')
+    ).hexdigest()[:16]
+
+ANALYSIS_VERSION = analysis_version(llm.default)
+
+# In-memory cache for analysis results, backed by an optional on-disk snapshot
+# (CACHE_SNAPSHOT_PATH) that survives restarts and deploys
+analysis_cache = SnapshotCache.from_env(ANALYSIS_VERSION)
+
+# Snapshot the cache periodically and once more on graceful shutdown
+snapshot_worker = PeriodicWorker(
+    'epap-cache-snapshot',
+    int(os.getenv('CACHE_SNAPSHOT_INTERVAL', '300')),
+    analysis_cache.snapshot
+)
+
+if analysis_cache.path:
+    atexit.register(analysis_cache.snapshot)
+
+    @app.before_request
+    def start_snapshot_worker():
+        snapshot_worker.ensure_started()
+
+# Analyses by canonical article URL and by (content hash, source), shared by the workers
+# through LOOKUP_DB_PATH (next to the cache snapshot by default) and capped in size
+lookup_index = LookupIndex.from_env()
+# Canonical article URL -> {'key': cache key of its analysis, 'text_length': ..., 'highlights': [...]}
+url_index = lookup_index.urls
+
+# Canonical article URL -> recent versions with paragraph hashes, so updated
+# articles are re-analyzed only where they changed (see article_versions.py)
+article_versions = VersionIndex.from_env()
+
+# (content hash, source) -> {'key': ..., 'text_length': ..., 'highlights': ...}, so clients holding the
+# text can look up its analysis by hash before uploading it (see content_hash)
+content_index = lookup_index.contents
+
+# Loaded, hyperbolic and fear words highlighted in analyzed texts, reloaded when the lexicon file changes
+loaded_language = LoadedLanguage.from_env()
 
-# Simple in-memory cache for analysis results
-analysis_cache = {}
+# Cache lifetimes for GET /analysis: browsers revalidate hourly, shared caches
+# (Vercel's edge, a reverse proxy) keep an analysis for a day. Which analysis a
+# URL maps to can change when the article is edited, so that lookup is cached briefly.
+ANALYSIS_MAX_AGE = 3600
+ANALYSIS_SHARED_MAX_AGE = 86400
+URL_LOOKUP_MAX_AGE = 300
 
-def get_cache_key(text, source=""):
+# Per-domain reputation aggregates, updated from every fresh analysis
+reputation_index = ReputationIndex.from_env()
+reputation_worker = PeriodicWorker(
+    'epap-reputation-save',
+    int(os.getenv('REPUTATION_SAVE_INTERVAL', '60')),
+    reputation_index.save
+)
+
+if reputation_index.path:
+    atexit.register(reputation_index.save)
+
+    @app.before_request
+    def start_reputation_worker():
+        reputation_worker.ensure_started()
+
+# Per-domain content selectors learned from extraction quality
+extraction_templates = TemplateStore.from_env()
+templates_worker = PeriodicWorker(
+    'epap-templates-save',
+    int(os.getenv('EXTRACTION_TEMPLATES_SAVE_INTERVAL', '60')),
+    extraction_templates.save
+)
+
+if extraction_templates.path:
+    atexit.register(extraction_templates.save)
+
+    @app.before_request
+    def start_templates_worker():
+        templates_worker.ensure_started()
+
+# How often URL extraction is served by the JSON-LD fast path
+extraction_stats = article_metadata.FastPathStats()
+
+# Callbacks run with a record dict after every fresh (non-cached) analysis
+analysis_listeners = []
+
+def notify_analysis_listeners(record):
+    """Hand a completed analysis to every registered listener"""
+    for listener in analysis_listeners:
+        try:
+            listener(record)
+        except Exception as e:
+            logger.error(f"Analysis listener {listener.__name__} failed: {str(e)}")
+
+def update_reputation(record):
+    if record['reanalysis']:
+        # The article was already counted when it was first analyzed
+        return
+    reputation_index.record(
+        record['domain'],
+        extract_score(record['analysis']),
+        extract_section_scores(record['analysis']),
+        record['timestamp']
+    )
+
+analysis_listeners.append(update_reputation)
+
+# Optional analytics store of every analysis (ANALYTICS_DB_PATH)
+analytics_store = AnalyticsStore.from_env()
+
+def record_analytics(record):
+    usage = record.get('usage') or {}
+    analytics_store.record({
+        'ts': record['timestamp'],
+        'url': record['url'],
+        'domain': record['domain'],
+        'topic': topic_of(record['url']) if record['url'] else '',
+        'score': extract_score(record['analysis']),
+        'model': record['model'],
+        'prompt_tokens': usage.get('prompt_tokens'),
+        'completion_tokens': usage.get('completion_tokens'),
+        'latency': record['latency'],
+        'cache_key': record['cache_key']
+    })
+
+if analytics_store is not None:
+    analysis_listeners.append(record_analytics)
+    atexit.register(analytics_store.flush)
+
+# Optional full-text index over analyzed articles (SEARCH_DB_PATH)
+search_index = SearchIndex.from_env()
+
+def index_for_search(record):
+    search_index.add({
+        'cache_key': record['cache_key'],
+        'url': record['url'],
+        'domain': record['domain'],
+        'ts': record['timestamp'],
+        'score': extract_score(record['analysis']),
+        'text': record['text'],
+        'analysis': record['analysis']
+    })
+
+if search_index is not None:
+    analysis_listeners.append(index_for_search)
+    atexit.register(search_index.flush)
+
+# Story clusters across outlets, updated incrementally from every fresh analysis
+story_clusterer = StoryClusterer.from_env()
+stories_worker = PeriodicWorker(
+    'epap-stories-save',
+    int(os.getenv('STORIES_SAVE_INTERVAL', '60')),
+    story_clusterer.save
+)
+
+def cluster_story(record):
+    if record['reanalysis']:
+        return
+    story_clusterer.add(
+        record['cache_key'],
+        record['text'],
+        url=record['url'],
+        domain=record['domain'],
+        score=extract_score(record['analysis']),
+        timestamp=record['timestamp']
+    )
+
+analysis_listeners.append(cluster_story)
+
+if story_clusterer.path:
+    atexit.register(story_clusterer.save)
+
+    @app.before_request
+    def start_stories_worker():
+        stories_worker.ensure_started()
+
+# Optional per-device analysis history for the mobile app's delta sync (SYNC_DB_PATH)
+sync_store = SyncStore.from_env()
+
+def refresh_synced_history(record):
+    # Re-analyses of a key already in someone's history are sent to them on their next sync
+    sync_store.update_analysis(record['cache_key'], record['analysis'])
+
+if sync_store is not None:
+    analysis_listeners.append(refresh_synced_history)
+
+# Token and cost accounting of LLM calls, with an optional daily spend cap (LLM_DAILY_SPEND_CAP)
+usage_meter = UsageMeter.from_env()
+usage_worker = PeriodicWorker(
+    'epap-usage-flush',
+    int(os.getenv('USAGE_FLUSH_INTERVAL', '10')),
+    usage_meter.flush
+)
+
+if usage_meter.path:
+    atexit.register(usage_meter.flush)
+
+    @app.before_request
+    def start_usage_worker():
+        usage_worker.ensure_started()
+
+# Inputs and popularity of cached analyses, so the ones made with an older prompt
+# or model are re-analyzed in the background, most requested first (REANALYSIS_DB_PATH)
+reanalysis_store = ReanalysisStore.from_env()
+
+def remember_for_reanalysis(record):
+    reanalysis_store.record(record['cache_key'], record['version'], record['backend'], {
+        'text': record['text'],
+        'source': record['source'],
+        'url': record['url'],
+        'metadata': record['metadata']
+    })
+
+def count_hit(key):
+    """Count a request answered by a cached analysis, for re-analysis priority"""
+    if reanalysis_store is not None:
+        reanalysis_store.touch(key)
+
+if reanalysis_store is not None:
+    analysis_listeners.append(remember_for_reanalysis)
+    atexit.register(reanalysis_store.flush)
+
+# Optional Idempotency-Key support for /analyze, shared across workers (IDEMPOTENCY_DB_PATH)
+idempotency = IdempotencyStore.from_env()
+
+# Headers of a stored response that are sent again when it is replayed
+IDEMPOTENT_REPLAY_HEADERS = ('Content-Type', 'Content-Location', 'Vary')
+
+def get_cache_key(text, source="", metadata=None, backend=None):
     """Generate a cache key for the analysis"""
-    content = f"{text[:1000]}_{source}".encode('utf-8')
-    return hashlib.md5(content).hexdigest()
+    content = f"{normalize_whitespace(text)[:1000]}_{source}"
+    if metadata:
+        # Publication metadata is part of the prompt, so it is part of the key
+        content += f"_{metadata.get('publisher', '')}_{metadata.get('date_published', '')}"
+    if backend is not None and backend is not llm.default:
+        # Analyses by other models are kept apart from the default model's
+        content += f"_{backend.model_id}"
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+def content_hash(text):
+    """SHA-256 hex of the whitespace-normalised text, as computed by the extension and mobile app"""
+    return hashlib.sha256(normalize_whitespace(text).encode('utf-8')).hexdigest()
 
 def log_request(func):
     """Decorator to log API requests"""
@@ -58,8 +394,102 @@ def log_request(func):
             raise
     return wrapper
 
+def require_admin(func):
+    """Decorator restricting a route to callers presenting ADMIN_TOKEN"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        admin_token = os.getenv('ADMIN_TOKEN')
+        if not admin_token:
+            # Admin surface is disabled entirely without a configured token
+            abort(404)
+        supplied = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(supplied, admin_token):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return func(*args, **kwargs)
+    return wrapper
+
+def idempotent(replayable):
+    """Decorator honouring an Idempotency-Key header on a POST route.
+
+    The first request with a key runs the view. Duplicates that arrive
+    while it runs get ``409`` with ``Retry-After``, later ones the same
+    response. A response that ``replayable`` rejects is not stored, so a
+    retry runs the view again.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if idempotency is None or key is None:
+                return func(*args, **kwargs)
+            if not idempotency_store.valid_key(key):
+                return jsonify({'error': 'Μη έγκυρο Idempotency-Key'}), 400
+            scoped_key = idempotency_store.fingerprint(request.path, key)
+            state, stored = idempotency.claim(
+                scoped_key, idempotency_store.fingerprint(request.path, request.get_data()))
+            if state == idempotency_store.CONFLICT:
+                return jsonify({'error': 'Το Idempotency-Key έχει ήδη χρησιμοποιηθεί για διαφορετική αίτηση'}), 422
+            if state == idempotency_store.PENDING:
+                response = jsonify({'error': 'Η ίδια αίτηση εκτελείται ήδη, δοκιμάστε ξανά σε λίγο'})
+                response.headers['Retry-After'] = '5'
+                return response, 409
+            if state == idempotency_store.DONE:
+                logger.info(f"Replaying stored response for {request.path}")
+                response = app.response_class(stored['body'], status=stored['status'], headers=stored['headers'])
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = make_response(func(*args, **kwargs))
+            except BaseException:
+                idempotency.release(scoped_key)
+                raise
+            if replayable(response):
+                headers = {name: response.headers[name] for name in IDEMPOTENT_REPLAY_HEADERS
+                           if name in response.headers}
+                idempotency.complete(scoped_key, response.status_code, headers, response.get_data())
+            else:
+                idempotency.release(scoped_key)
+            return response
+        return wrapper
+    return decorator
+
+def is_admin_request():
+    """Check the admin token without rejecting the request"""
+    admin_token = os.getenv('ADMIN_TOKEN')
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(admin_token) and hmac.compare_digest(supplied, admin_token)
+
+def install_profiling(flask_app, request_profiler):
+    """Register per-request profiling hooks; nothing is registered when profiling is off"""
+    if request_profiler is None:
+        return
+
+    @flask_app.before_request
+    def start_profile():
+        forced = request.headers.get('X-Profile') == '1' and is_admin_request()
+        if request_profiler.should_profile(forced):
+            g.profile_handle = request_profiler.start()
+
+    @flask_app.after_request
+    def stop_profile(response):
+        handle = g.pop('profile_handle', None)
+        if handle is not None:
+            name = request_profiler.stop(handle, request.path)
+            if name:
+                response.headers['X-Profile-Id'] = name
+        return response
+
+# Opt-in request profiling (enabled by PROFILE_DIR)
+profiler = RequestProfiler.from_env()
+install_profiling(app, profiler)
+
 def extract_text_from_url(url):
     """Extract text content from a news URL with improved error handling"""
+    return extract_article(url)[0]
+
+def extract_article(url, lane='interactive', tenant=''):
+    """Fetch a news URL and return ``(text, metadata)``; text starts with "Error" on failure"""
     try:
         # Validate URL
         if not url.startswith(('http://', 'https://')):
@@ -74,7 +504,8 @@ def extract_text_from_url(url):
         }
         
         logger.info(f"Extracting text from URL: {url}")
-        response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
+        with admission.fetch_slot(lane, tenant) if admission else nullcontext():
+            response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
         response.raise_for_status()
         
         # Check content type
@@ -82,106 +513,73 @@ def extract_text_from_url(url):
         if 'text/html' not in content_type:
             raise ValueError(f"Unsupported content type: {content_type}")
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove unwanted elements
-        for element in soup(["script", "style", "nav", "footer", "header", "aside", "advertisement"]):
-            element.decompose()
-        
-        # Try multiple selectors for main content
-        content_selectors = [
-            'main', 'article', '[role="main"]',
-            '.content', '.article-content', '.post-content',
-            '.entry-content', '.story-content', '.news-content'
-        ]
-        
-        main_content = None
-        for selector in content_selectors:
-            main_content = soup.select_one(selector)
-            if main_content:
-                break
-        
-        if main_content:
-            text = main_content.get_text()
+        # JSON-LD/OpenGraph fast path: a usable articleBody skips DOM parsing
+        metadata = article_metadata.scan(response.content, content_type)
+        domain = domain_of(url)
+        text = article_metadata.usable_body(metadata)
+        extraction_stats.record(domain, structured=text is not None)
+        if text is not None:
+            selector = 'json-ld'
         else:
-            # Fallback to body content
-            body = soup.find('body')
-            text = body.get_text() if body else soup.get_text()
+            soup = bs4.BeautifulSoup(response.content, 'html.parser')
+            # Jump to the selector learned for this outlet, or probe the candidates
+            text, selector = extraction_templates.extract(soup, domain)
         
         # Clean up text
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = normalize_whitespace(text)
         
         if len(text) < 100:
             raise ValueError("Insufficient text content extracted")
             
-        logger.info(f"Successfully extracted {len(text)} characters from URL")
-        return text[:3000]  # Limit to 3000 characters for API efficiency
+        logger.info(f"Successfully extracted {len(text)} characters from URL using {selector or 'body'}")
+        # Limit to 3000 characters for API efficiency
+        return text[:3000], article_metadata.public_fields(metadata)
         
+    except Overloaded:
+        raise
     except requests.exceptions.RequestException as e:
         logger.error(f"Request error for URL {url}: {str(e)}")
-        return f"Error fetching URL: {str(e)}"
+        return f"Error fetching URL: {str(e)}", {}
     except Exception as e:
         logger.error(f"Error extracting text from {url}: {str(e)}")
-        return f"Error extracting text: {str(e)}"
+        return f"Error extracting text: {str(e)}", {}
 
-def analyze_greek_news(text, source=""):
-    """Analyze Greek news text for propaganda indicators using Mistral with caching"""
+def analyze_greek_news(text, source="", url="", metadata=None, backend=None, lane='interactive', tenant='',
+                       refresh=False, update=None):
+    """Analyze Greek news text for propaganda indicators with caching (default backend unless given)
+
+    With ``refresh`` the cached analysis is replaced, and kept if the new one fails. ``update`` is
+    ``(previous analysis, article_versions.Change)`` for an updated article: only its changed
+    paragraphs are analyzed, and the scores are merged into the previous analysis.
+
+    The LLM call is scheduled in ``lane`` for ``tenant``; raises Overloaded if it gets no slot in time,
+    and SpendCapReached once the daily spend cap is used up. Within a request, the call's token
+    usage and cost are left in ``g.llm_usage``.
+    """
     try:
+        backend = backend or llm.default
+        domain = domain_of(url) if url else ""
         # Check cache first
-        cache_key = get_cache_key(text, source)
-        if cache_key in analysis_cache:
+        cache_key = get_cache_key(text, source, metadata, backend)
+        if not refresh and cache_key in analysis_cache:
             logger.info("Returning cached analysis result")
+            count_hit(cache_key)
             return analysis_cache[cache_key]
+        usage_meter.check()
         
         # Enhanced prompt with more detailed analysis criteria
-        prompt = f"""
-        Αναλύστε αυτό το ελληνικό άρθρο για πιθανά στοιχεία προπαγάνδας και προκατάληψης:
-
-        Κείμενο: {text[:2000]}
-        Πηγή: {source if source else "Άγνωστη"}
-
-        Παρακαλώ αξιολογήστε από 1-100 (1=πιθανή προπαγάνδα, 100=αξιόπισες ειδήσεις) και δώστε λεπτομερή ανάλυση:
-
-        **ΣΥΝΟΛΙΚΗ ΑΞΙΟΛΟΓΗΣΗ: [Βαθμολογία 1-100]**
-
-        **1. ΣΥΝΑΙΣΘΗΜΑΤΙΚΗ ΧΕΙΡΑΓΩΓΗΣΗ:**
-        - Χρήση φορτωμένων λέξεων και φράσεων
-        - Εκφοβιστική γλώσσα
-        - Συναισθηματικές εκφράσεις
-
-        **2. ΔΕΙΚΤΕΣ ΠΡΟΚΑΤΑΛΗΨΗΣ:**
-        - Πολιτική ή ιδεολογική κλίση
-        - Μονόπλευρη παρουσίαση γεγονότων
-        - Επιλογή πηγών και μαρτύρων
-
-        **3. ΑΝΑΛΟΓΙΑ ΓΕΓΟΝΟΤΩΝ vs ΓΝΩΜΕΣ:**
-        - Ποσοστό αντικειμενικών γεγονότων
-        - Ποσοστό υποκειμενικών ερμηνειών
-        - Διαχωρισμός ειδήσεων από σχολιασμό
-
-        **4. ΑΞΙΟΠΙΣΤΙΑ ΠΗΓΗΣ:**
-        - Ιστορικό αξιοπιστίας
-        - Διαφάνεια και ευθύνη
-        - Συνέπεια στην αναφορά
-
-        **5. ΓΛΩΣΣΙΚΗ ΑΝΑΛΥΣΗ:**
-        - Χρήση υπερβολών και υπερθετικών
-        - Αποφυγή συγκεκριμένων όρων
-        - Επιλογή λεξιλογίου
-
-        **6. ΛΟΓΙΚΕΣ ΠΛΑΝΕΣ:**
-        - Αναγνώριση λογικών σφαλμάτων
-        - Χειραγώγηση δεδομένων
-        - Αποφυγή αντίθετων επιχειρημάτων
-
-        **7. ΣΥΣΤΑΣΗ:**
-        - Σύσταση για περαιτέρω έλεγχο
-        - Προτεινόμενες πηγές για επιπλέον πληροφόρηση
-
-        Απαντήστε στα ελληνικά με σαφή, κατανοητό και δομημένο τρόπο.
-        """
+        prompt = ANALYSIS_PROMPT.format(
+            text=(update[1].changed_text() if update else text)[:2000],
+            source=source if source else "Άγνωστη",
+            source_context="\n        ".join(filter(None, [
+                reputation_index.prompt_context(domain),
+                article_metadata.prompt_context(metadata or {}),
+                UPDATE_NOTE if update else ""
+            ]))
+        )
 
-        logger.info("Sending request to Mistral API")
+        logger.info(f"Sending request to the {backend.name} backend ({backend.model})")
+        started = time.time()
         messages = [
             {
                 "role": "user",
@@ -189,30 +587,124 @@ def analyze_greek_news(text, source=""):
             }
         ]
         
-        response = mistral_client.chat.complete(
-            model="mistral-large-latest",  # Using Mistral's latest large model
-            messages=messages,
-            temperature=0.7
-        )
-        
-        if not response or not response.choices or len(response.choices) == 0:
-            raise ValueError("Empty response from Mistral API")
-        
-        analysis_text = response.choices[0].message.content
-        
-        if not analysis_text:
-            raise ValueError("Empty content in Mistral API response")
+        with admission.slot(backend.name, lane, tenant, estimate_tokens(prompt)) if admission else nullcontext() as slot:
+            completion = backend.complete(messages, ANALYSIS_TEMPERATURE)
+            if slot is not None:
+                slot.tokens = completion.usage.get('total_tokens')
+        analysis_text = completion.text
+        if update:
+            analysis_text = merge_update(update[0], analysis_text, update[1].share)
+        # Requests are accounted per endpoint, background work per lane
+        route = request.endpoint if has_request_context() else lane
+        usage = usage_meter.record(backend.model, route, tenant, completion.usage)
+        if has_request_context():
+            g.llm_usage = usage
         
         # Cache the result
-        analysis_cache[cache_key] = analysis_text
+        version = analysis_version(backend)
+        analysis_cache.set(cache_key, analysis_text, version)
         logger.info("Analysis completed and cached")
+
+        notify_analysis_listeners({
+            'cache_key': cache_key,
+            'url': url,
+            'domain': domain,
+            'source': source,
+            'metadata': metadata or {},
+            'text': text,
+            'analysis': analysis_text,
+            'model': backend.model,
+            'backend': backend.name,
+            'version': version,
+            # Not a new article: re-analyzed after a prompt upgrade, or updated in place
+            'reanalysis': refresh or update is not None,
+            'usage': usage,
+            'timestamp': time.time(),
+            'latency': time.time() - started
+        })
         
         return analysis_text
         
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error in analysis: {str(e)}")
         return f"Σφάλμα στην ανάλυση: {str(e)}"
 
+def prefetch_article(url, source=""):
+    """Fetch and analyze an article ahead of time so later visitors hit the cache"""
+    # Lowest priority; each outlet is a tenant, so one busy feed cannot crowd out the others
+    tenant = domain_of(url)
+    backend = llm.get(lane='prefetch')
+    try:
+        text, metadata = extract_article(url, 'prefetch', tenant)
+        if text.startswith("Error"):
+            return False
+        analyze_greek_news(text, source, url, metadata, backend, 'prefetch', tenant)
+    except Overloaded:
+        logger.info(f"Skipping prefetch of {url}: no capacity")
+        return False
+    cache_key = get_cache_key(text, source, metadata, backend)
+    if cache_key not in analysis_cache:
+        return False
+    canonical = canonicalize_url(url)
+    url_index[canonical] = {'key': cache_key, 'text_length': len(text), 'highlights': loaded_language.annotate(text)}
+    if backend is llm.default and article_versions.latest(canonical) is None:
+        article_versions.add(canonical, article_versions.compare(canonical, text), cache_key, 'full',
+                             extract_score(analysis_cache[cache_key]))
+    return True
+
+def reanalyze_outdated():
+    """Re-analyze a batch of cached analyses made with an older prompt or model, most requested first"""
+    current = {backend.name: analysis_version(backend) for backend in llm}
+    claimed = reanalysis_store.claim(current, int(os.getenv('REANALYSIS_BATCH', '10')))
+    for position, (key, name, inputs) in enumerate(claimed):
+        backend = llm.get(name)
+        try:
+            analyze_greek_news(inputs['text'], inputs['source'], inputs['url'], inputs['metadata'],
+                               backend, 'batch', 'reanalysis', refresh=True)
+        except Overloaded:
+            # Out of capacity or budget; this and the remaining entries wait for a later run
+            reanalysis_store.release(*[key for key, _, _ in claimed[position:]])
+            logger.info("Pausing re-analysis: no capacity")
+            break
+        if analysis_cache.version_of(key) != current[name]:
+            # The old analysis is still served; retried on a later run
+            reanalysis_store.release(key)
+
+reanalysis_worker = PeriodicWorker(
+    'epap-reanalysis',
+    int(os.getenv('REANALYSIS_INTERVAL', '60')),
+    reanalyze_outdated
+)
+
+if reanalysis_store is not None:
+    @app.before_request
+    def start_reanalysis_worker():
+        reanalysis_worker.ensure_started()
+
+# Background feed ingestion (enabled by INGEST_FEEDS / INGEST_FEEDS_FILE)
+ingester = FeedIngester.from_env(
+    process=prefetch_article,
+    is_known=lambda canonical: canonical in url_index
+)
+
+if ingester is not None:
+    @app.before_request
+    def start_ingestion():
+        ingester.ensure_started()
+
+def warm_up():
+    """Resolve lazily loaded dependencies and tables now (called before forking preloaded workers)"""
+    started = time.time()
+    for backend in llm:
+        backend.warm_up()
+    requests.Session
+    bs4.BeautifulSoup
+    greek_text.load_tables()
+    story_clusterer.state
+    logger.info(f"Warmed up shared state in {time.time() - started:.2f}s")
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -259,7 +751,173 @@ def status():
             'default': '100 per hour, 10 per minute',
             'analyze': '5 per minute'
         },
-        'api_status': 'operational'
+        'api_status': 'operational',
+        'ingestion': ingester.stats if ingester else None,
+        'cache_snapshot': analysis_cache.stats,
+        'admission': admission.stats() if admission else None,
+        'cache_only': usage_meter.cache_only(),
+        'reanalysis': reanalysis_store.stats({backend.name: analysis_version(backend) for backend in llm})
+        if reanalysis_store else None,
+        'lexicon': loaded_language.stats()
+    })
+
+@app.route('/sources/<domain>')
+def source_reputation(domain):
+    """Aggregated analysis history for a news outlet"""
+    summary = reputation_index.get(domain_of(f"https://{domain.strip().lower()}"))
+    if summary is None:
+        return jsonify({'error': 'Δεν υπάρχουν αναλύσεις για αυτή την πηγή'}), 404
+    return jsonify(summary)
+
+@app.route('/analytics')
+def analytics():
+    """Time-bucketed score aggregates per outlet and topic"""
+    if analytics_store is None:
+        return jsonify({'error': 'Analytics are disabled'}), 404
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKET_SECONDS:
+        return jsonify({'error': f'bucket must be one of {", ".join(BUCKET_SECONDS)}'}), 400
+    try:
+        since = float(request.args['since']) if 'since' in request.args else None
+        until = float(request.args['until']) if 'until' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'since/until must be Unix timestamps'}), 400
+    domain = request.args.get('domain')
+    return jsonify({
+        'domain': domain,
+        'topic': request.args.get('topic'),
+        'bucket': bucket,
+        'buckets': analytics_store.aggregate(
+            domain=domain_of(f"https://{domain}") if domain else None,
+            topic=request.args.get('topic'),
+            since=since,
+            until=until,
+            bucket=bucket
+        ),
+        'top_domains': None if domain else analytics_store.top_domains(since=since, until=until)
+    })
+
+@app.route('/analysis/<key>')
+@limiter.limit("120 per minute")
+def analysis_by_key(key):
+    """A stored analysis by its cache key, cacheable by CDNs and revalidated with ETags"""
+    analysis = analysis_cache.get(key)
+    if analysis is None:
+        return jsonify({'error': 'Η ανάλυση δεν βρέθηκε'}), 404
+    count_hit(key)
+    return cacheable_response(
+        {'key': key, 'analysis': analysis, 'analysis_version': analysis_cache.version_of(key)},
+        ANALYSIS_MAX_AGE, ANALYSIS_SHARED_MAX_AGE
+    )
+
+@app.route('/analysis')
+@limiter.limit("120 per minute")
+def analysis_lookup():
+    """Stored analysis by content hash and/or article URL, so clients upload text only on a 404"""
+    url = request.args.get('url', '').strip()
+    digest = request.args.get('hash', '').strip().lower()
+    source = request.args.get('source', '').strip()
+    if not url and not digest:
+        return jsonify({'error': 'Παρακαλώ εισάγετε URL ή hash περιεχομένου'}), 400
+    if url and not url.startswith(('http://', 'https://')):
+        return jsonify({'error': 'Μη έγκυρη διεύθυνση URL'}), 400
+    if digest and (len(digest) != 64 or digest.strip('0123456789abcdef')):
+        return jsonify({'error': 'Μη έγκυρο hash περιεχομένου'}), 400
+    # The same text always has the same analysis; which analysis a URL maps to can change
+    known = content_index.get((digest, source)) if digest else None
+    max_age, shared_max_age = ANALYSIS_MAX_AGE, ANALYSIS_SHARED_MAX_AGE
+    if (known is None or known['key'] not in analysis_cache) and url:
+        known = url_index.get(canonicalize_url(url))
+        max_age = shared_max_age = URL_LOOKUP_MAX_AGE
+    analysis = analysis_cache.get(known['key']) if known else None
+    if analysis is None:
+        return jsonify({'error': 'Η ανάλυση δεν βρέθηκε'}), 404
+    count_hit(known['key'])
+    response = cacheable_response({
+        'key': known['key'],
+        'analysis': analysis,
+        'text_length': known['text_length'],
+        'source': source if source else 'Άγνωστη',
+        'highlights': known.get('highlights', []),
+        'analysis_version': analysis_cache.version_of(known['key']),
+        'success': True
+    }, max_age, shared_max_age)
+    response.headers['Content-Location'] = url_for('analysis_by_key', key=known['key'])
+    return response
+
+@app.route('/sync', methods=['GET', 'POST'])
+@limiter.limit("60 per minute")
+def sync():
+    """Delta sync of a device's analysis history, keyed by the X-Sync-Token header"""
+    if sync_store is None:
+        return jsonify({'error': 'Sync is disabled'}), 404
+    token = request.headers.get('X-Sync-Token', '')
+    if not valid_token(token):
+        return jsonify({'error': 'Μη έγκυρο διακριτικό συγχρονισμού'}), 400
+    if request.method == 'POST':
+        # Analyses the client got without a POST /analyze (e.g. cached GET /analysis hits)
+        keys = (request.get_json(silent=True) or {}).get('keys')
+        if not isinstance(keys, list) or len(keys) > SYNC_MAX_LIMIT:
+            return jsonify({'error': f'keys must be a list of at most {SYNC_MAX_LIMIT} analysis keys'}), 400
+        entries = [{'key': key, 'analysis': analysis_cache.get(key)} for key in keys if isinstance(key, str)]
+        found = [entry for entry in entries if entry['analysis'] is not None]
+        return jsonify({
+            'added': sync_store.record(token, found),
+            'missing': [entry['key'] for entry in entries if entry['analysis'] is None]
+        })
+    try:
+        cursor = int(request.args.get('cursor') or 0)
+        limit = min(max(int(request.args.get('limit', SYNC_DEFAULT_LIMIT)), 1), SYNC_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'cursor/limit must be integers'}), 400
+    items, next_cursor, more = sync_store.changes(token, cursor, limit)
+    response = jsonify({'items': items, 'cursor': str(next_cursor), 'more': more})
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
+@app.route('/stories')
+def stories():
+    """Live story clusters with the score spread across the outlets covering them"""
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        min_outlets = max(int(request.args.get('min_outlets', 1)), 1)
+        hours = float(request.args['hours']) if 'hours' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'limit/min_outlets/hours must be numbers'}), 400
+    return jsonify({
+        'stories': story_clusterer.stories(
+            limit=limit,
+            min_outlets=min_outlets,
+            since=time.time() - hours * 3600 if hours else None
+        )
+    })
+
+@app.route('/stories/<story_id>')
+def story(story_id):
+    """One story cluster"""
+    summary = story_clusterer.get(story_id)
+    if summary is None:
+        return jsonify({'error': 'Η ιστορία δεν βρέθηκε'}), 404
+    return jsonify(summary)
+
+@app.route('/search')
+def search():
+    """Full-text search over previously analyzed articles"""
+    if search_index is None:
+        return jsonify({'error': 'Search is disabled'}), 404
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Παρακαλώ εισάγετε όρο αναζήτησης'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({'error': 'Μη έγκυρο όριο αποτελεσμάτων'}), 400
+    started = time.time()
+    results = search_index.search(query, limit=limit)
+    return jsonify({
+        'query': query,
+        'results': results,
+        'took_ms': round((time.time() - started) * 1000, 2)
     })
 
 @app.route('/ads.txt')
@@ -360,9 +1018,125 @@ def bing_site_auth():
         logger.error(f"Error serving BingSiteAuth.xml: {str(e)}")
         return f'Error: {str(e)}', 500
 
+@app.route('/admin/profiles')
+@require_admin
+def list_profiles():
+    """List recently captured request profiles"""
+    if profiler is None:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    return jsonify({
+        'mode': profiler.mode,
+        'sample_rate': profiler.sample_rate,
+        'profiles': profiler.list_profiles()
+    })
+
+@app.route('/admin/profiles/<name>')
+@require_admin
+def download_profile(name):
+    """Download a captured profile"""
+    path = profiler.profile_path(name) if profiler else None
+    if not path:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=name)
+
+@app.route('/admin/profiling', methods=['POST'])
+@require_admin
+def configure_profiling():
+    """Change the profiling mode or 1-in-N sample rate at runtime"""
+    if profiler is None:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    data = request.get_json(silent=True) or {}
+    if 'sample_rate' in data:
+        try:
+            profiler.sample_rate = max(0, int(data['sample_rate']))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid sample_rate'}), 400
+    if data.get('mode') in PROFILE_MODES:
+        profiler.mode = data['mode']
+    return jsonify({'mode': profiler.mode, 'sample_rate': profiler.sample_rate})
+
+@app.route('/admin/templates')
+@require_admin
+def list_extraction_templates():
+    """Learned and overridden extraction selectors for every known domain"""
+    return jsonify({'templates': extraction_templates.list()})
+
+@app.route('/admin/extraction')
+@require_admin
+def extraction_statistics():
+    """Structured-data fast path hits vs DOM extractions in this worker"""
+    return jsonify(extraction_stats.summary())
+
+@app.route('/admin/templates/<domain>', methods=['GET', 'PUT', 'DELETE'])
+@require_admin
+def extraction_template(domain):
+    """Inspect, pin (PUT {"selector": ...}) or reset (DELETE) a domain's extraction selector"""
+    domain = domain_of(f"https://{domain.strip().lower()}")
+    if request.method == 'PUT':
+        selector = ((request.get_json(silent=True) or {}).get('selector') or '').strip()
+        try:
+            bs4.BeautifulSoup('', 'html.parser').select_one(selector)
+        except Exception:
+            return jsonify({'error': 'Invalid CSS selector'}), 400
+        return jsonify(extraction_templates.set_override(domain, selector))
+    if request.method == 'DELETE':
+        return jsonify(extraction_templates.set_override(domain, None))
+    summary = extraction_templates.get(domain)
+    if summary is None:
+        return jsonify({'error': 'No template for this domain'}), 404
+    return jsonify(summary)
+
+@app.route('/admin/backends')
+@require_admin
+def backend_statistics():
+    """Latency and throughput of each configured LLM backend"""
+    return jsonify(llm.stats())
+
+@app.route('/admin/usage')
+@require_admin
+def usage_statistics():
+    """LLM tokens and cost per model, route and tenant over the last ?days= days"""
+    try:
+        days = int(request.args.get('days', 1))
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'}), 400
+    return jsonify(usage_meter.summary(days))
+
+def analysis_created(payload, url=""):
+    """POST /analyze response pointing at the cacheable GET /analysis/<key> resource"""
+    token = request.headers.get('X-Sync-Token', '')
+    if sync_store is not None and payload['key'] and valid_token(token):
+        try:
+            sync_store.record(token, [dict(payload, url=url)])
+        except Exception as e:
+            logger.error(f"Could not record synced history: {str(e)}")
+    response = jsonify(payload)
+    if payload['key']:
+        response.headers['Content-Location'] = url_for('analysis_by_key', key=payload['key'])
+    return response
+
+def overloaded_response(error):
+    """503 with Retry-After for an analysis the LLM stage has no capacity (or budget) for"""
+    if isinstance(error, SpendCapReached):
+        message = 'Το ημερήσιο όριο νέων αναλύσεων εξαντλήθηκε. Διατίθενται μόνο ήδη αναλυμένα άρθρα.'
+    else:
+        message = 'Η υπηρεσία ανάλυσης είναι προσωρινά υπερφορτωμένη. Δοκιμάστε ξανά σε λίγο.'
+    response = jsonify({
+        'error': message,
+        'retry_after': error.retry_after,
+        'success': False
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+def replayable_analysis(response):
+    """Only stored analyses are replayed; errors are cheap to re-run and may be transient"""
+    return response.status_code == 200 and 'Content-Location' in response.headers
+
 @app.route('/analyze', methods=['POST'])
 @limiter.limit("5 per minute")  # More restrictive for analysis endpoint
 @log_request
+@idempotent(replayable_analysis)
 def analyze():
     try:
         data = request.get_json()
@@ -372,17 +1146,46 @@ def analyze():
         text = data.get('text', '').strip()
         url = data.get('url', '').strip()
         source = data.get('source', '').strip()
+        metadata = {}
+        # Clients may demote their own work (X-Priority: api, batch or prefetch)
+        lane = request.headers.get('X-Priority', 'interactive')
+        if lane not in LANES:
+            return jsonify({'error': 'Μη έγκυρη προτεραιότητα'}), 400
+        tenant = get_remote_address()
+        try:
+            backend = llm.get(data.get('backend'), lane=lane)
+        except KeyError:
+            return jsonify({'error': 'Άγνωστο μοντέλο ανάλυσης'}), 400
         
         # Validate input
         if not text and not url:
             return jsonify({'error': 'Παρακαλώ εισάγετε κείμενο ή URL'}), 400
+        canonical = canonicalize_url(url) if url else ''
         
         if url and not text:
             # Validate URL format
             if not url.startswith(('http://', 'https://')):
                 return jsonify({'error': 'Μη έγκυρη διεύθυνση URL'}), 400
-                
-            text = extract_text_from_url(url)
+
+            # Articles already analyzed (e.g. pre-warmed from feeds) skip the fetch,
+            # until it is time to look for an update (ARTICLE_RECHECK_INTERVAL)
+            known = url_index.get(canonical)
+            if known and known['key'] in analysis_cache and not data.get('backend') \
+                    and not article_versions.due(canonical):
+                logger.info("Returning cached analysis for known URL")
+                count_hit(known['key'])
+                return analysis_created({
+                    'key': known['key'],
+                    'analysis': analysis_cache[known['key']],
+                    'text_length': known['text_length'],
+                    'source': source if source else 'Άγνωστη',
+                    # Kept from when the article was fetched, since its text is not fetched again
+                    'highlights': known.get('highlights', []),
+                    'versions': article_versions.history(canonical),
+                    'success': True
+                }, url)
+
+            text, metadata = extract_article(url, lane, tenant)
             if text.startswith("Error"):
                 return jsonify({'error': text}), 400
         
@@ -394,16 +1197,89 @@ def analyze():
         if len(text) > 10000:
             return jsonify({'error': 'Το κείμενο είναι πολύ μεγάλο (μέγιστο 10,000 χαρακτήρες)'}), 400
         
+        # An article seen before is compared paragraph by paragraph with its last version
+        change = article_versions.compare(canonical, text) if url and not data.get('backend') else None
+        previous = change.previous if change else None
+        previous_analysis = analysis_cache.get(previous.key) if previous else None
+        cache_key = get_cache_key(text, source, metadata, backend)
+        # Lexicon words to highlight, as UTF-16 offsets into the analyzed text with the words themselves
+        highlights = loaded_language.annotate(text)
+        mode, update, refresh = 'full', None, False
+        if previous_analysis is not None:
+            if change.unchanged:
+                logger.info("Article unchanged since its last version")
+                count_hit(previous.key)
+                url_index[canonical] = {'key': previous.key, 'text_length': len(text), 'highlights': highlights}
+                return analysis_created({
+                    'key': previous.key,
+                    'analysis': previous_analysis,
+                    'text_length': len(text),
+                    'source': source if source else 'Άγνωστη',
+                    'metadata': metadata,
+                    'highlights': highlights,
+                    'versions': article_versions.history(canonical),
+                    'success': True
+                }, url)
+            # An update below the first 1000 characters keeps the cache key, so replace its analysis
+            refresh = cache_key == previous.key
+            if refresh or cache_key not in analysis_cache:
+                if not change.changed:
+                    # Only deletions: the previous analysis still covers what is left
+                    mode = 'carried'
+                    analysis_cache.set(cache_key, previous_analysis, analysis_cache.version_of(previous.key))
+                elif change.share <= article_versions.max_share:
+                    mode, update = 'partial', (previous_analysis, change)
+        elif change is not None and cache_key in analysis_cache \
+                and content_index.get((content_hash(text), source), {}).get('key') != cache_key:
+            # No history for the URL, and the cached analysis under this key is not known to
+            # cover this exact text (the key only sees its start), so it may predate an update
+            refresh = True
+
         # Perform analysis
-        analysis = analyze_greek_news(text, source)
+        degraded = False
+        try:
+            if mode == 'carried':
+                analysis = previous_analysis
+            else:
+                analysis = analyze_greek_news(text, source, url, metadata, backend, lane, tenant, refresh, update)
+        except Overloaded as e:
+            # Offer the overflow lane's backend (e.g. the local model) before giving up
+            overflow = llm.get(lane='overflow')
+            if 'overflow' not in llm.lanes or overflow is backend or isinstance(e, SpendCapReached):
+                return overloaded_response(e)
+            logger.warning(f"{backend.name} overloaded, analyzing with {overflow.name}")
+            backend, degraded = overflow, True
+            try:
+                analysis = analyze_greek_news(text, source, url, metadata, backend, lane, tenant, refresh, update)
+            except Overloaded as e:
+                return overloaded_response(e)
+        cache_key = get_cache_key(text, source, metadata, backend)
+        stored = cache_key in analysis_cache
+        if stored:
+            entry = {'key': cache_key, 'text_length': len(text), 'highlights': highlights}
+            content_index[(content_hash(text), source)] = entry
+            if url:
+                url_index[canonical] = entry
+        if change is not None and not degraded and analysis_cache.get(cache_key) == analysis:
+            article_versions.add(canonical, change, cache_key, mode, extract_score(analysis))
         
-        return jsonify({
+        return analysis_created({
+            'key': cache_key if stored else None,
             'analysis': analysis,
             'text_length': len(text),
             'source': source if source else 'Άγνωστη',
+            'metadata': metadata,
+            'highlights': highlights,
+            'degraded': degraded,
+            # Tokens and cost of the LLM call, on request (null when served from the cache)
+            **({'usage': g.get('llm_usage')} if data.get('include_usage') else {}),
+            **({'versions': article_versions.history(canonical)} if change is not None else {}),
             'success': True
-        })
+        }, url)
         
+    except Overloaded as e:
+        # No slot to fetch the article in time
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error in analyze endpoint: {str(e)}")
         return jsonify({'error': f'Σφάλμα: {str(e)}', 'success': False}), 500
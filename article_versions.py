@@ -0,0 +1,326 @@
+"""Per-URL content versions of analyzed articles, for re-analyzing only what changed.
+
+Greek outlets update articles in place ("ΕΝΗΜΕΡΩΣΗ"). Each analyzed URL
+keeps a short history of versions. A version holds a hash per paragraph of
+the folded text, so accent, case and whitespace edits do not count as
+changes. When the URL is fetched again, the paragraph hashes are diffed
+against the latest version (``difflib`` opcodes):
+
+* nothing changed - the previous analysis is served, with no LLM call;
+* at most ``max_share`` of the text changed - only the new and changed
+  paragraphs are analyzed, and their scores are merged into the previous
+  analysis, weighted by length (``merge_update``);
+* more changed - the whole article is analyzed again.
+
+Extraction collapses whitespace, so paragraph breaks are usually lost.
+Text without line breaks is cut into blocks of sentences instead. A block
+ends after a sentence whose hash hits a fixed residue once the block is
+long enough. Boundaries therefore depend on the local content, so an edit
+changes only the blocks around it.
+
+The versions live in one SQLite file (``ARTICLE_VERSIONS_DB_PATH``, by
+default next to ``CACHE_SNAPSHOT_PATH``), so every gunicorn worker compares
+against the same history. Without either path they are kept in process
+memory. The index is bounded to ``max_urls`` least recently checked URLs.
+"""
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from background import SQLiteConnections
+from greek_text import fold, normalize, normalize_whitespace
+from score_extractor import SCORE_REGEX, SECTION_REGEX, SECTION_SCORE_REGEX, extract_score, extract_section_scores
+
+DEFAULT_MAX_URLS = 10000
+DEFAULT_MAX_VERSIONS = 10
+DEFAULT_RECHECK_INTERVAL = 600
+# Largest share of the text re-analyzed on its own; beyond it the whole article is
+DEFAULT_MAX_SHARE = 0.5
+
+# Sentence blocks for text without line breaks
+SENTENCE_END = re.compile(r'(?<=[.!;?…»])\s+')
+MIN_BLOCK = 200
+MAX_BLOCK = 1000
+BOUNDARY_MODULUS = 3
+
+UPDATE_NOTE = ("Πρόκειται για ενημέρωση άρθρου που έχει ήδη αναλυθεί. Το κείμενο περιέχει μόνο "
+               "τις νέες ή αλλαγμένες παραγράφους· αξιολογήστε μόνο αυτές.")
+UPDATE_HEADER = ("**ΕΝΗΜΕΡΩΣΗ ΑΡΘΡΟΥ:** Αναλύθηκαν ξανά μόνο οι αλλαγμένες παράγραφοι ({share}% του κειμένου). "
+                 "Οι βαθμολογίες συνδυάζουν την προηγούμενη ανάλυση με τις αλλαγές.\n\n")
+
+
+def split_paragraphs(text):
+    """Paragraphs of ``text``: its lines if it has any, else content-defined blocks of sentences"""
+    lines = [normalize_whitespace(line) for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    if len(lines) > 1:
+        return lines
+    blocks, current, length = [], [], 0
+    for sentence in SENTENCE_END.split(normalize_whitespace(text)):
+        current.append(sentence)
+        length += len(sentence) + 1
+        if length >= MAX_BLOCK or (length >= MIN_BLOCK and _digest(sentence) % BOUNDARY_MODULUS == 0):
+            blocks.append(' '.join(current))
+            current, length = [], 0
+    if current:
+        blocks.append(' '.join(current))
+    return [block for block in blocks if block]
+
+
+def _digest(sentence):
+    return int.from_bytes(hashlib.blake2b(normalize(sentence).encode('utf-8'), digest_size=4).digest(), 'big')
+
+
+def paragraph_hash(paragraph):
+    return hashlib.blake2b(normalize(paragraph).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ArticleVersion:
+    """One fetched version of an article and how it was analyzed"""
+
+    __slots__ = ('number', 'timestamp', 'key', 'hashes', 'lengths', 'changed', 'mode', 'score')
+
+    def __init__(self, number, timestamp, key, hashes, lengths, changed, mode, score):
+        self.number = number
+        self.timestamp = timestamp
+        self.key = key
+        self.hashes = hashes
+        self.lengths = lengths
+        self.changed = changed
+        self.mode = mode
+        self.score = score
+
+    def to_dict(self):
+        return {
+            'version': self.number,
+            'timestamp': self.timestamp,
+            'key': self.key,
+            'paragraphs': len(self.hashes),
+            'changed_paragraphs': self.changed,
+            'analysis': self.mode,
+            'score': self.score,
+        }
+
+
+class Change:
+    """How a fetched text differs from the latest version of its URL"""
+
+    def __init__(self, paragraphs, previous=None):
+        self.paragraphs = paragraphs
+        self.hashes = [paragraph_hash(paragraph) for paragraph in paragraphs]
+        self.previous = previous
+        # Indices of new or changed paragraphs, and the share of the text they (and deletions) make up
+        self.changed = []
+        self.share = 1.0
+        if previous is None:
+            self.changed = list(range(len(paragraphs)))
+            return
+        changed_chars = deleted_chars = 0
+        matcher = difflib.SequenceMatcher(None, previous.hashes, self.hashes, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag in ('replace', 'insert'):
+                self.changed.extend(range(j1, j2))
+                changed_chars += sum(len(paragraph) for paragraph in paragraphs[j1:j2])
+            if tag == 'delete':
+                deleted_chars += sum(previous.lengths[i1:i2])
+        total = max(sum(len(paragraph) for paragraph in paragraphs), 1)
+        self.share = min(1.0, changed_chars / total + deleted_chars / max(sum(previous.lengths), 1))
+
+    @property
+    def unchanged(self):
+        return self.previous is not None and self.hashes == self.previous.hashes
+
+    def changed_text(self):
+        """The new and changed paragraphs, for analysis on their own"""
+        return '\n\n'.join(self.paragraphs[i] for i in self.changed)
+
+
+def merge_update(previous_analysis, update_analysis, share):
+    """The update's analysis with each score replaced by its length-weighted mix with the previous one.
+
+    The overall and section scores of ``update_analysis`` (which covered only
+    the changed ``share`` of the text) are averaged with the previous ones;
+    sections the previous analysis had no score for keep the update's.
+    """
+    previous_overall = extract_score(previous_analysis)
+    previous_sections = extract_section_scores(previous_analysis)
+
+    def mix(previous, new):
+        return new if previous is None else max(1, min(100, round(previous * (1 - share) + new * share)))
+
+    folded = fold(update_analysis)
+    replacements = []
+    match = SCORE_REGEX.search(folded)
+    if match and 1 <= int(match.group(1)) <= 100:
+        replacements.append((match.span(1), mix(previous_overall, int(match.group(1)))))
+    sections = list(SECTION_REGEX.finditer(update_analysis))
+    for i, section in enumerate(sections):
+        end = sections[i + 1].start() if i + 1 < len(sections) else len(update_analysis)
+        score = SECTION_SCORE_REGEX.search(folded, section.end(), end)
+        if score and 1 <= int(score.group(1)) <= 100:
+            replacements.append((score.span(1), mix(previous_sections.get(section.group(2).strip()),
+                                                    int(score.group(1)))))
+    merged = update_analysis
+    # Folding keeps offsets, so spans found in the folded text apply to the original
+    for (start, end), value in sorted(replacements, reverse=True):
+        merged = merged[:start] + str(value) + merged[end:]
+    return UPDATE_HEADER.format(share=round(share * 100)) + merged
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS article_versions (
+    url TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    version TEXT NOT NULL,
+    PRIMARY KEY (url, number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS article_checks (
+    url TEXT PRIMARY KEY,
+    checked REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS article_checks_checked ON article_checks (checked);
+"""
+# Surplus URLs are trimmed on every Nth new version per process
+TRIM_EVERY = 100
+
+
+class VersionIndex:
+    """Bounded map of canonical URL -> its recent versions, in SQLite or (without a file) in memory"""
+
+    def __init__(self, max_urls=DEFAULT_MAX_URLS, max_versions=DEFAULT_MAX_VERSIONS,
+                 recheck_interval=DEFAULT_RECHECK_INTERVAL, max_share=DEFAULT_MAX_SHARE, path=None):
+        self.max_urls = max_urls
+        self.max_versions = max_versions
+        self.recheck_interval = recheck_interval
+        self.max_share = max_share
+        self.path = path
+        self._connections = SQLiteConnections(path, SCHEMA, isolation_level=None) if path else None
+        self._urls = OrderedDict()
+        # Canonical URL -> when it was last fetched and compared
+        self._checked = {}
+        self._lock = threading.Lock()
+        self._adds = 0
+
+    @classmethod
+    def from_env(cls):
+        snapshot = os.getenv('CACHE_SNAPSHOT_PATH')
+        return cls(
+            max_urls=int(os.getenv('ARTICLE_VERSIONS_MAX_URLS', DEFAULT_MAX_URLS)),
+            recheck_interval=int(os.getenv('ARTICLE_RECHECK_INTERVAL', DEFAULT_RECHECK_INTERVAL)),
+            max_share=float(os.getenv('ARTICLE_UPDATE_MAX_SHARE', DEFAULT_MAX_SHARE)),
+            path=os.getenv('ARTICLE_VERSIONS_DB_PATH') or (f"{snapshot}.versions.db" if snapshot else None)
+        )
+
+    def _write(self, func):
+        """Run ``func(conn)`` in one immediate transaction"""
+        conn = self._connections.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(conn)
+            conn.execute('COMMIT')
+            return result
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _versions(self, url):
+        if self._connections is None:
+            with self._lock:
+                return list(self._urls.get(url, []))
+        rows = self._connections.get().execute(
+            'SELECT version FROM article_versions WHERE url = ? ORDER BY number', (url,))
+        return [ArticleVersion(*json.loads(row[0])) for row in rows]
+
+    def latest(self, url):
+        if self._connections is None:
+            with self._lock:
+                versions = self._urls.get(url)
+                return versions[-1] if versions else None
+        row = self._connections.get().execute(
+            'SELECT version FROM article_versions WHERE url = ? ORDER BY number DESC LIMIT 1', (url,)).fetchone()
+        return ArticleVersion(*json.loads(row[0])) if row else None
+
+    def due(self, url, now=None):
+        """Whether a versioned URL was last compared ``recheck_interval`` or more seconds ago"""
+        now = time.time() if now is None else now
+        if self._connections is None:
+            with self._lock:
+                checked = self._checked.get(url)
+        else:
+            row = self._connections.get().execute('SELECT checked FROM article_checks WHERE url = ?',
+                                                  (url,)).fetchone()
+            checked = row[0] if row else None
+        return checked is not None and now - checked >= self.recheck_interval
+
+    def compare(self, url, text, now=None):
+        """Diff ``text`` against the latest version of ``url`` and note the check"""
+        change = Change(split_paragraphs(text), self.latest(url))
+        now = time.time() if now is None else now
+        if self._connections is None:
+            with self._lock:
+                if url in self._urls:
+                    self._checked[url] = now
+        elif change.previous is not None:
+            self._write(lambda conn: conn.execute('UPDATE article_checks SET checked = ? WHERE url = ?', (now, url)))
+        return change
+
+    def add(self, url, change, key, mode, score, now=None):
+        """Record a new version of ``url`` analyzed as ``mode`` ('full', 'partial' or 'carried')"""
+        now = time.time() if now is None else now
+
+        def version(previous):
+            return ArticleVersion(
+                previous.number + 1 if previous else 1, now, key, change.hashes,
+                [len(paragraph) for paragraph in change.paragraphs],
+                change.changed if change.previous is not None else [], mode, score)
+
+        if self._connections is None:
+            with self._lock:
+                versions = self._urls.pop(url, [])
+                versions.append(version(versions[-1] if versions else None))
+                self._urls[url] = versions[-self.max_versions:]
+                self._checked[url] = now
+                while len(self._urls) > self.max_urls:
+                    evicted, _ = self._urls.popitem(last=False)
+                    self._checked.pop(evicted, None)
+            return
+
+        def write(conn):
+            # Numbered in the transaction, so workers adding versions of one URL do not collide
+            added = version(self.latest(url))
+            conn.execute('INSERT INTO article_versions (url, number, version) VALUES (?, ?, ?)',
+                         (url, added.number, json.dumps([getattr(added, slot) for slot in ArticleVersion.__slots__])))
+            conn.execute('DELETE FROM article_versions WHERE url = ? AND number <= ?',
+                         (url, added.number - self.max_versions))
+            conn.execute('INSERT OR REPLACE INTO article_checks (url, checked) VALUES (?, ?)', (url, now))
+
+        self._write(write)
+        self._adds += 1
+        if self._adds % TRIM_EVERY == 0:
+            self.trim()
+
+    def trim(self):
+        """Forget the least recently checked URLs beyond ``max_urls``"""
+        if self._connections is None:
+            return 0
+
+        def write(conn):
+            surplus = conn.execute('SELECT COUNT(*) FROM article_checks').fetchone()[0] - self.max_urls
+            if surplus <= 0:
+                return 0
+            urls = [row[0] for row in conn.execute(
+                'SELECT url FROM article_checks ORDER BY checked LIMIT ?', (surplus,)).fetchall()]
+            conn.executemany('DELETE FROM article_versions WHERE url = ?', [(url,) for url in urls])
+            conn.executemany('DELETE FROM article_checks WHERE url = ?', [(url,) for url in urls])
+            return len(urls)
+
+        return self._write(write)
+
+    def history(self, url):
+        """Versions of ``url``, oldest first, for API responses"""
+        return [version.to_dict() for version in self._versions(url)]
@@ -58,7 +58,7 @@ After=network.target
 User=$USER
 WorkingDirectory=/var/www/epap
 Environment=PATH=/var/www/epap/venv/bin
-ExecStart=/var/www/epap/venv/bin/gunicorn --bind 127.0.0.1:5000 --workers 2 --timeout 120 app:app
+ExecStart=/var/www/epap/venv/bin/gunicorn --config gunicorn.conf.py --bind 127.0.0.1:5000 --workers 2 --timeout 120 app:app
 Restart=always
 
 [Install]
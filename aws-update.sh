@@ -160,7 +160,7 @@ User=$APP_USER
 WorkingDirectory=$APP_DIR
 Environment=PATH=$APP_DIR/venv/bin
 Environment=FLASK_ENV=production
-ExecStart=$APP_DIR/venv/bin/gunicorn --bind 127.0.0.1:5000 --workers 3 --timeout 120 --max-requests 1000 --max-requests-jitter 100 app:app
+ExecStart=$APP_DIR/venv/bin/gunicorn --config gunicorn.conf.py --bind 127.0.0.1:5000 --workers 3 --timeout 120 --max-requests 1000 --max-requests-jitter 100 app:app
 Restart=always
 RestartSec=10
 
@@ -0,0 +1,166 @@
+"""Background threads and cross-worker coordination shared by the ΕΠΑΠ subsystems.
+
+Gunicorn forks workers after the app module may already have been imported,
+and threads do not survive a fork. Workers here are therefore started lazily
+and remember the pid that started them, so a forked child starts its own copy
+on first use instead of relying on a dead parent thread. SQLite connections
+are handled the same way (``SQLiteConnections``).
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """Run a callable every ``interval`` seconds on a daemon thread"""
+
+    def __init__(self, name, interval, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def ensure_started(self):
+        """Start the thread in this process if it is not already running"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        self._stop.set()
+        self._pid = None
+
+    def _run(self):
+        stop = self._stop
+        while not stop.wait(self.interval):
+            try:
+                self.func()
+            except Exception as e:
+                logger.error(f"Background worker {self.name} failed: {str(e)}")
+
+
+class BatchWriter:
+    """Collect items from request threads and hand them to ``flush`` in batches.
+
+    ``submit`` never blocks: when the queue is full the item is dropped and
+    counted, so a slow disk can never stall a request.
+    """
+
+    def __init__(self, name, flush, batch_size=500, flush_interval=1.0, max_queue=100000):
+        self.name = name
+        self.flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def drain(self):
+        """Flush everything queued so far on the calling thread"""
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            self.flush(batch)
+        except Exception as e:
+            logger.error(f"Batch writer {self.name} failed to flush {len(batch)} items: {str(e)}")
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on ``path + '.lock'`` to serialise writers across workers"""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(f"{path}.lock", 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class SQLiteConnections:
+    """One SQLite connection per thread and process, opened lazily on a shared file.
+
+    Each connection applies ``pragmas`` and runs ``schema`` when it is opened.
+    The pid is remembered, so a forked child opens its own connection instead
+    of sharing its parent's. Extra keyword arguments go to ``sqlite3.connect``
+    (e.g. ``isolation_level=None`` for stores that manage transactions).
+    """
+
+    def __init__(self, path, schema, pragmas=('journal_mode=WAL', 'synchronous=NORMAL'), **connect_args):
+        self.path = path
+        self.schema = schema
+        self.pragmas = pragmas
+        self.connect_args = dict({'timeout': 30}, **connect_args)
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, **self.connect_args)
+            for pragma in self.pragmas:
+                conn.execute(f'PRAGMA {pragma}')
+            conn.executescript(self.schema)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
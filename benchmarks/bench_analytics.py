@@ -0,0 +1,96 @@
+"""Benchmark the analytics store at scale.
+
+Loads N synthetic analyses (default one million) spread over 90 days and 40
+outlets through the same batched write path the app uses, then times the
+aggregate queries served by GET /analytics.
+
+    python benchmarks/bench_analytics.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from analytics import AnalyticsStore, ROW_FIELDS  # noqa: E402
+
+DOMAINS = [f'outlet{i}.gr' for i in range(40)]
+TOPICS = ['politiki', 'oikonomia', 'kosmos', 'athlitika', 'koinonia', 'politismos']
+
+
+def synthetic_rows(count, end_ts, days=90, seed=7):
+    rng = random.Random(seed)
+    start_ts = end_ts - days * 86400
+    for i in range(count):
+        domain = rng.choice(DOMAINS)
+        yield (
+            rng.uniform(start_ts, end_ts),
+            f'https://{domain}/{rng.choice(TOPICS)}/{i}',
+            domain,
+            rng.choice(TOPICS),
+            rng.randint(1, 100),
+            'mistral-large-latest',
+            rng.randint(900, 1500),
+            rng.randint(400, 900),
+            rng.uniform(2.0, 12.0),
+            f'{i:032x}',
+        )
+
+
+def timed(label, func, repeat=20):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+    print(f"  {label:<42} {elapsed:8.2f} ms   ({len(result)} rows)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=5000)
+    parser.add_argument('--db', default=None, help='database path (default: temporary file)')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='epap-bench-'), 'analytics.db')
+    store = AnalyticsStore(path)
+    end_ts = time.time()
+
+    print(f"Loading {args.rows:,} rows into {path}")
+    started = time.perf_counter()
+    batch = []
+    for row in synthetic_rows(args.rows, end_ts):
+        batch.append(row)
+        if len(batch) >= args.batch:
+            store.write_batch(batch)
+            batch = []
+    if batch:
+        store.write_batch(batch)
+    load = time.perf_counter() - started
+    print(f"  load: {load:.1f}s ({args.rows / load:,.0f} rows/s, {len(ROW_FIELDS)} columns)")
+
+    enqueue_started = time.perf_counter()
+    sample = dict(zip(ROW_FIELDS, next(synthetic_rows(1, end_ts))))
+    for _ in range(10000):
+        store.writer.queue.put_nowait(tuple(sample.get(f) for f in ROW_FIELDS))
+    enqueue = (time.perf_counter() - enqueue_started) / 10000 * 1e6
+    print(f"  request-path enqueue cost: {enqueue:.2f} us/row")
+    store.flush()
+
+    print("Queries:")
+    week = end_ts - 7 * 86400
+    timed('one outlet, last week, daily', lambda: store.aggregate('outlet3.gr', since=week, bucket='day'))
+    timed('one outlet + topic, last week, hourly',
+          lambda: store.aggregate('outlet3.gr', 'politiki', since=week, bucket='hour'))
+    timed('all outlets, 90 days, weekly',
+          lambda: store.aggregate(since=end_ts - 90 * 86400, bucket='week'))
+    timed('top outlets, last week', lambda: store.top_domains(since=week))
+
+
+if __name__ == '__main__':
+    main()
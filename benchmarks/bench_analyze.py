@@ -0,0 +1,79 @@
+"""Benchmark the full POST /analyze path offline with replayed LLM fixtures.
+
+Every analysis goes through validation, caching, the prompt, the backend
+and all analysis listeners. The LLM answers come from recorded fixtures,
+served after the recorded latency times --scale, so no network is needed.
+Articles are never recorded verbatim: they are matched to fixtures by
+hash. Record fixtures first by running the app, or any traffic, with:
+
+    LLM_FIXTURES_MODE=record LLM_FIXTURES_PATH=fixtures/llm python app.py
+
+    python benchmarks/bench_analyze.py --fixtures fixtures/llm --requests 200 --concurrency 8 --scale 0.1
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import app as app_module  # noqa: E402
+from llm_backends import BackendRegistry  # noqa: E402
+from llm_fixtures import FixtureStore, wrap_backends  # noqa: E402
+
+SENTENCES = [
+    'Η κυβέρνηση ανακοίνωσε νέο πακέτο μέτρων στήριξης για τα νοικοκυριά.',
+    'Η αντιπολίτευση κατηγορεί την κυβέρνηση για προεκλογικές παροχές.',
+    'Σύμφωνα με στοιχεία της ΕΛΣΤΑΤ, ο πληθωρισμός υποχώρησε στο 2,4%.',
+    'Οι αναλυτές εκτιμούν ότι το κόστος θα ξεπεράσει τα 500 εκατ. ευρώ.',
+]
+
+
+def article(i, length):
+    text = f'Άρθρο {i}. '
+    while len(text) < length:
+        text += SENTENCES[(len(text) + i) % len(SENTENCES)] + ' '
+    return text[:length]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default='fixtures/llm')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier on recorded latencies')
+    parser.add_argument('--length', type=int, default=3000, help='characters per article')
+    args = parser.parse_args()
+    store = FixtureStore(args.fixtures)
+    if not len(store):
+        parser.error(f"no fixtures in {args.fixtures}; record some first (see above)")
+
+    app_module.limiter.enabled = False
+    app_module.llm = BackendRegistry(
+        wrap_backends(list(app_module.llm), 'replay', args.fixtures, args.scale, match='any'),
+        app_module.llm.default.name, app_module.llm.lanes)
+    client = app_module.app.test_client()
+    texts = [article(i, args.length) for i in range(args.requests)]
+
+    def post(text):
+        started = time.perf_counter()
+        response = client.post('/analyze', json={'text': text, 'source': 'benchmark'})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        latencies = sorted(pool.map(post, texts))
+    elapsed = time.perf_counter() - started
+    model = app_module.llm.default.stats.summary()
+    print(f"{args.requests} analyses replayed from {len(store)} fixtures, concurrency {args.concurrency}, "
+          f"latency x{args.scale}")
+    print(f"  request  p50 {statistics.median(latencies):8.1f} ms   p95 {latencies[int(len(latencies) * 0.95)]:8.1f} ms")
+    print(f"  model    p50 {model['latency_p50'] * 1000:8.1f} ms   p95 {model['latency_p95'] * 1000:8.1f} ms")
+    print(f"  throughput {args.requests / elapsed:.1f} analyses/s")
+
+
+if __name__ == '__main__':
+    main()
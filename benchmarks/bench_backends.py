@@ -0,0 +1,72 @@
+"""Benchmark the configured LLM backends on the real analysis prompt.
+
+Sends REQUESTS analyses of synthetic Greek articles to each backend named
+on the command line, CONCURRENCY at a time, and prints latency percentiles
+and throughput from the backends' own statistics. Backends are configured
+as for the app (MISTRAL_API_KEY, LLM_OPENAI_BASE_URL, LLM_LOCAL_MODEL_PATH),
+so this makes real, billable calls to remote backends.
+
+    python benchmarks/bench_backends.py local openai --requests 20 --concurrency 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import app as app_module  # noqa: E402
+
+SENTENCES = [
+    'Η κυβέρνηση ανακοίνωσε νέο πακέτο μέτρων στήριξης για τα νοικοκυριά.',
+    'Η αντιπολίτευση κατηγορεί την κυβέρνηση για προεκλογικές παροχές.',
+    'Σύμφωνα με στοιχεία της ΕΛΣΤΑΤ, ο πληθωρισμός υποχώρησε στο 2,4%.',
+    'Οι αναλυτές εκτιμούν ότι το κόστος θα ξεπεράσει τα 500 εκατ. ευρώ.',
+]
+
+
+def article(i, length):
+    text = f'Άρθρο {i}. '
+    while len(text) < length:
+        text += SENTENCES[len(text) % len(SENTENCES)] + ' '
+    return text[:length]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('backends', nargs='+', help='backend names, e.g. mistral openai local')
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--length', type=int, default=2000, help='characters per article')
+    args = parser.parse_args()
+    missing = [name for name in args.backends if name not in app_module.llm]
+    if missing:
+        parser.error(f"not configured: {', '.join(missing)}")
+
+    prompts = [
+        [{'role': 'user', 'content': app_module.ANALYSIS_PROMPT.format(
+            text=article(i, args.length), source='benchmark', source_context='')}]
+        for i in range(args.requests)
+    ]
+    print(f"{args.requests} analyses of {args.length}-character articles, concurrency {args.concurrency}")
+    print(f"  {'backend':<28} {'p50 s':>7} {'p95 s':>7} {'errors':>6} {'req/min':>8} {'tok/s':>7}")
+    for name in args.backends:
+        backend = app_module.llm.get(name)
+        backend.warm_up()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            for future in [pool.submit(backend.complete, messages, app_module.ANALYSIS_TEMPERATURE)
+                           for messages in prompts]:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"  {name}: {e}", file=sys.stderr)
+        elapsed = time.perf_counter() - started
+        summary = backend.stats.summary()
+        print(f"  {backend.model_id[:28]:<28} {summary['latency_p50'] or 0:>7.2f} {summary['latency_p95'] or 0:>7.2f} "
+              f"{summary['errors']:>6} {args.requests / elapsed * 60:>8.1f} {summary['tokens_per_second'] or 0:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark page latency during an LLM brownout, with and without admission control.
+
+Models one gthread worker as a pool of THREADS request threads. Analyses
+of unique articles arrive at RATE per second for DURATION seconds. The
+backend is stubbed to take --llm-latency seconds, well above the admission
+latency target. Meanwhile /health is probed every 100 ms through the same
+pool. Without admission control, analyses take every thread and the probes
+queue behind them. With it, at most the adaptive limit wait on the LLM,
+the rest are shed with 503 + Retry-After, and /health stays fast.
+
+    python benchmarks/bench_brownout.py --threads 8 --rate 4 --duration 10 --llm-latency 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import app as app_module  # noqa: E402
+from admission import AdmissionControl  # noqa: E402
+from cache_snapshot import SnapshotCache  # noqa: E402
+from llm_backends import BackendRegistry, Completion, LLMBackend  # noqa: E402
+
+
+class SlowBackend(LLMBackend):
+    name = 'mistral'
+
+    def __init__(self, latency):
+        super().__init__('brownout')
+        self.latency = latency
+
+    def _complete(self, messages, temperature):
+        time.sleep(self.latency)
+        return Completion('**ΣΥΝΟΛΙΚΗ ΑΞΙΟΛΟΓΗΣΗ: 60/100**', {})
+
+
+def run(args, admission):
+    client = app_module.app.test_client()
+    registry = BackendRegistry([SlowBackend(args.llm_latency)], 'mistral')
+
+    def analyze(i):
+        started = time.perf_counter()
+        text = f'Άρθρο {i}: η κυβέρνηση ανακοίνωσε νέα μέτρα στήριξης για τα νοικοκυριά. ' * 3
+        status = client.post('/analyze', json={'text': text}).status_code
+        return status, time.perf_counter() - started
+
+    def probe(submitted):
+        client.get('/health')
+        return time.perf_counter() - submitted
+
+    with patch.object(app_module, 'llm', registry), patch.object(app_module, 'admission', admission), \
+            patch.object(app_module, 'analysis_cache', SnapshotCache()), ThreadPoolExecutor(args.threads) as pool:
+        analyses, probes = [], []
+        started = time.perf_counter()
+        next_analysis = next_probe = started
+        i = 0
+        while time.perf_counter() - started < args.duration:
+            now = time.perf_counter()
+            if now >= next_analysis:
+                analyses.append(pool.submit(analyze, i))
+                i += 1
+                next_analysis += 1 / args.rate
+            if now >= next_probe:
+                probes.append(pool.submit(probe, now))
+                next_probe += 0.1
+            time.sleep(0.005)
+        statuses = [future.result()[0] for future in analyses]
+        waits = sorted(future.result() * 1000 for future in probes)
+    return statuses, waits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=4, help='analyses per second')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--llm-latency', type=float, default=3)
+    args = parser.parse_args()
+    app_module.limiter.enabled = False
+
+    print(f"{args.threads} threads, {args.rate:g} analyses/s for {args.duration:g}s, LLM latency {args.llm_latency:g}s")
+    print(f"  {'admission':<10} {'200':>5} {'503':>5} {'/health p50 ms':>15} {'p99 ms':>9} {'max ms':>9}")
+    for label, admission in (('off', None), ('on', AdmissionControl(max_limit=4, max_queue=2, max_wait=1,
+                                                                     latency_target=args.llm_latency / 2))):
+        statuses, waits = run(args, admission)
+        print(f"  {label:<10} {statuses.count(200):>5} {statuses.count(503):>5} {statistics.median(waits):>15.1f} "
+              f"{waits[int(len(waits) * 0.99)]:>9.1f} {waits[-1]:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
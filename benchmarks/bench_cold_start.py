@@ -0,0 +1,87 @@
+"""Benchmark cold start: importing ``app`` and serving the first ``/health``.
+
+Each run is a fresh interpreter, as for a new Vercel invocation or a gunicorn
+worker without preload. Reports the median over the runs, the time of
+``app.warm_up()`` (paid once in the gunicorn master with preload), and the
+slowest imports from ``python -X importtime``. Pass ``--app-dir`` to measure
+another checkout, e.g. the previous commit:
+
+    git worktree add /tmp/base HEAD~1
+    python benchmarks/bench_cold_start.py --app-dir /tmp/base
+    python benchmarks/bench_cold_start.py
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+PROBE = """
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/health')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+warm_up = 0.0
+if hasattr(app, 'warm_up'):
+    app.warm_up()
+    warm_up = time.perf_counter() - served
+print(imported - started, served - imported, warm_up)
+"""
+
+IMPORTTIME_REGEX = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def run(app_dir, env):
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=app_dir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return [float(value) * 1000 for value in output.split()[-3:]]
+
+
+def slowest_imports(app_dir, env, top):
+    """Packages imported directly by app, by cumulative import time (ms)"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=app_dir,
+                            env=env, capture_output=True, text=True, check=True).stderr
+    totals, children = {}, []
+    for _, cumulative, indent, name in IMPORTTIME_REGEX.findall(stderr):
+        # Children are printed before their parent, one indentation step deeper
+        if len(indent) == 1:
+            if name == 'app':
+                for child, ms in children:
+                    totals[child.split('.')[0]] = totals.get(child.split('.')[0], 0) + ms
+            children = []
+        elif len(indent) == 3:
+            children.append((name, int(cumulative) / 1000))
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app-dir', default=ROOT)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ, MISTRAL_API_KEY=os.getenv('MISTRAL_API_KEY', 'benchmark'),
+               PYTHONDONTWRITEBYTECODE='1', PYTHONWARNINGS='ignore')
+    run(args.app_dir, env)  # populate the OS page cache and __pycache__
+    results = [run(args.app_dir, env) for _ in range(args.runs)]
+    imported, served, warm_up = (statistics.median(column) for column in zip(*results))
+
+    print(f"{os.path.abspath(args.app_dir)} ({args.runs} fresh interpreters, median)")
+    print(f"  import app          {imported:8.1f} ms")
+    print(f"  first GET /health   {served:8.1f} ms")
+    print(f"  cold start total    {imported + served:8.1f} ms")
+    print(f"  app.warm_up()       {warm_up:8.1f} ms")
+    print("\nSlowest imports of 'import app' (cumulative ms):")
+    for package, ms in slowest_imports(args.app_dir, env, args.top):
+        print(f"  {package:<20}{ms:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
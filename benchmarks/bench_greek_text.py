@@ -0,0 +1,86 @@
+"""Benchmark Greek text normalisation throughput in MB/s.
+
+Builds a corpus of Greek news-style documents (mixed case, accents,
+punctuation, numbers) and times each greek_text entry point per document
+and in batch, with and without NumPy, against the regex cleanup it replaces.
+Throughput is measured over the UTF-8 size of the corpus.
+
+    python benchmarks/bench_greek_text.py --docs 5000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import greek_text  # noqa: E402
+
+SENTENCES = [
+    'Η κυβέρνηση ανακοίνωσε νέα μέτρα στήριξης για τα νοικοκυριά, ύψους 1,2 δισ. ευρώ.',
+    'Ο υπουργός Οικονομικών δήλωσε ότι «η ανάπτυξη θα ξεπεράσει το 2,5% το 2025».',
+    'ΕΚΤΑΚΤΟ: Σεισμός 5,3 Ρίχτερ αισθητός στην Αθήνα και τα νησιά του Αιγαίου.',
+    'Η αντιπολίτευση κατηγορεί την κυβέρνηση για την ακρίβεια στα τρόφιμα και την ενέργεια.',
+    'Σύμφωνα με πηγές του Μαξίμου, οι εκλογές θα διεξαχθούν την άνοιξη.',
+    'Οι εργαζόμενοι στα μέσα μαζικής μεταφοράς προχωρούν σε 24ωρη απεργία την Πέμπτη.',
+    'Ο Ολυμπιακός επικράτησε του Παναθηναϊκού με 2-1 στο ντέρμπι του Πειραιά.',
+    'Η Ευρωπαϊκή Κεντρική Τράπεζα διατήρησε αμετάβλητα τα επιτόκια, όπως αναμενόταν.',
+]
+
+
+def corpus(count, sentences_per_doc, rng):
+    return ['\n  '.join(rng.choice(SENTENCES) for _ in range(sentences_per_doc)) for _ in range(count)]
+
+
+def measure(label, func, texts, size, repeat):
+    func(texts)
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(texts)
+        best = min(best, time.perf_counter() - started)
+    print(f"  {label:<42} {size / best / 1e6:8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--sentences', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    texts = corpus(args.docs, args.sentences, random.Random(7))
+    size = sum(len(text.encode('utf-8')) for text in texts)
+    print(f"{args.docs:,} documents, {size / 1e6:.1f} MB UTF-8, NumPy "
+          f"{'available' if greek_text.np is not None else 'not installed'}")
+
+    whitespace = re.compile(r'\s+')
+    cases = [
+        ('regex whitespace cleanup (old)', lambda ts: [whitespace.sub(' ', t).strip() for t in ts]),
+        ('normalize_whitespace', lambda ts: [greek_text.normalize_whitespace(t) for t in ts]),
+        ('fold + regex tokens (old)',
+         lambda ts: [greek_text.TOKEN_REGEX.findall(t.translate(greek_text.FOLD_TABLE)) for t in ts]),
+        ('fold per document', lambda ts: [greek_text.fold(t) for t in ts]),
+        ('fold_many', greek_text.fold_many),
+        ('normalize_many', greek_text.normalize_many),
+        ('tokenize per document', lambda ts: [greek_text.tokenize(t) for t in ts]),
+        ('tokenize_many', greek_text.tokenize_many),
+        ('index_terms_many', greek_text.index_terms_many),
+    ]
+    for label, func in cases:
+        measure(label, func, texts, size, args.repeat)
+
+    if greek_text.np is not None:
+        numpy, greek_text.np = greek_text.np, None
+        print("Without NumPy:")
+        try:
+            for label, func in cases[3:]:
+                measure(label, func, texts, size, args.repeat)
+        finally:
+            greek_text.np = numpy
+
+
+if __name__ == '__main__':
+    main()
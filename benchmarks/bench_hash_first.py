@@ -0,0 +1,103 @@
+"""Benchmark the hash-first analyze protocol against uploading the text.
+
+Analyzes a set of synthetic Greek articles once (the Mistral call is mocked),
+then replays repeat views of them with both protocols through the Flask test
+client:
+
+* upload: ``POST /analyze`` with the full text, answered from the cache
+* hash-first: ``GET /analysis?hash=...`` (text uploaded only on a 404)
+
+It reports request bytes and server time per view, and a modelled client
+latency of server time + one round trip per request + upload time on a slow
+mobile uplink. The last line shows the extra round trip a miss costs.
+
+    python benchmarks/bench_hash_first.py --articles 200 --uplink-kbps 1000 --rtt-ms 80
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from unittest.mock import MagicMock, patch
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('MISTRAL_API_KEY', 'benchmark')
+
+import app as app_module  # noqa: E402
+
+SENTENCES = [
+    'Η κυβέρνηση ανακοίνωσε νέα μέτρα στήριξης για τα νοικοκυριά, ύψους 1,2 δισ. ευρώ.',
+    'Ο υπουργός Οικονομικών δήλωσε ότι «η ανάπτυξη θα ξεπεράσει το 2,5% το 2025».',
+    'Η αντιπολίτευση κατηγορεί την κυβέρνηση για την ακρίβεια στα τρόφιμα και την ενέργεια.',
+    'Οι εργαζόμενοι στα μέσα μαζικής μεταφοράς προχωρούν σε 24ωρη απεργία την Πέμπτη.',
+    'Η Ευρωπαϊκή Κεντρική Τράπεζα διατήρησε αμετάβλητα τα επιτόκια, όπως αναμενόταν.',
+]
+
+
+def article(rng, index, length):
+    text = f'Άρθρο {index}. '
+    while len(text) < length:
+        text += rng.choice(SENTENCES) + ' '
+    return text[:length]
+
+
+def timed(func):
+    started = time.perf_counter()
+    response = func()
+    return response, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=200)
+    parser.add_argument('--length', type=int, default=6000, help='characters per article')
+    parser.add_argument('--uplink-kbps', type=float, default=1000)
+    parser.add_argument('--rtt-ms', type=float, default=80)
+    args = parser.parse_args()
+
+    app_module.limiter.enabled = False
+    client = app_module.app.test_client()
+    rng = random.Random(7)
+    texts = [article(rng, i, args.length) for i in range(args.articles)]
+    source = 'kathimerini.gr'
+    reply = MagicMock(choices=[MagicMock(message=MagicMock(content='Ανάλυση. ' * 300))])
+    with patch.object(app_module.llm.default, 'client', MagicMock()) as mock_client:
+        mock_client.chat.complete.return_value = reply
+        for text in texts:
+            client.post('/analyze', json={'text': text, 'source': source})
+
+    def upload_time(size):
+        return size * 8 / (args.uplink_kbps * 1000) * 1000
+
+    results = {}
+    for label in ('upload', 'hash-first'):
+        sizes, latencies, server = [], [], []
+        for text in texts:
+            if label == 'upload':
+                body = json.dumps({'text': text, 'url': '', 'source': source}, ensure_ascii=False).encode('utf-8')
+                response, took = timed(lambda: client.post('/analyze', data=body, content_type='application/json'))
+                size = len(body)
+            else:
+                query = urlencode({'hash': app_module.content_hash(text), 'source': source})
+                response, took = timed(lambda: client.get(f'/analysis?{query}'))
+                size = len(query) + len('/analysis?')
+            assert response.status_code == 200, response.status_code
+            sizes.append(size)
+            server.append(took)
+            latencies.append(took + args.rtt_ms + upload_time(size))
+        results[label] = (statistics.median(sizes), statistics.median(server), statistics.median(latencies))
+
+    print(f"{args.articles} repeat views of {args.length}-character articles, "
+          f"{args.uplink_kbps:g} kbit/s uplink, {args.rtt_ms:g} ms RTT")
+    print(f"  {'protocol':<12}{'request bytes':>15}{'server p50 ms':>15}{'client p50 ms':>15}")
+    for label, (size, server, latency) in results.items():
+        print(f"  {label:<12}{size:>15,.0f}{server:>15.2f}{latency:>15.1f}")
+    print(f"  a miss costs one extra lookup: about {args.rtt_ms + results['hash-first'][1]:.0f} ms "
+          f"before the upload")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark response encodings: bytes on the wire and encode time.
+
+Encodes a realistic ``/analyze`` payload (a Greek analysis of a few KB with
+metadata) and a ``/search`` page of results with the old stdlib
+``json.dumps(...).encode()`` (ASCII-escaped), UTF-8 JSON (stdlib and orjson)
+and MessagePack, each uncompressed, gzipped and brotli-compressed at the
+levels ``response_encoding.py`` uses.
+
+    python benchmarks/bench_response_encoding.py --repeat 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import response_encoding  # noqa: E402
+
+ANALYSIS_SENTENCES = [
+    'Το άρθρο χρησιμοποιεί φορτισμένες εκφράσεις όπως «ιστορική αποτυχία» χωρίς τεκμηρίωση.',
+    'Παρατίθενται μόνο δηλώσεις κυβερνητικών στελεχών, ενώ η θέση της αντιπολίτευσης απουσιάζει.',
+    'Οι αριθμοί για την ανεργία δίνονται χωρίς πηγή και χωρίς σύγκριση με προηγούμενα έτη.',
+    'Ο τίτλος υπερβάλλει σε σχέση με το περιεχόμενο, κάτι που παραπέμπει σε clickbait.',
+    'Η αναφορά σε «κύκλους των Βρυξελλών» είναι ανώνυμη και δεν μπορεί να επαληθευτεί.',
+    'Το κείμενο διακρίνει σωστά την είδηση από το σχόλιο στο δεύτερο μισό του.',
+    'Χρησιμοποιείται το δίπολο «εμείς και αυτοί», τυπικό στοιχείο πολωτικού λόγου.',
+    'Λείπουν στοιχεία για το κόστος των μέτρων και για τον τρόπο χρηματοδότησής τους.',
+]
+HEADINGS = ['Συναισθηματική γλώσσα', 'Επιλεκτική παρουσίαση', 'Πηγές', 'Τίτλος', 'Πλαισίωση']
+
+
+def analysis_text(paragraphs, rng):
+    return ''.join(f"**{rng.choice(HEADINGS)}:** " + ' '.join(rng.sample(ANALYSIS_SENTENCES, 3)) + '\n\n'
+                   for _ in range(paragraphs)) + 'Βαθμολογία αξιοπιστίας: 6/10.'
+
+
+def analyze_payload(paragraphs):
+    return {
+        'analysis': analysis_text(paragraphs, random.Random(7)),
+        'text_length': 6412,
+        'source': 'kathimerini.gr',
+        'cached': False,
+        'metadata': {'headline': 'Νέα μέτρα στήριξης για τα νοικοκυριά', 'publisher': 'Η Καθημερινή',
+                     'author': 'Μαρία Παπαδοπούλου', 'date_published': '2026-10-19T08:00:00+03:00'},
+        'success': True,
+    }
+
+
+def search_payload(results):
+    return {'query': 'μέτρα στήριξης', 'count': results, 'results': [
+        {'cache_key': f'{i:064x}', 'url': f'https://www.kathimerini.gr/economy/{i}/arthro',
+         'domain': 'kathimerini.gr', 'title': 'Νέα μέτρα στήριξης για τα νοικοκυριά',
+         'snippet': 'Η κυβέρνηση ανακοίνωσε [νέα μέτρα στήριξης] ύψους 1,2 δισ. ευρώ για τα νοικοκυριά',
+         'score': 6.5, 'timestamp': 1760860800 + i} for i in range(results)]}
+
+
+def best_time(func, payload, repeat):
+    func(payload)
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func(payload)
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, default=8)
+    parser.add_argument('--results', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    encoders = [('json.dumps ASCII (old)', lambda obj: json.dumps(obj).encode()),
+                ('json.dumps UTF-8', lambda obj: json.dumps(obj, ensure_ascii=False,
+                                                            separators=(',', ':')).encode('utf-8'))]
+    if response_encoding.orjson is not None:
+        encoders.append(('orjson', response_encoding.dumps_bytes))
+    if response_encoding.msgpack is not None:
+        encoders.append(('msgpack', response_encoding.packb))
+    codings = [('gzip', lambda data: response_encoding.compress(data, 'gzip'))]
+    if response_encoding.brotli is not None:
+        codings.append(('br', lambda data: response_encoding.compress(data, 'br')))
+
+    for name, payload in (('/analyze', analyze_payload(args.paragraphs)),
+                          ('/search', search_payload(args.results))):
+        print(f"{name} payload")
+        print(f"  {'encoder':<24}{'bytes':>8}{'encode µs':>11}" +
+              ''.join(f"{coding + ' bytes':>12}{coding + ' µs':>10}" for coding, _ in codings))
+        for label, encode in encoders:
+            data = encode(payload)
+            row = f"  {label:<24}{len(data):>8}{best_time(encode, payload, args.repeat):>11.1f}"
+            for _, compress in codings:
+                row += f"{len(compress(data)):>12}{best_time(compress, data, max(args.repeat // 10, 1)):>10.1f}"
+            print(row)
+        print()
+
+
+if __name__ == '__main__':
+    main()
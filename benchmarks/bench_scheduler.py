@@ -0,0 +1,93 @@
+"""Benchmark queue times per lane under synthetic mixed load with a mock LLM.
+
+One tenant submits a batch of --batch articles at once, a feed prefetcher
+trickles in articles, and interactive users arrive every --interactive-every
+seconds. Every analysis goes through ``analyze_greek_news`` and the LLM
+scheduler. The backend is a stub that takes --llm-latency seconds. The
+same load runs twice. The first time everything is queued in one lane
+(FIFO, as without lanes). The second time each kind of work gets its own
+lane. The interactive queue time shows whether people wait behind the
+batch.
+
+    python benchmarks/bench_scheduler.py --batch 100 --limit 4 --llm-latency 0.2
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import app as app_module  # noqa: E402
+from admission import AdmissionControl  # noqa: E402
+from cache_snapshot import SnapshotCache  # noqa: E402
+from llm_backends import BackendRegistry, Completion, LLMBackend  # noqa: E402
+
+
+class MockBackend(LLMBackend):
+    name = 'mistral'
+
+    def __init__(self, latency):
+        super().__init__('mock')
+        self.latency = latency
+
+    def _complete(self, messages, temperature):
+        time.sleep(self.latency)
+        return Completion('**ΣΥΝΟΛΙΚΗ ΑΞΙΟΛΟΓΗΣΗ: 60/100**', {'total_tokens': 1800})
+
+
+def text(kind, i):
+    return f'{kind} {i}: η κυβέρνηση ανακοίνωσε νέα μέτρα στήριξης για τα νοικοκυριά. ' * 3
+
+
+def run(args, lanes):
+    admission = AdmissionControl(max_limit=args.limit, max_queue=args.batch + 100, max_wait=600,
+                                 latency_target=60, lane_caps={})
+    threads = []
+
+    def submit(kind, i, lane, tenant):
+        thread = threading.Thread(target=app_module.analyze_greek_news,
+                                  args=(text(kind, i), '', '', None, None, lane, tenant))
+        thread.start()
+        threads.append(thread)
+
+    with patch.object(app_module, 'llm', BackendRegistry([MockBackend(args.llm_latency)], 'mistral')), \
+            patch.object(app_module, 'admission', admission), patch.object(app_module, 'analysis_cache', SnapshotCache()):
+        for i in range(args.batch):
+            submit('batch', i, 'batch' if lanes else 'interactive', 'tenant-a')
+        started = time.monotonic()
+        i = 0
+        while time.monotonic() - started < args.duration:
+            submit('interactive', i, 'interactive', f'user-{i}')
+            if i % 2 == 0:
+                submit('prefetch', i, 'prefetch' if lanes else 'interactive', 'feed.example.gr')
+            i += 1
+            time.sleep(args.interactive_every)
+        for thread in threads:
+            thread.join()
+    return admission.limiter('mistral').stats()['lanes']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=4, help='LLM concurrency')
+    parser.add_argument('--llm-latency', type=float, default=0.2)
+    parser.add_argument('--interactive-every', type=float, default=0.25)
+    parser.add_argument('--duration', type=float, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.batch}-article batch, interactive every {args.interactive_every:g}s for {args.duration:g}s, "
+          f"LLM concurrency {args.limit}, latency {args.llm_latency:g}s")
+    print(f"  {'scheduling':<11} {'lane':<12} {'admitted':>8} {'queue p50 s':>12} {'queue p95 s':>12}")
+    for label, lanes in (('fifo', False), ('lanes', True)):
+        for lane, stats in run(args, lanes).items():
+            if stats['admitted']:
+                print(f"  {label:<11} {lane:<12} {stats['admitted']:>8} {stats['queue_p50']:>12.3f} "
+                      f"{stats['queue_p95']:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark the full-text search index at scale.
+
+Indexes N synthetic Greek documents (default one million) whose words follow
+a Zipf distribution over inflected forms, then times GET /search style
+queries for frequent, mid-frequency and rare terms.
+
+    python benchmarks/bench_search.py --docs 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from search_index import SearchIndex  # noqa: E402
+
+SYLLABLES = ['κα', 'λο', 'μέ', 'ρα', 'τη', 'νι', 'πο', 'λί', 'στα', 'θε', 'κυ', 'βέρ',
+             'νη', 'οι', 'κο', 'νο', 'μί', 'δη', 'μο', 'ψη', 'φο', 'ρί', 'ζω', 'γρα']
+ENDINGS = ['ς', 'υ', 'ι', 'ων', 'ες', 'ης', 'η', 'ος', 'ου', 'α']
+
+
+def vocabulary(size, rng):
+    lemmas = set()
+    while len(lemmas) < size:
+        lemmas.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(lemmas)
+
+
+def documents(count, words_per_doc, rng):
+    lemmas = vocabulary(20000, rng)
+    weights = [1.0 / (rank + 1) for rank in range(len(lemmas))]
+    cumulative = []
+    total = 0.0
+    for w in weights:
+        total += w
+        cumulative.append(total)
+    for i in range(count):
+        words = rng.choices(lemmas, cum_weights=cumulative, k=words_per_doc)
+        text = ' '.join(w + rng.choice(ENDINGS) for w in words)
+        yield {
+            'cache_key': f'{i:032x}',
+            'url': f'https://outlet{i % 40}.gr/article/{i}',
+            'domain': f'outlet{i % 40}.gr',
+            'ts': time.time(),
+            'score': rng.randint(1, 100),
+            'text': text,
+            'analysis': '',
+        }, lemmas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=1_000_000)
+    parser.add_argument('--words', type=int, default=120)
+    parser.add_argument('--batch', type=int, default=2000)
+    parser.add_argument('--db', default=None, help='database path (default: temporary file)')
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='epap-bench-'), 'search.db')
+    index = SearchIndex(path)
+
+    print(f"Indexing {args.docs:,} documents of {args.words} words into {path}")
+    started = time.perf_counter()
+    batch = []
+    lemmas = None
+    for doc, lemmas in documents(args.docs, args.words, rng):
+        batch.append(doc)
+        if len(batch) >= args.batch:
+            index.add_batch(batch)
+            batch = []
+    if batch:
+        index.add_batch(batch)
+    elapsed = time.perf_counter() - started
+    print(f"  indexed in {elapsed:.1f}s ({args.docs / elapsed:,.0f} docs/s), "
+          f"{os.path.getsize(path) / 1e6:,.0f} MB")
+
+    queries = {
+        'frequent term (rank 1)': lemmas[0] + 'ος',
+        'mid term (rank 200)': lemmas[200] + 'ες',
+        'rare term (rank 15000)': lemmas[15000] + 'ου',
+        'two terms (rank 5 + 50)': f'{lemmas[5]}ης {lemmas[50]}ων',
+        'prefix (rank 300, 4 chars)': lemmas[300][:4] + '*',
+    }
+    print("Queries (top 10, mean of 20 runs):")
+    for label, query in queries.items():
+        index.search(query)
+        runs = []
+        for _ in range(20):
+            t = time.perf_counter()
+            results = index.search(query)
+            runs.append((time.perf_counter() - t) * 1000)
+        print(f"  {label:<30} {sum(runs) / len(runs):8.2f} ms  p max {max(runs):7.2f} ms  "
+              f"({len(results)} hits)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark incremental story clustering.
+
+Streams synthetic articles about a rolling set of events through
+StoryClusterer, each written by one of 40 outlets. An article mixes the
+event's distinctive vocabulary with Zipf-distributed background words.
+Reports per-article assignment latency, live story count, memory held by
+the clusters and purity (the share of articles whose story is dominated
+by their own event).
+
+    python benchmarks/bench_stories.py --articles 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from stories import DIMENSIONS, StoryClusterer  # noqa: E402
+
+SYLLABLES = ['κα', 'λο', 'μέ', 'ρα', 'τη', 'νι', 'πο', 'λί', 'στα', 'θε', 'κυ', 'βέρ',
+             'νη', 'οι', 'κο', 'νο', 'μί', 'δη', 'μο', 'ψη', 'φο', 'ρί', 'ζω', 'γρα']
+ENDINGS = ['ς', 'υ', 'ι', 'ων', 'ες', 'ης', 'η', 'ος', 'ου', 'α']
+
+
+def word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=50000)
+    parser.add_argument('--events-per-hour', type=int, default=30)
+    parser.add_argument('--articles-per-hour', type=int, default=300)
+    parser.add_argument('--ttl-hours', type=float, default=48)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--event-words', type=int, default=25,
+                        help='words per article drawn from the event vocabulary (the rest are background)')
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    background = [word(rng) for _ in range(5000)]
+    weights = [1.0 / (rank + 1) for rank in range(len(background))]
+    clusterer = StoryClusterer(threshold=args.threshold, ttl_hours=args.ttl_hours)
+
+    events = []
+    truth = {}
+    story_events = defaultdict(Counter)
+    latencies = []
+    start = time.time() - args.articles / args.articles_per_hour * 3600
+    for i in range(args.articles):
+        ts = start + i * 3600 / args.articles_per_hour
+        if i % max(1, args.articles_per_hour // args.events_per_hour) == 0:
+            events.append((len(events), [word(rng) for _ in range(25)], ts))
+        # Most coverage goes to events from the last few hours
+        event_id, vocabulary, _ = rng.choice(events[-args.events_per_hour * 6:])
+        text = ' '.join(
+            [rng.choice(vocabulary) + rng.choice(ENDINGS) for _ in range(args.event_words)] +
+            [w + rng.choice(ENDINGS) for w in rng.choices(background, weights=weights, k=300 - args.event_words)]
+        )
+        rng.shuffle(text_words := text.split())
+        key = f'{i:032x}'
+        t = time.perf_counter()
+        story_id = clusterer.add(key, ' '.join(text_words), domain=f'outlet{rng.randrange(40)}.gr',
+                                 score=rng.randint(20, 90), timestamp=ts)
+        latencies.append((time.perf_counter() - t) * 1000)
+        truth[key] = event_id
+        story_events[story_id][event_id] += 1
+
+    latencies.sort()
+    state = clusterer.state
+    stories = state.stories
+    member_bytes = sum(len(repr(list(s.members))) for s in stories)
+    centroid_bytes = sum(s.terms.nbytes + s.sums.nbytes for s in stories)
+    matrix_bytes = state._indices.nbytes + state._weights.nbytes
+    purity = sum(c.most_common(1)[0][1] for c in story_events.values()) / args.articles
+    print(f"{args.articles:,} articles, {len(events):,} events, {len(stories):,} live stories "
+          f"(threshold {args.threshold:g}, ttl {args.ttl_hours:g}h)")
+    print(f"  assign latency: mean {sum(latencies) / len(latencies):.2f} ms, "
+          f"p50 {latencies[len(latencies) // 2]:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)]:.2f} ms")
+    print(f"  memory: centroids {centroid_bytes / 1e6:.1f} MB, matrix {matrix_bytes / 1e6:.1f} MB, "
+          f"member records ~{member_bytes / 1e6:.1f} MB, df/scratch {2 * DIMENSIONS * 4 / 1e6:.1f} MB")
+    print(f"  purity {purity:.3f}, events split over {len(story_events) / len(events):.2f} stories on average")
+
+
+if __name__ == '__main__':
+    main()
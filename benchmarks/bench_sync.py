@@ -0,0 +1,76 @@
+"""Benchmark delta-sync reads of the analysis history store.
+
+Fills a sync database with ACCOUNTS histories of HISTORY analyses each
+(keys shared across accounts, as popular articles are), then times a full
+restore from cursor 0 in pages, the first and the deepest page, and an
+incremental sync with nothing new. Keyset pagination keeps every page the
+same cost regardless of depth.
+
+    python benchmarks/bench_sync.py --accounts 2000 --history 500
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sync_store import SyncStore  # noqa: E402
+
+ANALYSIS = 'Το άρθρο παρουσιάζει μονόπλευρα την κυβερνητική θέση. ' * 40
+
+
+def timed(func, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, default=2000)
+    parser.add_argument('--history', type=int, default=500)
+    parser.add_argument('--articles', type=int, default=50000)
+    parser.add_argument('--page', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as directory:
+        store = SyncStore(os.path.join(directory, 'sync.db'))
+        started = time.perf_counter()
+        for account in range(args.accounts):
+            keys = rng.sample(range(args.articles), args.history)
+            store.record(f'benchmark-token-{account:08d}',
+                         [{'key': f'{key:032x}', 'analysis': ANALYSIS, 'text_length': 4000} for key in keys])
+        rows = args.accounts * args.history
+        print(f"{rows:,} history rows ({args.accounts:,} accounts) written at "
+              f"{rows / (time.perf_counter() - started):,.0f} rows/s")
+
+        token = f'benchmark-token-{args.accounts // 2:08d}'
+
+        def restore():
+            cursor, more, pages = 0, True, 0
+            while more:
+                _, cursor, more = store.changes(token, cursor, args.page)
+                pages += 1
+            return cursor, pages
+
+        last_cursor, pages = restore()
+        deep_cursor = store.changes(token, 0, args.history - args.page)[1]
+        cases = [
+            (f"full restore ({args.history} items, {pages} pages)", restore, 5),
+            ('first page', lambda: store.changes(token, 0, args.page), 20),
+            ('last page', lambda: store.changes(token, deep_cursor, args.page), 20),
+            ('incremental sync, nothing new', lambda: store.changes(token, last_cursor, args.page), 20),
+        ]
+        for label, func, repeat in cases:
+            print(f"  {label:<40}{timed(func, repeat):9.3f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 // Cross-browser API shim (Firefox uses `browser`, Chrome/Edge use `chrome`)
 const api = typeof browser !== 'undefined' ? browser : chrome;
 
-const API_URL = 'https://epap.vercel.app/analyze';
+const API_BASE = 'https://epap.vercel.app';
+const API_URL = `${API_BASE}/analyze`;
+
+// Whitespace as defined by Python's str.split(), which the server normalises with
+const WHITESPACE = /[\t\n\v\f\r \x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+/g;
 
 const $ = id => document.getElementById(id);
 
@@ -53,6 +57,29 @@ async function extractText(tabId) {
   });
 }
 
+// ── Hash-first lookup ─────────────────────────────────────────────────────────
+
+// SHA-256 of the whitespace-normalised text, matching the server's content_hash()
+async function contentHash(text) {
+  const normalized = text.replace(WHITESPACE, ' ').trim();
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(normalized));
+  return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+}
+
+// Ask for a stored analysis by hash and URL; null means the text must be uploaded
+async function lookupAnalysis(text, url, source) {
+  const params = new URLSearchParams({ hash: await contentHash(text), source });
+  if (url && /^https?:/.test(url)) params.set('url', url);
+  try {
+    const response = await fetch(`${API_BASE}/analysis?${params}`);
+    if (!response.ok) return null;
+    const data = await response.json();
+    return data.analysis ? data : null;
+  } catch (_) {
+    return null;
+  }
+}
+
 // ── Score helpers ─────────────────────────────────────────────────────────────
 
 function parseScore(analysis) {
@@ -105,6 +132,13 @@ async function analyze() {
     const source = $('sourceInput').value.trim() ||
       (currentTab.url ? new URL(currentTab.url).hostname.replace(/^www\./, '') : '');
 
+    // Repeat articles are answered from the server cache without uploading the text
+    const known = await lookupAnalysis(text, currentTab.url, source);
+    if (known) {
+      renderResults(known.analysis);
+      return;
+    }
+
     const response = await fetch(API_URL, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
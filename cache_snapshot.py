@@ -0,0 +1,323 @@
+"""On-disk snapshots of the analysis cache.
+
+A snapshot is a single compact file that workers memory-map at startup, so a
+freshly deployed or restarted worker serves cached analyses immediately
+without a blocking load. Layout (little endian)::
+
+    header   b'EPAPSNAP' | u16 format | u16 tag length | tag | u32 count
+    index    count x (16-byte key | 8-byte version | u64 offset | u32 length), sorted by key
+    data     zlib-compressed UTF-8 analysis texts, least recently written or used first
+
+Lookups binary-search the mapped index, so only the pages that are actually
+touched are read from disk. Every entry carries the prompt/model version it
+was produced with; the cache's tag is the current version, given to new
+entries. Entries of older versions are still served after a prompt or model
+change until they are re-analyzed (see ``reanalysis.py``). The order of the
+data section is the eviction order once the snapshot is over its size limit,
+so no per-entry timestamp is needed. Format 1 files,
+which had one version for the whole file in the header tag, are still read.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from background import file_lock
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'EPAPSNAP'
+FORMAT_VERSION = 2
+INDEX_ENTRY = struct.Struct('<16s8sQI')
+LEGACY_INDEX_ENTRY = struct.Struct('<16sQI')
+COUNT = struct.Struct('<I')
+HEADER_FIXED = struct.Struct('<8sHH')
+RELOAD_CHECK_INTERVAL = 30
+
+
+def key_bytes(key):
+    """Map a cache key to the 16 bytes stored in the snapshot index"""
+    if len(key) == 32:
+        try:
+            return bytes.fromhex(key)
+        except ValueError:
+            pass
+    return hashlib.md5(key.encode('utf-8')).digest()
+
+
+def version_bytes(version):
+    """Map a version tag to the 8 bytes stored with each entry (16-hex tags map to themselves)"""
+    if len(version) == 16:
+        try:
+            return bytes.fromhex(version)
+        except ValueError:
+            pass
+    return hashlib.md5(version.encode('utf-8')).digest()[:8]
+
+
+def version_id(version):
+    """The version tag as reported by ``SnapshotCache.version_of``"""
+    return version_bytes(version).hex()
+
+
+class SnapshotTable:
+    """Read-only view of a snapshot file backed by mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._map = None
+        self._index_start = 0
+        self._entry_struct = INDEX_ENTRY
+        self._legacy_version = None
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            if self.stat.st_size < HEADER_FIXED.size:
+                return
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, tag_length = HEADER_FIXED.unpack_from(self._map, 0)
+        offset = HEADER_FIXED.size
+        stored_tag = self._map[offset:offset + tag_length].decode('utf-8', 'replace')
+        if magic != MAGIC or version not in (1, FORMAT_VERSION):
+            logger.info(f"Ignoring snapshot {path} in unknown format {version}")
+            self._map = None
+            return
+        if version == 1:
+            self._entry_struct = LEGACY_INDEX_ENTRY
+            self._legacy_version = version_bytes(stored_tag)
+        offset += tag_length
+        self.count, = COUNT.unpack_from(self._map, offset)
+        self._index_start = offset + COUNT.size
+
+    def _entry(self, position):
+        """(key, version, offset, length) of the entry at ``position``"""
+        entry = self._entry_struct.unpack_from(self._map, self._index_start + position * self._entry_struct.size)
+        if self._legacy_version is not None:
+            return entry[0], self._legacy_version, entry[1], entry[2]
+        return entry
+
+    def _find(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            if entry[0] == key:
+                return entry
+            if entry[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def get_raw(self, key):
+        """Return ``(version, compressed blob)`` for a 16-byte key, or None"""
+        entry = self._find(key)
+        if entry is None:
+            return None
+        _, version, offset, length = entry
+        return version, self._map[offset:offset + length]
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def items_raw(self):
+        """``(key, (version, blob))`` pairs in data order, least recently written or used first"""
+        entries = sorted((self._entry(position) for position in range(self.count)), key=lambda entry: entry[2])
+        for stored, version, offset, length in entries:
+            yield stored, (version, self._map[offset:offset + length])
+
+
+def write_snapshot(path, tag, entries):
+    """Atomically write ``{16-byte key: (8-byte version, compressed blob)}`` entries to ``path``
+
+    Texts are stored in the order of ``entries``, which should be least
+    recently written or used first; the index is sorted by key.
+    """
+    tag_bytes = tag.encode('utf-8')
+    keys = list(entries)
+    data_start = HEADER_FIXED.size + len(tag_bytes) + COUNT.size + len(keys) * INDEX_ENTRY.size
+    offsets = {}
+    offset = data_start
+    for key in keys:
+        offsets[key] = offset
+        offset += len(entries[key][1])
+    index = bytearray()
+    for key in sorted(keys):
+        version, blob = entries[key]
+        index += INDEX_ENTRY.pack(key, version, offsets[key], len(blob))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER_FIXED.pack(MAGIC, FORMAT_VERSION, len(tag_bytes)))
+        f.write(tag_bytes)
+        f.write(COUNT.pack(len(keys)))
+        f.write(index)
+        for key in keys:
+            f.write(entries[key][1])
+    os.replace(tmp_path, path)
+
+
+class SnapshotCache:
+    """Dict-like analysis cache that falls back to a memory-mapped snapshot"""
+
+    def __init__(self, path=None, tag='', max_entries=50000):
+        self.path = path
+        # The current version, given to entries set without one
+        self.tag = tag
+        self.max_entries = max_entries
+        self.memory = {}
+        # Key -> version of each entry in memory
+        self.versions = {}
+        # Keys set in this worker, oldest first (a dict keeps the order); only these are
+        # written back, never copies promoted from the snapshot
+        self.written = {}
+        self.dirty = False
+        self._table = None
+        self._promoted = 0
+        self._checked_at = 0
+        self._lock = threading.Lock()
+        self.stats = {'snapshot_hits': 0, 'snapshots_written': 0}
+
+    @classmethod
+    def from_env(cls, tag):
+        return cls(
+            os.getenv('CACHE_SNAPSHOT_PATH') or None,
+            tag,
+            max_entries=int(os.getenv('CACHE_SNAPSHOT_MAX_ENTRIES', '50000')),
+        )
+
+    def _current_table(self):
+        """Open the snapshot on first use and pick up files written by other workers"""
+        if not self.path:
+            return None
+        now = time.time()
+        if self._table is not None and now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return self._table
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return self._table
+        table = self._table
+        if table is None or (stat.st_ino, stat.st_mtime_ns) != (table.stat.st_ino, table.stat.st_mtime_ns):
+            try:
+                self._table = SnapshotTable(self.path)
+                self._drop_promoted()
+            except (OSError, ValueError, struct.error) as e:
+                logger.error(f"Could not open cache snapshot {self.path}: {str(e)}")
+        return self._table
+
+    def _drop_promoted(self):
+        """Forget entries copied from the previous table; the new one may hold newer versions"""
+        for key in list(self.memory):
+            if key not in self.written:
+                self.memory.pop(key, None)
+                self.versions.pop(key, None)
+        self._promoted = 0
+
+    def __contains__(self, key):
+        if key in self.memory:
+            return True
+        table = self._current_table()
+        return table is not None and key_bytes(key) in table
+
+    def __getitem__(self, key):
+        if key in self.memory:
+            return self.memory[key]
+        table = self._current_table()
+        entry = table.get_raw(key_bytes(key)) if table is not None else None
+        if entry is None:
+            raise KeyError(key)
+        version, blob = entry
+        value = zlib.decompress(blob).decode('utf-8')
+        self.memory[key] = value
+        self.versions[key] = version.hex()
+        self._promoted += 1
+        self.stats['snapshot_hits'] += 1
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def set(self, key, value, version=None):
+        """Store an analysis produced with ``version`` (the current tag by default)"""
+        self.memory[key] = value
+        self.versions[key] = version_id(self.tag if version is None else version)
+        self.written.pop(key, None)
+        self.written[key] = None
+        self.dirty = True
+
+    def version_of(self, key):
+        """The version an entry was produced with, or None if it is not cached"""
+        if key in self.memory:
+            return self.versions.get(key)
+        table = self._current_table()
+        entry = table.get_raw(key_bytes(key)) if table is not None else None
+        return entry[0].hex() if entry is not None else None
+
+    def __len__(self):
+        # Entries written in memory over a key that is also in the snapshot are
+        # counted twice; this is only used for health/status reporting
+        table = self._current_table()
+        if table is None:
+            return len(self.memory)
+        return len(self.memory) + table.count - self._promoted
+
+    def snapshot(self):
+        """Merge memory with the on-disk snapshot and write a new one"""
+        if not self.path or not self.dirty:
+            return False
+        with self._lock, file_lock(self.path):
+            entries = {}
+            table = self._current_table()
+            try:
+                on_disk = SnapshotTable(self.path) if os.path.exists(self.path) else None
+            except (OSError, ValueError, struct.error):
+                on_disk = None
+            # Least recently written or used first: entries only in an older mapped
+            # file, then the file on disk in its own order
+            if table is not None and table is not on_disk:
+                for key, blob in table.items_raw():
+                    if on_disk is None or key not in on_disk:
+                        entries[key] = blob
+            if on_disk is not None:
+                for key, blob in on_disk.items_raw():
+                    entries.pop(key, None)
+                    entries[key] = blob
+            written = {key: self.memory[key] for key in list(self.written) if key in self.memory}
+            self.dirty = False
+            # Entries read in this worker since the file was mapped, then those written here
+            for key in list(self.memory):
+                if key not in written and key_bytes(key) in entries:
+                    entries[key_bytes(key)] = entries.pop(key_bytes(key))
+            for key, value in written.items():
+                version = bytes.fromhex(self.versions.get(key) or version_id(self.tag))
+                entries.pop(key_bytes(key), None)
+                entries[key_bytes(key)] = (version, zlib.compress(value.encode('utf-8')))
+            if len(entries) > self.max_entries:
+                # Evict the least recently written or used; entries written here are always kept
+                keep = {key_bytes(key) for key in written}
+                surplus = len(entries) - self.max_entries
+                for key in [key for key in entries if key not in keep][:surplus]:
+                    del entries[key]
+            write_snapshot(self.path, self.tag, entries)
+            self._table = SnapshotTable(self.path)
+            self._checked_at = time.time()
+            # Entries now live in the mapped file; drop them from the heap unless
+            # they were overwritten while the snapshot was being written
+            for key, value in written.items():
+                if self.memory.get(key) is value:
+                    self.written.pop(key, None)
+            self._drop_promoted()
+            self.stats['snapshots_written'] += 1
+        logger.info(f"Wrote cache snapshot with {len(entries)} entries to {self.path}")
+        return True
@@ -0,0 +1,61 @@
+from contextlib import ExitStack
+import pytest
+from unittest.mock import patch
+from app import limiter
+from cache_snapshot import SnapshotCache
+from llm_backends import BackendRegistry, Completion, LLMBackend
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Start every test with fresh rate-limit counters."""
+    limiter.reset()
+    yield
+
+class ScriptedBackend(LLMBackend):
+    """Stub LLM backend giving scripted answers and keeping every prompt it was sent.
+
+    Answers are used in order and the last one repeats. An answer may be a
+    callable, which is given the messages.
+    """
+
+    def __init__(self, *answers, name='mistral', model='mistral-large-latest', usage=None):
+        super().__init__(model)
+        self.name = name
+        self.answers = list(answers) or ['Ανάλυση']
+        self.usage = usage or {}
+        self.prompts = []
+
+    @property
+    def calls(self):
+        return len(self.prompts)
+
+    def _complete(self, messages, temperature):
+        self.prompts.append(messages[0]['content'])
+        answer = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        return Completion(answer(messages) if callable(answer) else answer, dict(self.usage))
+
+@pytest.fixture
+def scripted_backend():
+    """The ScriptedBackend class, for tests that build backends without the app."""
+    return ScriptedBackend
+
+@pytest.fixture
+def app_with_backend():
+    """Point the app at stub backends, with an empty analysis cache, for the rest of the test.
+
+    ``app_with_backend('Ανάλυση 1', 'Ανάλυση 2')`` installs one ScriptedBackend
+    as the default and returns it. ``backends=[...]`` installs several (the
+    first is the default), ``lanes`` maps lanes to them, and ``wrap`` (e.g. a
+    record/replay wrapper) is applied to the list first. Calling it again
+    replaces the registry and the cache.
+    """
+    import app as app_module
+    with ExitStack() as stack:
+        def install(*answers, backends=None, lanes=None, wrap=None):
+            backends = backends or [ScriptedBackend(*answers)]
+            registry = BackendRegistry(wrap(backends) if wrap else backends, backends[0].name, lanes)
+            stack.enter_context(patch.object(app_module, 'llm', registry))
+            stack.enter_context(patch.object(app_module, 'analysis_cache',
+                                             SnapshotCache(tag=app_module.ANALYSIS_VERSION)))
+            return backends[0]
+        yield install
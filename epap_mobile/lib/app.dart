@@ -3,6 +3,7 @@ import 'screens/home_screen.dart';
 import 'screens/result_screen.dart';
 import 'screens/history_screen.dart';
 import 'screens/about_screen.dart';
+import 'screens/sync_screen.dart';
 import 'utils/theme.dart';
 
 class EpapApp extends StatelessWidget {
@@ -30,6 +31,7 @@ class EpapApp extends StatelessWidget {
         '/result': (context) => const ResultScreen(),
         '/history': (context) => const HistoryScreen(),
         '/about': (context) => const AboutScreen(),
+        '/sync': (context) => const SyncScreen(),
       },
     );
   }
@@ -7,6 +7,9 @@ class AnalysisResult {
   final bool success;
   final String? error;
 
+  /// Server cache key of the analysis, used to merge synced history.
+  final String? key;
+
   AnalysisResult({
     required this.score,
     required this.analysis,
@@ -15,6 +18,7 @@ class AnalysisResult {
     required this.timestamp,
     required this.success,
     this.error,
+    this.key,
   });
 
   factory AnalysisResult.fromApi(Map<String, dynamic> json) {
@@ -26,6 +30,7 @@ class AnalysisResult {
       timestamp: DateTime.now(),
       success: json['success'] as bool? ?? false,
       error: json['error'] as String?,
+      key: json['key'] as String?,
     );
   }
 
@@ -49,6 +54,7 @@ class AnalysisResult {
       'source': source,
       'timestamp': timestamp.toIso8601String(),
       'success': success ? 1 : 0,
+      'key': key,
     };
   }
 
@@ -60,6 +66,7 @@ class AnalysisResult {
       source: map['source'] as String? ?? '',
       timestamp: DateTime.parse(map['timestamp'] as String),
       success: (map['success'] as int?) == 1,
+      key: map['key'] as String?,
     );
   }
 }
@@ -27,6 +27,7 @@ class AnalysisProvider extends ChangeNotifier {
   bool get historyLoaded => _historyLoaded;
 
   Future<void> analyze({String? text, String? url, String? source}) async {
+    await _loadSyncToken();
     _state = AnalysisState.loading;
     _currentResult = null;
     _errorMessage = null;
@@ -55,6 +56,56 @@ class AnalysisProvider extends ChangeNotifier {
     _history = await _databaseService.getHistory();
     _historyLoaded = true;
     notifyListeners();
+    await syncHistory();
+  }
+
+  /// Pulls analyses made on other devices (or before a reinstall) since the
+  /// last sync, page by page, instead of re-analyzing the articles.
+  Future<void> syncHistory() async {
+    await _loadSyncToken();
+    if (_apiService.syncToken == null) return;
+    try {
+      var cursor = await _databaseService.getSyncCursor();
+      var changed = false;
+      while (true) {
+        final page = await _apiService.fetchHistory(cursor);
+        if (page == null) break;
+        for (final item in page.items) {
+          await _databaseService.saveResult(item);
+        }
+        changed = changed || page.items.isNotEmpty;
+        cursor = page.cursor;
+        await _databaseService.setSyncCursor(cursor);
+        if (!page.more) break;
+      }
+      if (changed) {
+        _history = await _databaseService.getHistory();
+        notifyListeners();
+      }
+    } catch (_) {
+      // Offline or sync disabled on the server: the local history still works
+    }
+  }
+
+  Future<void> _loadSyncToken() async {
+    try {
+      _apiService.syncToken ??= await _databaseService.getSyncToken();
+    } catch (_) {
+      // Without local storage there is no history to keep in sync
+    }
+  }
+
+  /// The token this device syncs its history with, to copy to another device.
+  Future<String?> currentSyncToken() async {
+    await _loadSyncToken();
+    return _apiService.syncToken;
+  }
+
+  /// Switches to the history of another device by entering its sync token.
+  Future<void> useSyncToken(String token) async {
+    await _databaseService.setSyncToken(token);
+    _apiService.syncToken = token;
+    await syncHistory();
   }
 
   Future<void> deleteFromHistory(int id) async {
@@ -28,6 +28,11 @@ class _HistoryScreenState extends State<HistoryScreen> {
       appBar: AppBar(
         title: const Text('Ιστορικό'),
         actions: [
+          IconButton(
+            icon: const Icon(Icons.sync),
+            tooltip: 'Συγχρονισμός',
+            onPressed: () => Navigator.pushNamed(context, '/sync'),
+          ),
           Consumer<AnalysisProvider>(
             builder: (context, provider, _) {
               if (provider.history.isEmpty) return const SizedBox.shrink();
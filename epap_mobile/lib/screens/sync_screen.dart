@@ -0,0 +1,132 @@
+import 'package:flutter/material.dart';
+import 'package:flutter/services.dart';
+import 'package:provider/provider.dart';
+import 'package:share_plus/share_plus.dart';
+import '../providers/analysis_provider.dart';
+
+/// 16 to 128 visible ASCII characters, which the server accepts and a header can carry.
+bool isValidSyncToken(String token) {
+  return RegExp(r'^[\x21-\x7E]{16,128}$').hasMatch(token);
+}
+
+class SyncScreen extends StatefulWidget {
+  const SyncScreen({super.key});
+
+  @override
+  State<SyncScreen> createState() => _SyncScreenState();
+}
+
+class _SyncScreenState extends State<SyncScreen> {
+  final _controller = TextEditingController();
+  String? _token;
+  String? _error;
+  bool _restoring = false;
+
+  @override
+  void initState() {
+    super.initState();
+    WidgetsBinding.instance.addPostFrameCallback((_) async {
+      final token = await context.read<AnalysisProvider>().currentSyncToken();
+      if (mounted) setState(() => _token = token);
+    });
+  }
+
+  @override
+  void dispose() {
+    _controller.dispose();
+    super.dispose();
+  }
+
+  Future<void> _restore() async {
+    final token = _controller.text.trim();
+    if (!isValidSyncToken(token)) {
+      setState(() => _error = 'Ο κωδικός πρέπει να έχει 16 έως 128 χαρακτήρες χωρίς κενά');
+      return;
+    }
+    setState(() {
+      _error = null;
+      _restoring = true;
+    });
+    final provider = context.read<AnalysisProvider>();
+    await provider.useSyncToken(token);
+    if (!mounted) return;
+    setState(() {
+      _token = token;
+      _restoring = false;
+    });
+    _controller.clear();
+    ScaffoldMessenger.of(context).showSnackBar(
+      const SnackBar(content: Text('Το ιστορικό συγχρονίστηκε')),
+    );
+  }
+
+  @override
+  Widget build(BuildContext context) {
+    final token = _token;
+    return Scaffold(
+      appBar: AppBar(title: const Text('Συγχρονισμός')),
+      body: ListView(
+        padding: const EdgeInsets.all(16),
+        children: [
+          const Text(
+            'Με αυτόν τον κωδικό το ιστορικό σας επανέρχεται σε άλλη συσκευή '
+            'ή μετά από επανεγκατάσταση. Κρατήστε τον ιδιωτικό.',
+          ),
+          const SizedBox(height: 12),
+          if (token == null)
+            const Center(child: CircularProgressIndicator())
+          else ...[
+            SelectableText(
+              token,
+              style: const TextStyle(fontFamily: 'monospace', fontSize: 16),
+            ),
+            const SizedBox(height: 8),
+            Row(
+              children: [
+                TextButton.icon(
+                  icon: const Icon(Icons.copy),
+                  label: const Text('Αντιγραφή'),
+                  onPressed: () {
+                    Clipboard.setData(ClipboardData(text: token));
+                    ScaffoldMessenger.of(context).showSnackBar(
+                      const SnackBar(content: Text('Ο κωδικός αντιγράφηκε')),
+                    );
+                  },
+                ),
+                TextButton.icon(
+                  icon: const Icon(Icons.share),
+                  label: const Text('Κοινοποίηση'),
+                  onPressed: () => Share.share(token),
+                ),
+              ],
+            ),
+          ],
+          const Divider(height: 32),
+          const Text('Επαναφορά ιστορικού από άλλη συσκευή'),
+          const SizedBox(height: 8),
+          TextField(
+            controller: _controller,
+            decoration: InputDecoration(
+              labelText: 'Κωδικός συγχρονισμού',
+              errorText: _error,
+              border: const OutlineInputBorder(),
+            ),
+            autocorrect: false,
+            enableSuggestions: false,
+          ),
+          const SizedBox(height: 8),
+          ElevatedButton(
+            onPressed: _restoring ? null : _restore,
+            child: _restoring
+                ? const SizedBox(
+                    height: 20,
+                    width: 20,
+                    child: CircularProgressIndicator(strokeWidth: 2),
+                  )
+                : const Text('Επαναφορά'),
+          ),
+        ],
+      ),
+    );
+  }
+}
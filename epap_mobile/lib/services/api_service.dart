@@ -1,13 +1,37 @@
 import 'dart:convert';
+import 'package:crypto/crypto.dart';
 import 'package:http/http.dart' as http;
+import 'package:msgpack_dart/msgpack_dart.dart' as msgpack;
 import '../models/analysis_result.dart';
 import '../utils/constants.dart';
 import '../utils/score_extractor.dart';
 
+// Whitespace as defined by Python's str.split(), which the server normalises with
+final _whitespace = RegExp(
+    r'[\t\n\v\f\r \x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+');
+
+/// SHA-256 of the whitespace-normalised text, matching the server's content_hash().
+String contentHash(String text) {
+  final normalized = text.replaceAll(_whitespace, ' ').trim();
+  return sha256.convert(utf8.encode(normalized)).toString();
+}
+
+/// One page of synced history from GET /sync.
+class SyncPage {
+  final List<AnalysisResult> items;
+  final String cursor;
+  final bool more;
+
+  SyncPage({required this.items, required this.cursor, required this.more});
+}
+
 class ApiService {
   final String baseUrl;
   final http.Client _client;
 
+  /// Token identifying this device's server-side history; null disables sync.
+  String? syncToken;
+
   ApiService({String? baseUrl, http.Client? client})
       : baseUrl = baseUrl ?? kApiBaseUrl,
         _client = client ?? http.Client();
@@ -18,9 +42,16 @@ class ApiService {
     String? source,
   }) async {
     try {
-      final response = await _client.post(
+      // Repeat articles are answered from the server cache without an upload
+      final known = await lookup(text: text, url: url, source: source);
+      final response = known ?? await _client.post(
         Uri.parse('$baseUrl/analyze'),
-        headers: {'Content-Type': 'application/json'},
+        headers: {
+          'Content-Type': 'application/json',
+          // MessagePack is smaller and faster to decode; JSON stays the fallback
+          'Accept': 'application/msgpack, application/json;q=0.9',
+          if (syncToken != null) 'X-Sync-Token': syncToken!,
+        },
         body: jsonEncode({
           'text': text ?? '',
           'url': url ?? '',
@@ -28,7 +59,12 @@ class ApiService {
         }),
       );
 
-      final data = jsonDecode(response.body) as Map<String, dynamic>;
+      final data = decodeBody(response);
+
+      // Cached lookups bypass POST /analyze, so add them to the history here
+      if (known != null && data['key'] != null) {
+        await pushToHistory([data['key'] as String]);
+      }
 
       if (data['error'] != null) {
         return AnalysisResult.error(data['error'] as String);
@@ -44,12 +80,93 @@ class ApiService {
         source: result.source,
         timestamp: result.timestamp,
         success: result.success,
+        key: result.key,
       );
     } catch (e) {
       return AnalysisResult.error('Σφάλμα σύνδεσης: ${e.toString()}');
     }
   }
 
+  /// Looks up a stored analysis by content hash and/or URL; null on a miss.
+  Future<http.Response?> lookup({
+    String? text,
+    String? url,
+    String? source,
+  }) async {
+    final params = <String, String>{'source': source ?? ''};
+    if (text != null && text.trim().isNotEmpty) params['hash'] = contentHash(text);
+    if (url != null && url.startsWith(RegExp(r'https?://'))) params['url'] = url;
+    if (!params.containsKey('hash') && !params.containsKey('url')) return null;
+    try {
+      final response = await _client.get(
+        Uri.parse('$baseUrl/analysis').replace(queryParameters: params),
+        headers: {'Accept': 'application/msgpack, application/json;q=0.9'},
+      );
+      return response.statusCode == 200 ? response : null;
+    } catch (_) {
+      return null;
+    }
+  }
+
+  /// Adds analyses to this device's server-side history.
+  Future<void> pushToHistory(List<String> keys) async {
+    if (syncToken == null) return;
+    try {
+      await _client.post(
+        Uri.parse('$baseUrl/sync'),
+        headers: {'Content-Type': 'application/json', 'X-Sync-Token': syncToken!},
+        body: jsonEncode({'keys': keys}),
+      );
+    } catch (_) {
+      // Best effort: the result is still kept in the local history
+    }
+  }
+
+  /// Fetches history entries created or updated after [cursor].
+  Future<SyncPage?> fetchHistory(String cursor, {int limit = 200}) async {
+    if (syncToken == null) return null;
+    final response = await _client.get(
+      Uri.parse('$baseUrl/sync')
+          .replace(queryParameters: {'cursor': cursor, 'limit': '$limit'}),
+      headers: {
+        'Accept': 'application/msgpack, application/json;q=0.9',
+        'X-Sync-Token': syncToken!,
+      },
+    );
+    if (response.statusCode != 200) return null;
+    final data = decodeBody(response);
+    final items = (data['items'] as List).map((item) {
+      final entry = Map<String, dynamic>.from(item as Map);
+      final analysis = entry['analysis'] as String? ?? '';
+      return AnalysisResult(
+        score: extractScore(analysis),
+        analysis: analysis,
+        textLength: entry['text_length'] as int? ?? 0,
+        source: entry['source'] as String? ?? 'Άγνωστη',
+        timestamp: DateTime.fromMillisecondsSinceEpoch(
+            ((entry['created'] as num) * 1000).round()),
+        success: true,
+        key: entry['key'] as String?,
+      );
+    }).toList();
+    return SyncPage(
+        items: items,
+        cursor: data['cursor'] as String,
+        more: data['more'] as bool? ?? false);
+  }
+
+  /// Decodes a MessagePack or UTF-8 JSON response body into a map.
+  static Map<String, dynamic> decodeBody(http.Response response) {
+    final contentType = response.headers['content-type'] ?? '';
+    if (contentType.startsWith('application/msgpack')) {
+      return Map<String, dynamic>.from(
+          msgpack.deserialize(response.bodyBytes) as Map);
+    }
+    // The server sends unescaped UTF-8; response.body would assume Latin-1
+    // when the charset is missing
+    return jsonDecode(utf8.decode(response.bodyBytes)) as Map<String, dynamic>;
+  }
+
   void dispose() {
     _client.close();
   }
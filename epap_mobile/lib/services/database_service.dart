@@ -1,3 +1,5 @@
+import 'dart:convert';
+import 'dart:math';
 import 'package:sqflite/sqflite.dart';
 import 'package:path/path.dart';
 import '../models/analysis_result.dart';
@@ -17,7 +19,7 @@ class DatabaseService {
 
     return openDatabase(
       path,
-      version: 1,
+      version: 2,
       onCreate: (db, version) async {
         await db.execute('''
           CREATE TABLE history (
@@ -30,13 +32,66 @@ class DatabaseService {
             success INTEGER NOT NULL
           )
         ''');
+        await _createSyncTables(db);
+      },
+      onUpgrade: (db, oldVersion, newVersion) async {
+        if (oldVersion < 2) await _createSyncTables(db);
       },
     );
   }
 
+  static Future<void> _createSyncTables(Database db) async {
+    await db.execute('ALTER TABLE history ADD COLUMN key TEXT');
+    await db.execute('CREATE UNIQUE INDEX history_key ON history (key)');
+    await db.execute('''
+      CREATE TABLE sync_state (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        token TEXT NOT NULL,
+        cursor TEXT NOT NULL
+      )
+    ''');
+  }
+
+  /// Saves a result; a result with a known server key replaces its older copy.
   Future<int> saveResult(AnalysisResult result) async {
     final db = await database;
-    return db.insert('history', result.toMap());
+    return db.insert('history', result.toMap(),
+        conflictAlgorithm: ConflictAlgorithm.replace);
+  }
+
+  /// This device's sync token, created on first use.
+  Future<String> getSyncToken() async {
+    final state = await _syncState();
+    return state['token'] as String;
+  }
+
+  /// Reuses another device's token; the next sync restores its whole history.
+  Future<void> setSyncToken(String token) async {
+    final db = await database;
+    await db.insert('sync_state', {'id': 0, 'token': token, 'cursor': '0'},
+        conflictAlgorithm: ConflictAlgorithm.replace);
+  }
+
+  Future<String> getSyncCursor() async {
+    final state = await _syncState();
+    return state['cursor'] as String;
+  }
+
+  Future<void> setSyncCursor(String cursor) async {
+    final db = await database;
+    await db.update('sync_state', {'cursor': cursor}, where: 'id = 0');
+  }
+
+  Future<Map<String, Object?>> _syncState() async {
+    final db = await database;
+    final rows = await db.query('sync_state', where: 'id = 0');
+    if (rows.isNotEmpty) return rows.first;
+    final random = Random.secure();
+    final token = base64Url
+        .encode(List<int>.generate(24, (_) => random.nextInt(256)))
+        .replaceAll('=', '');
+    await setSyncToken(token);
+    return {'token': token, 'cursor': '0'};
   }
 
   Future<List<AnalysisResult>> getHistory() async {
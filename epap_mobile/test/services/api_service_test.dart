@@ -1,4 +1,7 @@
+import 'dart:convert';
 import 'package:flutter_test/flutter_test.dart';
+import 'package:http/http.dart' as http;
+import 'package:msgpack_dart/msgpack_dart.dart' as msgpack;
 import 'package:epap_mobile/services/api_service.dart';
 
 void main() {
@@ -13,5 +16,21 @@ void main() {
       expect(result.success, false);
       expect(result.error, isNotNull);
     });
+
+    test('decodeBody reads UTF-8 JSON and MessagePack', () {
+      final payload = {'analysis': 'Ανάλυση', 'success': true};
+      final json = http.Response.bytes(utf8.encode(jsonEncode(payload)), 200,
+          headers: {'content-type': 'application/json'});
+      final packed = http.Response.bytes(msgpack.serialize(payload), 200,
+          headers: {'content-type': 'application/msgpack'});
+
+      expect(ApiService.decodeBody(json), payload);
+      expect(ApiService.decodeBody(packed), payload);
+    });
+
+    test('contentHash matches the server normalisation', () {
+      expect(contentHash('  Η κυβέρνηση\n\n ανακοίνωσε μέτρα '),
+          'aa82832246fdf7402f2daa4ed4e930e9bfe3fbb5a37cc8a53cc10d1b6e78ec7b');
+    });
   });
 }
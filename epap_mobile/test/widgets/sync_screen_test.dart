@@ -0,0 +1,16 @@
+import 'package:flutter_test/flutter_test.dart';
+import 'package:epap_mobile/screens/sync_screen.dart';
+
+void main() {
+  group('isValidSyncToken', () {
+    test('accepts a generated token', () {
+      expect(isValidSyncToken('q8Xz-3vN_0aLk2Pw7cRt9yHmBd5sUe1F'), isTrue);
+    });
+
+    test('rejects short, long and spaced tokens', () {
+      expect(isValidSyncToken('short'), isFalse);
+      expect(isValidSyncToken('a' * 129), isFalse);
+      expect(isValidSyncToken('contains a space here'), isFalse);
+    });
+  });
+}
@@ -0,0 +1,255 @@
+"""Per-domain extraction templates learned from extraction quality.
+
+``extract_text_from_url`` used to probe a fixed selector list in order and
+often stopped at ``main``, which also contains sidebars and related-article
+teasers. For each domain, the store now tries every candidate selector on
+the first few pages. It scores each candidate by paragraph text that is not
+link text. The winner is the tightest candidate holding at least
+``TIGHTNESS`` of the best score, so ``.article-body`` beats a ``main`` that
+merely wraps it. Once one selector has won ``LEARN_PAGES`` times, later
+pages from that domain go straight to it. If it stops producing usable text
+``MAX_MISSES`` times in a row, the domain goes back to learning. An
+override set by hand is always used. With a learned template only the
+chosen node is cleaned and read; probing every candidate is the exception.
+
+Only CSS selectors are supported (BeautifulSoup has no XPath engine).
+Templates are kept in memory. With ``EXTRACTION_TEMPLATES_PATH`` they are
+merged into a shared JSON file, newest entry per domain winning.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from background import file_lock
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_SELECTORS = [
+    '[itemprop="articleBody"]', '.article-body', '.article__body', '.article-content',
+    '.article-text', '.entry-content', '.post-content', '.story-content', '.news-content',
+    '.main-text', 'article', '[role="main"]', 'main', '.content',
+]
+LEARN_PAGES = 3
+MAX_MISSES = 3
+TIGHTNESS = 0.9
+MIN_TEXT_LENGTH = 200
+MAX_LINK_DENSITY = 0.5
+BOILERPLATE_TAGS = ["script", "style", "nav", "footer", "header", "aside", "advertisement"]
+
+
+def strip_boilerplate(node):
+    for element in node(BOILERPLATE_TAGS):
+        element.decompose()
+
+
+def text_quality(node):
+    """(score, text length, link density) of a candidate content node.
+
+    The score counts characters of paragraph text outside links, so
+    navigation, teaser lists and link-heavy sidebars add little to it.
+    """
+    text_length = len(node.get_text(' ', strip=True))
+    if not text_length:
+        return 0.0, 0, 0.0
+    link_length = sum(len(a.get_text(' ', strip=True)) for a in node.find_all('a'))
+    link_density = min(link_length / text_length, 1.0)
+    paragraph_length = sum(len(p.get_text(' ', strip=True)) for p in node.find_all('p'))
+    return paragraph_length * (1.0 - link_density), text_length, link_density
+
+
+def is_usable(text_length, link_density):
+    return text_length >= MIN_TEXT_LENGTH and link_density <= MAX_LINK_DENSITY
+
+
+class DomainTemplate:
+    """Learned (or overridden) selector for one domain plus the evidence behind it"""
+
+    __slots__ = ('selector', 'override', 'wins', 'pages', 'hits', 'misses', 'consecutive_misses',
+                 'chars', 'updated')
+
+    def __init__(self):
+        self.selector = None
+        self.override = False
+        self.wins = {}
+        self.pages = 0
+        self.hits = 0
+        self.misses = 0
+        self.consecutive_misses = 0
+        self.chars = 0
+        self.updated = 0
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        template = cls()
+        for slot in cls.__slots__:
+            if slot in data:
+                setattr(template, slot, data[slot])
+        return template
+
+
+class TemplateStore:
+    """Chooses the content node of a parsed page, learning the best selector per domain"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.templates = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.templates = self._read(path)
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('EXTRACTION_TEMPLATES_PATH') or None)
+
+    def extract(self, soup, domain):
+        """Return ``(text, selector used)`` for a parsed page; selector is None for the body fallback"""
+        with self._lock:
+            template = self.templates.get(domain)
+            selector = template.selector if template else None
+            override = template.override if template else False
+        if selector:
+            node = soup.select_one(selector)
+            if node is not None:
+                strip_boilerplate(node)
+                text = node.get_text(' ', strip=True)
+                if override or len(text) >= MIN_TEXT_LENGTH:
+                    self._record(domain, hit=True, chars=len(text))
+                    return text, selector
+            self._record(domain, hit=False)
+        strip_boilerplate(soup)
+        node, selector, text_length = self._probe(soup)
+        if node is None:
+            node = soup.find('body') or soup
+        else:
+            self._learn(domain, selector, text_length)
+        return node.get_text(' ', strip=True), selector
+
+    def _probe(self, soup):
+        """Score every candidate and pick the tightest one close to the best"""
+        scored = []
+        for selector in CANDIDATE_SELECTORS:
+            node = soup.select_one(selector)
+            if node is None:
+                continue
+            score, text_length, link_density = text_quality(node)
+            if is_usable(text_length, link_density):
+                scored.append((score, text_length, selector, node))
+        if not scored:
+            return None, None, 0
+        best = max(score for score, _, _, _ in scored)
+        _, text_length, selector, node = min(
+            (candidate for candidate in scored if candidate[0] >= TIGHTNESS * best),
+            key=lambda candidate: candidate[1]
+        )
+        return node, selector, text_length
+
+    def _record(self, domain, hit, chars=0):
+        with self._lock:
+            template = self.templates.get(domain)
+            if template is None:
+                return
+            template.updated = time.time()
+            self._dirty.add(domain)
+            if hit:
+                template.hits += 1
+                template.chars += chars
+                template.consecutive_misses = 0
+                return
+            template.misses += 1
+            template.consecutive_misses += 1
+            if not template.override and template.consecutive_misses >= MAX_MISSES:
+                logger.info(f"Extraction template {template.selector} for {domain} stopped matching, relearning")
+                template.selector = None
+                template.wins = {}
+                template.consecutive_misses = 0
+
+    def _learn(self, domain, selector, chars):
+        with self._lock:
+            template = self.templates.setdefault(domain, DomainTemplate())
+            template.pages += 1
+            template.chars += chars
+            template.wins[selector] = template.wins.get(selector, 0) + 1
+            if not template.override and template.wins[selector] >= LEARN_PAGES:
+                template.selector = selector
+                logger.info(f"Learned extraction template {selector} for {domain}")
+            template.updated = time.time()
+            self._dirty.add(domain)
+
+    def get(self, domain):
+        with self._lock:
+            template = self.templates.get(domain)
+            return self._summary(domain, template) if template else None
+
+    def list(self):
+        with self._lock:
+            return [self._summary(domain, template) for domain, template in sorted(self.templates.items())]
+
+    def set_override(self, domain, selector):
+        """Pin ``selector`` for ``domain``, or drop the override (and relearn) when ``selector`` is None"""
+        with self._lock:
+            template = self.templates.setdefault(domain, DomainTemplate())
+            template.selector = selector
+            template.override = selector is not None
+            template.wins = {}
+            template.consecutive_misses = 0
+            template.updated = time.time()
+            self._dirty.add(domain)
+        self.save()
+        return self.get(domain)
+
+    @staticmethod
+    def _summary(domain, template):
+        uses = template.hits + template.pages
+        return {
+            'domain': domain,
+            'selector': template.selector,
+            'override': template.override,
+            'learning': template.selector is None,
+            'candidates': template.wins,
+            'pages_probed': template.pages,
+            'hits': template.hits,
+            'misses': template.misses,
+            'avg_chars': round(template.chars / uses) if uses else None,
+            'updated': template.updated,
+        }
+
+    def save(self):
+        """Merge changed domains into the shared file and adopt other workers' templates"""
+        if not self.path:
+            return False
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            changed = {domain: DomainTemplate.from_dict(self.templates[domain].to_dict()) for domain in dirty}
+        try:
+            with file_lock(self.path):
+                merged = self._read(self.path) if os.path.exists(self.path) else {}
+                for domain, template in changed.items():
+                    if domain not in merged or template.updated >= merged[domain].updated:
+                        merged[domain] = template
+                if changed:
+                    tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump({domain: t.to_dict() for domain, t in merged.items()},
+                                  f, ensure_ascii=False, separators=(',', ':'))
+                    os.replace(tmp_path, self.path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not save extraction templates: {str(e)}")
+            with self._lock:
+                self._dirty |= dirty
+            return False
+        with self._lock:
+            for domain in self._dirty:
+                merged[domain] = self.templates[domain]
+            self.templates = merged
+        return True
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return {domain: DomainTemplate.from_dict(data) for domain, data in json.load(f).items()}
@@ -0,0 +1,202 @@
+"""Greek text normalisation and tokenisation.
+
+Folding lowercases, removes tonos and dialytika and maps final sigma to σ
+(Latin letters are lowercased and unaccented too),
+so "Κυβέρνηση", "ΚΥΒΕΡΝΗΣΗ" and "κυβερνηση" compare equal. Folding is a
+single ``str.translate`` over a precompiled table and maps every character
+to exactly one character, so offsets into folded text are offsets into the
+original text as well.
+
+The ``*_many`` functions process a list of documents in one pass. When NumPy
+is installed they concatenate the documents into one array of UTF-16 code
+units and fold it with a single table lookup, which is an order of magnitude
+faster than ``str.translate`` on non-ASCII text; without NumPy they fall back
+to the same translate tables, with identical results.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from lazy_imports import lazy_import
+
+try:
+    # Loaded on first bulk call, not at import
+    np = lazy_import('numpy')
+except ImportError:
+    np = None
+
+# Suffixes removed by the light stemmer (folded below, longest first)
+_SUFFIXES = {
+    'ουμε', 'ουνε', 'ησεις', 'ησεων', 'ωντας', 'οντας', 'ματος', 'ματων', 'ματα',
+    'ισμος', 'ισμου', 'ισμοι', 'ισμων', 'ικος', 'ικου', 'ικοι', 'ικων', 'ικη', 'ικης', 'ικες',
+    'ικο', 'ικα', 'ησης', 'ηση', 'σεις', 'σεων', 'σης', 'ση', 'ειτε', 'ετε', 'ουν', 'ους',
+    'ων', 'ου', 'ος', 'ες', 'ας', 'ης', 'ει', 'εις', 'ια', 'ιο', 'ον', 'οι', 'αι',
+    'α', 'η', 'ο', 'ε', 'ι', 'υ', 'ω',
+}
+MIN_STEM_LENGTH = 3
+
+TOKEN_REGEX = re.compile(r'\w+')
+
+# Single texts shorter than this are folded with str.translate even when
+# NumPy is available, since the array round trip costs a few microseconds
+NUMPY_MIN_LENGTH = 256
+
+_SURROGATES = range(0xD800, 0xE000)
+
+
+def _build_fold_table():
+    table = {}
+    # Basic Latin, Latin-1, Latin Extended-A, Greek and Coptic, Greek Extended
+    ranges = [(0x0041, 0x005B), (0x00C0, 0x0180), (0x0370, 0x0400), (0x1F00, 0x2000)]
+    for codepoint in (cp for start, end in ranges for cp in range(start, end)):
+        char = chr(codepoint)
+        if unicodedata.category(char)[0] != 'L':
+            continue
+        lowered = char.lower()
+        base = ''.join(c for c in unicodedata.normalize('NFD', lowered) if not unicodedata.combining(c))
+        if len(base) == 1 and base != char:
+            table[codepoint] = base
+    table[ord('ς')] = 'σ'
+    return table
+
+
+FOLD_TABLE = _build_fold_table()
+
+
+class _TokenTable(dict):
+    """FOLD_TABLE plus every non-word character mapped to a space, filled in lazily.
+
+    ``text.translate(TOKEN_TABLE).split()`` yields exactly the tokens
+    ``TOKEN_REGEX.findall(fold(text))`` would, but splitting on spaces is
+    several times faster than running the regex.
+    """
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        value = char if TOKEN_REGEX.match(char) else ' '
+        self[codepoint] = value
+        return value
+
+
+TOKEN_TABLE = _TokenTable(FOLD_TABLE)
+
+
+@lru_cache(maxsize=None)
+def _unit_table(tokens):
+    """NumPy lookup array over all UTF-16 code units (surrogates map to themselves)"""
+    units = np.arange(0x10000, dtype=np.uint16)
+    if tokens:
+        for codepoint in range(0x10000):
+            if codepoint not in _SURROGATES:
+                units[codepoint] = ord(TOKEN_TABLE[codepoint])
+    else:
+        for codepoint, char in FOLD_TABLE.items():
+            units[codepoint] = ord(char)
+    return units
+
+
+def load_tables():
+    """Build the NumPy lookup tables now instead of on first use (e.g. before forking workers)"""
+    if np is not None:
+        _unit_table(False)
+        _unit_table(True)
+
+
+def to_code_units(texts):
+    """Concatenate ``texts`` into one uint16 array of UTF-16 code units.
+
+    Returns ``(units, offsets)`` where document i is ``units[offsets[i]:offsets[i + 1]]``.
+    Characters outside the BMP take two units, so offsets count units, not characters.
+    """
+    encoded = [text.encode('utf-16-le') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) // 2 for data in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint16), offsets
+
+
+def from_code_units(units, offsets):
+    """Inverse of ``to_code_units``"""
+    data = units.tobytes()
+    return [data[2 * start:2 * end].decode('utf-16-le') for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def _translate_many(texts, tokens=False):
+    table = TOKEN_TABLE if tokens else FOLD_TABLE
+    if np is None:
+        return [text.translate(table) for text in texts]
+    units, offsets = to_code_units(texts)
+    translated = from_code_units(_unit_table(tokens)[units], offsets)
+    if tokens:
+        # Characters outside the BMP (emoji, math letters) arrive as surrogate
+        # pairs the unit table cannot classify; redo those few documents
+        astral = np.flatnonzero((units >= _SURROGATES.start) & (units < _SURROGATES.stop))
+        for i in set(np.searchsorted(offsets, astral, side='right') - 1):
+            translated[i] = texts[i].translate(table)
+    return translated
+
+
+def fold(text):
+    """Lowercase Greek text and strip accents, keeping one output char per input char"""
+    if np is not None and len(text) >= NUMPY_MIN_LENGTH:
+        return _translate_many([text])[0]
+    return text.translate(FOLD_TABLE)
+
+
+def fold_many(texts):
+    """``fold`` over a list of documents in one pass"""
+    return _translate_many(texts)
+
+
+def normalize_whitespace(text):
+    """Collapse runs of whitespace to single spaces and trim the ends"""
+    return ' '.join(text.split())
+
+
+def normalize(text):
+    """Folded text with collapsed whitespace, for keying and duplicate detection"""
+    return normalize_whitespace(fold(text))
+
+
+def normalize_many(texts):
+    return [normalize_whitespace(text) for text in fold_many(texts)]
+
+
+GREEK_SUFFIXES = sorted({fold(suffix) for suffix in _SUFFIXES}, key=len, reverse=True)
+_SUFFIX_LENGTHS = sorted({len(suffix) for suffix in GREEK_SUFFIXES}, reverse=True)
+_SUFFIX_SET = frozenset(GREEK_SUFFIXES)
+
+
+@lru_cache(maxsize=65536)
+def stem(token):
+    """Strip one common inflectional suffix, keeping at least MIN_STEM_LENGTH characters"""
+    if token.isdigit():
+        return token
+    for length in _SUFFIX_LENGTHS:
+        if len(token) - length >= MIN_STEM_LENGTH and token[-length:] in _SUFFIX_SET:
+            return token[:-length]
+    return token
+
+
+def fold_tokens(text):
+    """``fold`` with every non-word character replaced by a space, so tokens keep their offsets"""
+    if np is not None and len(text) >= NUMPY_MIN_LENGTH:
+        return _translate_many([text], tokens=True)[0]
+    return text.translate(TOKEN_TABLE)
+
+
+def tokenize(text):
+    """Folded word tokens of ``text``"""
+    return fold_tokens(text).split()
+
+
+def tokenize_many(texts):
+    return [text.split() for text in _translate_many(texts, tokens=True)]
+
+
+def index_terms(text):
+    """Folded and stemmed terms, the form stored in and queried from the search index"""
+    return [stem(token) for token in tokenize(text)]
+
+
+def index_terms_many(texts):
+    return [[stem(token) for token in tokens] for tokens in tokenize_many(texts)]
@@ -0,0 +1,29 @@
+"""Gunicorn settings, passed with ``--config gunicorn.conf.py`` by the Procfile,
+the Dockerfile and the systemd units written by the AWS deploy scripts.
+
+The app is preloaded in the master and ``app.warm_up()`` resolves the lazily
+imported dependencies before workers are forked, so every worker starts with
+mistralai, requests, bs4 and the text tables already in memory, shared
+copy-on-write instead of loaded once per worker. Set GUNICORN_PRELOAD=0 to
+load the app in each worker instead (e.g. for ``--reload`` during development).
+
+Workers are threaded. Admission control (``admission.py``) caps how many
+threads may wait on the LLM, so the rest keep serving pages and ``/health``
+while the LLM is slow.
+"""
+import gc
+import os
+
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import app
+    app.warm_up()
+    # Move everything allocated so far out of the collector's reach, so
+    # collections in the workers do not touch (and copy) the shared pages
+    gc.freeze()
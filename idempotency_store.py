@@ -0,0 +1,208 @@
+"""Idempotency-Key bookkeeping for POST endpoints, shared by every worker.
+
+A client that retries a timed-out ``/analyze`` sends the same
+``Idempotency-Key`` again. The first request to claim the key runs the
+handler and stores its response. A duplicate that arrives while the first
+is still running is told so at once (``PENDING``), instead of starting a
+second LLM call or holding a worker thread while it waits. A duplicate that
+arrives later gets the stored response straight away.
+
+The keys live in one SQLite file, so claims are visible across gunicorn
+workers. ``BEGIN IMMEDIATE`` makes claiming atomic. A claim is a lease,
+renewed by a background thread of the claiming process while the request
+runs. If that worker dies (e.g. killed by gunicorn's timeout), renewals
+stop and the key can be claimed again once ``lease`` seconds have passed.
+The default lease covers the longest single wait of a request: a slot in
+the LLM scheduler, then the LLM call. Completed responses expire after
+``ttl``, and the oldest are evicted beyond ``max_entries``. The file stays
+bounded and nothing is held in process memory.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from admission import DEFAULT_MAX_WAIT as DEFAULT_ADMISSION_WAIT
+from background import PeriodicWorker, SQLiteConnections
+from llm_backends import DEFAULT_TIMEOUT as DEFAULT_LLM_TIMEOUT
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_LEASE = DEFAULT_ADMISSION_WAIT + DEFAULT_LLM_TIMEOUT
+# Held leases are renewed this many times per lease
+RENEWALS_PER_LEASE = 3
+DEFAULT_WAIT = 0
+DEFAULT_MAX_ENTRIES = 10000
+MAX_KEY_LENGTH = 255
+# Expired and surplus rows are pruned on every Nth claim per process
+PRUNE_EVERY = 100
+
+# Claim outcomes
+CLAIMED = 'claimed'
+PENDING = 'pending'
+DONE = 'done'
+CONFLICT = 'conflict'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    key BLOB PRIMARY KEY,
+    fingerprint BLOB NOT NULL,
+    done INTEGER NOT NULL,
+    status INTEGER,
+    headers TEXT,
+    body BLOB,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS requests_done_expires ON requests (done, expires);
+"""
+
+
+def valid_key(key):
+    return bool(key) and len(key) <= MAX_KEY_LENGTH and key.isprintable()
+
+
+def fingerprint(*parts):
+    """Digest of the request parts that must match for a key to be reused"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.digest()
+
+
+class IdempotencyStore:
+    """SQLite-backed claims and stored responses keyed by Idempotency-Key"""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, lease=DEFAULT_LEASE, wait=DEFAULT_WAIT,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.lease = lease
+        self.wait = wait
+        self.max_entries = max_entries
+        self._connections = SQLiteConnections(path, SCHEMA, isolation_level=None)
+        self._claims = 0
+        # Keys claimed by this process and not yet completed or released
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._renewer = PeriodicWorker('idempotency-leases', lease / RENEWALS_PER_LEASE, self.renew)
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv('IDEMPOTENCY_DB_PATH')
+        if not path:
+            return None
+        return cls(
+            path,
+            ttl=int(os.getenv('IDEMPOTENCY_TTL', DEFAULT_TTL)),
+            lease=float(os.getenv('IDEMPOTENCY_LEASE') or
+                        float(os.getenv('ADMISSION_MAX_WAIT', DEFAULT_ADMISSION_WAIT)) + DEFAULT_LLM_TIMEOUT),
+            wait=float(os.getenv('IDEMPOTENCY_WAIT', DEFAULT_WAIT)),
+            max_entries=int(os.getenv('IDEMPOTENCY_MAX_KEYS', DEFAULT_MAX_ENTRIES))
+        )
+
+    def _write(self, func):
+        """Run ``func(conn)`` in one immediate transaction"""
+        conn = self._connections.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(conn)
+            conn.execute('COMMIT')
+            return result
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _try_claim(self, key, request_fingerprint):
+        now = time.time()
+
+        def write(conn):
+            row = conn.execute('SELECT fingerprint, done, status, headers, body, expires FROM requests WHERE key = ?',
+                               (key,)).fetchone()
+            if row is not None and row[5] > now:
+                if row[0] != request_fingerprint:
+                    return CONFLICT, None
+                if not row[1]:
+                    return PENDING, None
+                return DONE, {'status': row[2], 'headers': json.loads(row[3]), 'body': row[4]}
+            conn.execute('INSERT OR REPLACE INTO requests (key, fingerprint, done, expires) VALUES (?, ?, 0, ?)',
+                         (key, request_fingerprint, now + self.lease))
+            return CLAIMED, None
+
+        return self._write(write)
+
+    def claim(self, key, request_fingerprint, wait=None):
+        """Claim ``key`` for this request, or find out what happened to it.
+
+        Returns ``(state, response)``. ``CLAIMED`` means the caller must run
+        the request and then call ``complete`` or ``release``. ``DONE`` comes
+        with the stored response dict (status, headers, body). ``CONFLICT``
+        means the key was used for a different request. ``PENDING`` means
+        another request holds the claim; with a ``wait`` (default
+        ``self.wait``, none) this polls for that long first, and gets the
+        claim if the other request releases the key.
+        """
+        self._claims += 1
+        if self._claims % PRUNE_EVERY == 0:
+            self.prune()
+        deadline = time.monotonic() + (self.wait if wait is None else wait)
+        delay = 0.05
+        while True:
+            state, response = self._try_claim(key, request_fingerprint)
+            if state == CLAIMED:
+                self._hold(key)
+            if state != PENDING or time.monotonic() >= deadline:
+                return state, response
+            time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, 1.0)
+
+    def _hold(self, key):
+        with self._held_lock:
+            self._held.add(key)
+        self._renewer.ensure_started()
+
+    def _drop(self, key):
+        with self._held_lock:
+            self._held.discard(key)
+
+    def renew(self):
+        """Extend the leases of the claims this process still holds"""
+        with self._held_lock:
+            keys = list(self._held)
+        if not keys:
+            return 0
+        expires = time.time() + self.lease
+        return self._write(lambda conn: conn.executemany(
+            'UPDATE requests SET expires = ? WHERE key = ? AND done = 0',
+            [(expires, key) for key in keys]).rowcount)
+
+    def complete(self, key, status, headers, body):
+        """Store the response of a claimed request for replay until the TTL passes"""
+        self._drop(key)
+        self._write(lambda conn: conn.execute(
+            'UPDATE requests SET done = 1, status = ?, headers = ?, body = ?, expires = ? WHERE key = ?',
+            (status, json.dumps(headers), body, time.time() + self.ttl, key)))
+
+    def release(self, key):
+        """Give up a claim without storing a response, so a retry runs the request again"""
+        self._drop(key)
+        self._write(lambda conn: conn.execute('DELETE FROM requests WHERE key = ? AND done = 0', (key,)))
+
+    def prune(self):
+        """Drop expired rows and the oldest completed ones beyond ``max_entries``"""
+        now = time.time()
+
+        def write(conn):
+            removed = conn.execute('DELETE FROM requests WHERE expires <= ?', (now,)).rowcount
+            surplus = conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0] - self.max_entries
+            if surplus > 0:
+                removed += conn.execute(
+                    'DELETE FROM requests WHERE key IN '
+                    '(SELECT key FROM requests WHERE done = 1 ORDER BY expires LIMIT ?)',
+                    (surplus,)).rowcount
+            return removed
+
+        return self._write(write)
+
+    def __len__(self):
+        return self._connections.get().execute('SELECT COUNT(*) FROM requests').fetchone()[0]
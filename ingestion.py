@@ -0,0 +1,320 @@
+"""Feed ingestion that pre-analyzes fresh articles to keep the cache warm.
+
+Configured RSS/Atom feeds and Google News sitemaps are polled with
+conditional GETs. New article URLs that have not been analyzed yet are queued
+and handed one at a time to a low-priority callback (normally
+``extract_text_from_url`` + ``analyze_greek_news``), so that the first real
+visitor of a trending article gets a cache hit instead of paying the full
+fetch + LLM latency.
+
+Feeds are configured with a JSON list in ``INGEST_FEEDS_FILE``::
+
+    [{"url": "https://www.example.gr/rss", "source": "example.gr",
+      "max_items_per_poll": 5, "max_items_per_day": 40}]
+
+or, for the simple case, a comma-separated list of URLs in ``INGEST_FEEDS``.
+
+A sitemap index (``<sitemapindex>``) is followed to its most recently
+modified child sitemaps. A URL counts as seen only once it was pre-analyzed;
+one that failed (e.g. no LLM capacity) is queued again by a later poll, up to
+``MAX_PREFETCH_ATTEMPTS`` times.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+from background import PeriodicWorker
+from lazy_imports import lazy_import
+from url_utils import canonicalize_url, domain_of
+
+requests = lazy_import('requests')
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ITEMS_PER_POLL = 5
+DEFAULT_MAX_ITEMS_PER_DAY = 50
+DEFAULT_MAX_AGE_HOURS = 6
+SEEN_URLS_LIMIT = 5000
+MAX_CHILD_SITEMAPS = 3
+MAX_PREFETCH_ATTEMPTS = 3
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _parse_date(value):
+    """Parse RFC 822 (RSS) or ISO 8601 (Atom/sitemap) dates into epoch seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_feed(content):
+    """Extract (url, published_ts) pairs from RSS, Atom or sitemap XML"""
+    root = ET.fromstring(content)
+    items = []
+    for element in root.iter():
+        kind = _local_name(element.tag)
+        if kind not in ('item', 'entry', 'url'):
+            continue
+        link = None
+        published = None
+        for child in element.iter():
+            name = _local_name(child.tag)
+            if name in ('link', 'loc') and link is None:
+                link = (child.text or '').strip() or child.get('href')
+            elif name in ('pubDate', 'published', 'updated', 'publication_date', 'lastmod', 'date'):
+                published = published or _parse_date(child.text)
+        if link and link.startswith(('http://', 'https://')):
+            items.append((link, published))
+    return items
+
+
+def parse_sitemap_index(content):
+    """Extract (child sitemap url, lastmod_ts) pairs from a sitemap index; [] for any other XML"""
+    root = ET.fromstring(content)
+    if _local_name(root.tag) != 'sitemapindex':
+        return []
+    children = []
+    for element in root:
+        if _local_name(element.tag) != 'sitemap':
+            continue
+        values = {_local_name(child.tag): (child.text or '').strip() for child in element}
+        if values.get('loc', '').startswith(('http://', 'https://')):
+            children.append((values['loc'], _parse_date(values.get('lastmod'))))
+    return children
+
+
+def _conditional_headers(etag, last_modified):
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+class FeedState:
+    """Per-feed configuration plus conditional-GET validators and budget usage"""
+
+    def __init__(self, url, source='', max_items_per_poll=DEFAULT_MAX_ITEMS_PER_POLL,
+                 max_items_per_day=DEFAULT_MAX_ITEMS_PER_DAY):
+        self.url = url
+        self.source = source or domain_of(url)
+        self.max_items_per_poll = max_items_per_poll
+        self.max_items_per_day = max_items_per_day
+        self.etag = None
+        self.last_modified = None
+        # Child sitemap url -> (etag, last_modified), when the feed is a sitemap index
+        self.child_validators = {}
+        self.day = None
+        self.used_today = 0
+
+    def remaining_budget(self, now):
+        day = time.strftime('%Y-%m-%d', time.gmtime(now))
+        if day != self.day:
+            self.day = day
+            self.used_today = 0
+        return min(self.max_items_per_poll, self.max_items_per_day - self.used_today)
+
+
+class FeedIngester:
+    """Poll feeds, diff them against analyzed URLs and pre-analyze new items"""
+
+    def __init__(self, feeds, process, is_known, fetch=None, poll_interval=300,
+                 item_delay=2.0, max_age_hours=DEFAULT_MAX_AGE_HOURS, lock_path=None):
+        self.feeds = feeds
+        self.process = process
+        self.is_known = is_known
+        self.fetch = fetch or _http_fetch
+        self.item_delay = item_delay
+        self.max_age = max_age_hours * 3600
+        self.pending = deque()
+        self.seen = set()
+        self._seen_order = deque()
+        # Canonical URLs waiting in pending, and failed prefetches per URL
+        self.queued = set()
+        self.attempts = {}
+        self._lock = threading.Lock()
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), 'epap-ingest.lock')
+        self._leader = None
+        self._leader_pid = None
+        self.stats = {'polls': 0, 'not_modified': 0, 'queued': 0, 'analyzed': 0, 'failed': 0}
+        self._poller = PeriodicWorker('epap-feed-poller', poll_interval, self.poll_all)
+        self._analyzer = PeriodicWorker('epap-feed-prefetch', item_delay, self.drain_one)
+
+    @classmethod
+    def from_env(cls, process, is_known):
+        """Build an ingester from INGEST_* variables, or None if no feeds are configured"""
+        feeds = []
+        feeds_file = os.getenv('INGEST_FEEDS_FILE')
+        if feeds_file and os.path.exists(feeds_file):
+            with open(feeds_file, 'r', encoding='utf-8') as f:
+                for entry in json.load(f):
+                    feeds.append(FeedState(
+                        entry['url'],
+                        source=entry.get('source', ''),
+                        max_items_per_poll=int(entry.get('max_items_per_poll', DEFAULT_MAX_ITEMS_PER_POLL)),
+                        max_items_per_day=int(entry.get('max_items_per_day', DEFAULT_MAX_ITEMS_PER_DAY)),
+                    ))
+        for url in filter(None, (u.strip() for u in os.getenv('INGEST_FEEDS', '').split(','))):
+            feeds.append(FeedState(url))
+        if not feeds:
+            return None
+        return cls(
+            feeds, process, is_known,
+            poll_interval=int(os.getenv('INGEST_POLL_INTERVAL', '300')),
+            item_delay=float(os.getenv('INGEST_ITEM_DELAY', '2')),
+            max_age_hours=float(os.getenv('INGEST_MAX_AGE_HOURS', str(DEFAULT_MAX_AGE_HOURS))),
+            lock_path=os.getenv('INGEST_LOCK_FILE'),
+        )
+
+    def ensure_started(self):
+        """Start polling in this process if it wins the cross-worker leader lock"""
+        if self._leader_pid != os.getpid():
+            self._leader_pid = os.getpid()
+            self._leader = _acquire_leader_lock(self.lock_path)
+            if self._leader:
+                logger.info(f"Feed ingestion running in worker {self._leader_pid}")
+        if self._leader:
+            self._poller.ensure_started()
+            self._analyzer.ensure_started()
+
+    def poll_all(self):
+        for feed in self.feeds:
+            try:
+                self.poll(feed)
+            except Exception as e:
+                logger.error(f"Feed poll failed for {feed.url}: {str(e)}")
+
+    def poll(self, feed, now=None):
+        """Poll one feed and queue unseen articles within its budget"""
+        now = now or time.time()
+        status, response_headers, content = self.fetch(feed.url, _conditional_headers(feed.etag, feed.last_modified))
+        self.stats['polls'] += 1
+        if status == 304:
+            self.stats['not_modified'] += 1
+            return 0
+        feed.etag = response_headers.get('ETag') or feed.etag
+        feed.last_modified = response_headers.get('Last-Modified') or feed.last_modified
+
+        items = parse_feed(content) + self._child_items(feed, parse_sitemap_index(content), now)
+        # Newest first so a tight budget goes to what people are reading now
+        items.sort(key=lambda item: item[1] or 0, reverse=True)
+        budget = feed.remaining_budget(now)
+        queued = 0
+        for link, published in items:
+            if queued >= budget:
+                break
+            if published and now - published > self.max_age:
+                continue
+            canonical = canonicalize_url(link)
+            with self._lock:
+                if canonical in self.seen or canonical in self.queued or self.is_known(canonical):
+                    continue
+                self.queued.add(canonical)
+                self.pending.append((link, feed.source))
+            queued += 1
+        feed.used_today += queued
+        self.stats['queued'] += queued
+        if queued:
+            logger.info(f"Queued {queued} new articles from {feed.url}")
+        return queued
+
+    def _child_items(self, feed, children, now):
+        """Items of the most recently modified child sitemaps of a sitemap index"""
+        children = [(url, modified) for url, modified in children
+                    if not modified or now - modified <= self.max_age]
+        children.sort(key=lambda child: child[1] or 0, reverse=True)
+        items = []
+        validators = {}
+        for url, _ in children[:MAX_CHILD_SITEMAPS]:
+            etag, last_modified = feed.child_validators.get(url, (None, None))
+            validators[url] = (etag, last_modified)
+            try:
+                status, headers, content = self.fetch(url, _conditional_headers(etag, last_modified))
+                if status == 304:
+                    continue
+                validators[url] = (headers.get('ETag') or etag, headers.get('Last-Modified') or last_modified)
+                items.extend(parse_feed(content))
+            except Exception as e:
+                logger.error(f"Child sitemap fetch failed for {url}: {str(e)}")
+        feed.child_validators = validators
+        return items
+
+    def drain_one(self):
+        """Pre-analyze the next queued article (runs on the low-priority thread)"""
+        with self._lock:
+            if not self.pending:
+                return False
+            url, source = self.pending.popleft()
+        canonical = canonicalize_url(url)
+        done = False
+        try:
+            done = self.process(url, source)
+        finally:
+            with self._lock:
+                self.queued.discard(canonical)
+                attempts = 0 if done else self.attempts.get(canonical, 0) + 1
+                if attempts and attempts < MAX_PREFETCH_ATTEMPTS:
+                    # Left unseen, so a later poll queues it again
+                    self.attempts[canonical] = attempts
+                    if len(self.attempts) > SEEN_URLS_LIMIT:
+                        self.attempts.pop(next(iter(self.attempts)))
+                else:
+                    self.attempts.pop(canonical, None)
+                    self._remember(canonical)
+        if done:
+            self.stats['analyzed'] += 1
+        else:
+            self.stats['failed'] += 1
+        return True
+
+    def _remember(self, canonical):
+        self.seen.add(canonical)
+        self._seen_order.append(canonical)
+        if len(self._seen_order) > SEEN_URLS_LIMIT:
+            self.seen.discard(self._seen_order.popleft())
+
+
+def _acquire_leader_lock(path):
+    """Take a non-blocking exclusive file lock so only one worker polls feeds"""
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    handle = open(path, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def _http_fetch(url, headers):
+    headers = dict(headers)
+    headers.setdefault('User-Agent', 'ΕΠΑΠ feed ingester (+https://epap.vercel.app/)')
+    response = requests.get(url, headers=headers, timeout=15)
+    if response.status_code != 304:
+        response.raise_for_status()
+    return response.status_code, response.headers, response.content
@@ -0,0 +1,71 @@
+"""Deferred loading of heavy dependencies and clients.
+
+Importing ``mistralai`` alone takes most of a second (it pulls in httpx,
+pydantic and their transports), and ``requests``, ``bs4`` and NumPy add
+more. None of them is needed to serve ``/health`` or a static file, so
+``app.py`` binds them through ``lazy_import``, a ``LazyObject`` proxy that
+imports the module on first attribute access with the normal import
+machinery. Clients such as the Mistral client are wrapped in ``LazyObject``
+too and built on first use.
+
+Under ``gunicorn --preload`` (see ``gunicorn.conf.py``), ``app.warm_up()``
+resolves everything in the master before forking. Workers then start with
+the modules already loaded and share those pages copy-on-write. Without
+preloading, the first use can happen on several gthread threads at once, so
+a proxy resolves its target under a lock.
+"""
+import importlib
+import importlib.util
+import threading
+
+
+def lazy_import(name):
+    """Return a proxy for module ``name`` that imports it on first attribute access.
+
+    Raises ModuleNotFoundError straight away if the module is not installed.
+    """
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return LazyObject(lambda: importlib.import_module(name))
+
+
+class LazyObject:
+    """Proxy that builds the wrapped object with ``factory()`` on first attribute access"""
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_target', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _resolve(self):
+        target = object.__getattribute__(self, '_target')
+        if target is None:
+            with object.__getattribute__(self, '_lock'):
+                target = object.__getattribute__(self, '_target')
+                if target is None:
+                    target = object.__getattribute__(self, '_factory')()
+                    object.__setattr__(self, '_target', target)
+        return target
+
+    @property
+    def loaded(self):
+        return object.__getattribute__(self, '_target') is not None
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._resolve(), name)
+
+    def __repr__(self):
+        if self.loaded:
+            return f"<LazyObject {object.__getattribute__(self, '_target')!r}>"
+        return '<LazyObject (not loaded)>'
+
+
+def is_loaded(module):
+    """Whether a module returned by ``lazy_import`` has actually been imported"""
+    return not isinstance(module, LazyObject) or module.loaded
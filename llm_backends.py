@@ -0,0 +1,287 @@
+"""Interchangeable LLM backends for the article analysis.
+
+``analyze_greek_news`` talks to an ``LLMBackend`` rather than to the Mistral
+client directly. Three implementations are provided:
+
+* ``mistral`` - the Mistral API (the default, as before).
+* ``openai`` - any OpenAI-compatible ``/chat/completions`` endpoint, such as
+  vLLM, llama.cpp's server, Ollama or OpenAI itself (``LLM_OPENAI_BASE_URL``).
+* ``local`` - a quantized GGUF model run in-process on the CPU through
+  llama-cpp-python (``LLM_LOCAL_MODEL_PATH``). It needs no network and no
+  key, for offline use and cheap bulk scoring.
+
+``BackendRegistry`` holds the configured backends. It picks one by explicit
+name (the ``backend`` field of ``POST /analyze``), by lane (``LLM_LANE_BACKENDS``,
+e.g. ``prefetch=local`` for feed ingestion) or falls back to ``LLM_BACKEND``.
+Every backend keeps its own latency and throughput statistics. Calls can be
+recorded to, or replayed from, fixtures (see ``llm_fixtures.py``).
+"""
+import bisect
+import importlib
+import logging
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from lazy_imports import lazy_import
+
+requests = lazy_import('requests')
+
+logger = logging.getLogger(__name__)
+
+# Latencies kept per backend for the percentiles
+LATENCY_SAMPLES = 1000
+# Window over which requests per minute are reported
+THROUGHPUT_WINDOW = 60
+# Seconds an HTTP backend may take to answer
+DEFAULT_TIMEOUT = 120
+
+Completion = namedtuple('Completion', 'text usage')
+
+
+def usage_counts(usage):
+    """Token counts from an API usage object or dict, if any"""
+    counts = {}
+    for field in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+        value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+        if isinstance(value, int):
+            counts[field] = value
+    return counts
+
+
+class BackendStats:
+    """Thread-safe latency and throughput counters for one backend"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.completion_tokens = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._finished = deque()
+
+    def record(self, latency, usage=None, error=False):
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            self.busy_seconds += latency
+            self.completion_tokens += (usage or {}).get('completion_tokens', 0)
+            self._latencies.append(latency)
+            self._finished.append(now)
+            while self._finished and self._finished[0] < now - THROUGHPUT_WINDOW:
+                self._finished.popleft()
+
+    def summary(self):
+        now = time.monotonic()
+        with self._lock:
+            latencies = sorted(self._latencies)
+            recent = len(self._finished) - bisect.bisect_left(self._finished, now - THROUGHPUT_WINDOW)
+            busy, tokens = self.busy_seconds, self.completion_tokens
+
+            def percentile(fraction):
+                if not latencies:
+                    return None
+                return round(latencies[min(int(fraction * len(latencies)), len(latencies) - 1)], 3)
+
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'latency_p50': percentile(0.5),
+                'latency_p95': percentile(0.95),
+                'latency_mean': round(busy / self.requests, 3) if self.requests else None,
+                'requests_per_minute': recent * 60 / THROUGHPUT_WINDOW,
+                'tokens_per_second': round(tokens / busy, 1) if busy and tokens else None,
+            }
+
+
+class LLMBackend:
+    """Chat-completion backend; subclasses implement ``_complete``"""
+
+    name = None
+
+    def __init__(self, model):
+        self.model = model
+        self.stats = BackendStats()
+
+    @property
+    def model_id(self):
+        return f"{self.name}:{self.model}"
+
+    def complete(self, messages, temperature):
+        """Run one chat completion and return a ``Completion``, recording its latency"""
+        started = time.perf_counter()
+        try:
+            completion = self._complete(messages, temperature)
+            if not completion.text:
+                raise ValueError(f"Empty content in {self.name} response")
+        except Exception:
+            self.stats.record(time.perf_counter() - started, error=True)
+            raise
+        self.stats.record(time.perf_counter() - started, completion.usage)
+        return completion
+
+    def _complete(self, messages, temperature):
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Load what can safely be shared with forked workers"""
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.model_id}>"
+
+
+class MistralBackend(LLMBackend):
+    name = 'mistral'
+
+    def __init__(self, client, model):
+        super().__init__(model)
+        self.client = client
+
+    def _complete(self, messages, temperature):
+        response = self.client.chat.complete(model=self.model, messages=messages, temperature=temperature)
+        if not response or not response.choices:
+            raise ValueError("Empty response from Mistral API")
+        return Completion(response.choices[0].message.content, usage_counts(getattr(response, 'usage', None)))
+
+    def warm_up(self):
+        self.client.chat
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Any server implementing OpenAI's ``POST /chat/completions``"""
+
+    name = 'openai'
+
+    def __init__(self, base_url, model, api_key=None, timeout=DEFAULT_TIMEOUT):
+        super().__init__(model)
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def _complete(self, messages, temperature):
+        headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+        response = requests.post(self.url, headers=headers, timeout=self.timeout, json={
+            'model': self.model,
+            'messages': messages,
+            'temperature': temperature
+        })
+        response.raise_for_status()
+        data = response.json()
+        if not data.get('choices'):
+            raise ValueError(f"Empty response from {self.url}")
+        return Completion(data['choices'][0]['message']['content'], usage_counts(data.get('usage') or {}))
+
+    def warm_up(self):
+        requests.Session
+
+
+class LocalBackend(LLMBackend):
+    """Quantized GGUF model run in-process on the CPU with llama-cpp-python.
+
+    The model is loaded on first use in each process (never in a preloading
+    master, whose threads would not survive the fork). Weights are mmapped,
+    so workers on one host share them through the page cache. A llama.cpp
+    context serves one completion at a time, so calls are serialised.
+    """
+
+    name = 'local'
+
+    def __init__(self, model_path, threads=None, context=4096, max_tokens=1024):
+        super().__init__(os.path.basename(model_path))
+        self.model_path = model_path
+        self.threads = threads
+        self.context = context
+        self.max_tokens = max_tokens
+        self._llama = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            llama_cpp = importlib.import_module('llama_cpp')
+        except ImportError:
+            raise RuntimeError("The local backend needs llama-cpp-python (pip install llama-cpp-python)")
+        logger.info(f"Loading local model {self.model_path}")
+        return llama_cpp.Llama(model_path=self.model_path, n_ctx=self.context, n_threads=self.threads,
+                               verbose=False)
+
+    def _complete(self, messages, temperature):
+        with self._lock:
+            if self._llama is None or self._pid != os.getpid():
+                self._llama = self._load()
+                self._pid = os.getpid()
+            data = self._llama.create_chat_completion(messages=messages, temperature=temperature,
+                                                      max_tokens=self.max_tokens)
+        return Completion(data['choices'][0]['message']['content'], usage_counts(data.get('usage') or {}))
+
+    def warm_up(self):
+        try:
+            importlib.import_module('llama_cpp')
+        except ImportError:
+            logger.warning("llama-cpp-python is not installed; the local backend will fail")
+
+
+def parse_lanes(spec):
+    """``'prefetch=local,overflow=local'`` -> ``{'prefetch': 'local', 'overflow': 'local'}``"""
+    lanes = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        lane, _, backend = item.partition('=')
+        if not backend.strip():
+            raise ValueError(f"Invalid lane mapping: {item!r}")
+        lanes[lane.strip()] = backend.strip()
+    return lanes
+
+
+class BackendRegistry:
+    """Configured backends, the default and the per-lane choices"""
+
+    def __init__(self, backends, default, lanes=None):
+        self.backends = {backend.name: backend for backend in backends}
+        self.lanes = dict(lanes or {})
+        for name in [default, *self.lanes.values()]:
+            if name not in self.backends:
+                raise ValueError(f"Unknown LLM backend {name!r} (configured: {', '.join(self.backends)})")
+        self.default = self.backends[default]
+
+    @classmethod
+    def from_env(cls, mistral_client, mistral_model):
+        backends = [MistralBackend(mistral_client, mistral_model)]
+        base_url = os.getenv('LLM_OPENAI_BASE_URL')
+        if base_url:
+            backends.append(OpenAICompatibleBackend(
+                base_url, os.getenv('LLM_OPENAI_MODEL', 'gpt-4o-mini'), os.getenv('LLM_OPENAI_API_KEY')))
+        model_path = os.getenv('LLM_LOCAL_MODEL_PATH')
+        if model_path:
+            backends.append(LocalBackend(
+                model_path,
+                threads=int(os.getenv('LLM_LOCAL_THREADS', 0)) or None,
+                context=int(os.getenv('LLM_LOCAL_CONTEXT', 4096))
+            ))
+        # Imported here: llm_fixtures builds on the classes above
+        from llm_fixtures import wrap_from_env
+        return cls(wrap_from_env(backends), os.getenv('LLM_BACKEND', 'mistral'),
+                   parse_lanes(os.getenv('LLM_LANE_BACKENDS', '')))
+
+    def get(self, name=None, lane=None):
+        """The backend called ``name``, else the one for ``lane``, else the default.
+
+        Raises KeyError for an unknown name.
+        """
+        if name:
+            return self.backends[name]
+        return self.backends[self.lanes[lane]] if lane in self.lanes else self.default
+
+    def __contains__(self, name):
+        return name in self.backends
+
+    def __iter__(self):
+        return iter(self.backends.values())
+
+    def stats(self):
+        return {
+            name: dict(backend.stats.summary(), model=backend.model, default=backend is self.default,
+                       lanes=sorted(lane for lane, target in self.lanes.items() if target == name))
+            for name, backend in self.backends.items()
+        }
@@ -0,0 +1,159 @@
+"""Record/replay of LLM calls for deterministic tests, benchmarks and load tests.
+
+In ``record`` mode every backend is wrapped in a ``RecordingBackend``. Each
+real completion is saved with its latency to a ``FixtureStore``, which is a
+directory of JSON files named by a hash of the request (messages and
+temperature). In ``replay`` mode, ``ReplayBackend`` takes the place of
+every backend. It keeps the backend's name and model, so cache keys and
+analysis records look the same. It answers from the store without any
+network, after sleeping for the recorded latency times ``latency_scale``
+(``0`` replays instantly).
+
+A replay looks up the exact request by default, and a miss raises
+``FixtureMissing``. With ``match='any'``, a request that was never recorded
+gets one of the recorded fixtures, picked deterministically from its hash.
+Load tests can then send articles that were never recorded.
+
+Configured through ``LLM_FIXTURES_MODE`` (``record`` or ``replay``),
+``LLM_FIXTURES_PATH``, ``LLM_FIXTURES_LATENCY_SCALE`` and ``LLM_FIXTURES_MATCH``.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from llm_backends import Completion, LLMBackend
+
+logger = logging.getLogger(__name__)
+
+MODES = ('record', 'replay')
+MATCHES = ('exact', 'any')
+
+
+class FixtureMissing(KeyError):
+    """No recorded response for a request being replayed"""
+
+
+def request_key(messages, temperature):
+    """Stable hash of a chat request, used as the fixture file name"""
+    canonical = json.dumps({'messages': messages, 'temperature': temperature},
+                           ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class FixtureStore:
+    """Directory of recorded request/response pairs, one JSON file each"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keys = None
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def keys(self):
+        """Recorded request keys in sorted order (cached after the first listing)"""
+        with self._lock:
+            if self._keys is None:
+                names = os.listdir(self.path) if os.path.isdir(self.path) else []
+                self._keys = sorted(name[:-5] for name in names if name.endswith('.json'))
+            return list(self._keys)
+
+    def load(self, key):
+        try:
+            with open(self._file(key), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise FixtureMissing(key)
+
+    def save(self, key, fixture):
+        os.makedirs(self.path, exist_ok=True)
+        # Written atomically, so concurrent replays never read half a file
+        temporary = f"{self._file(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temporary, self._file(key))
+        with self._lock:
+            self._keys = None
+
+    def __len__(self):
+        return len(self.keys())
+
+
+class RecordingBackend(LLMBackend):
+    """Passes calls to a real backend and records each request/response pair"""
+
+    def __init__(self, inner, store):
+        super().__init__(inner.model)
+        self.name = inner.name
+        self.inner = inner
+        self.store = store
+
+    def _complete(self, messages, temperature):
+        started = time.perf_counter()
+        completion = self.inner._complete(messages, temperature)
+        latency = time.perf_counter() - started
+        self.store.save(request_key(messages, temperature), {
+            'backend': self.inner.model_id,
+            'request': {'messages': messages, 'temperature': temperature},
+            'response': {'text': completion.text, 'usage': completion.usage},
+            'latency': round(latency, 4),
+            'recorded': time.time()
+        })
+        return completion
+
+    def warm_up(self):
+        self.inner.warm_up()
+
+
+class ReplayBackend(LLMBackend):
+    """Serves recorded responses in place of a backend, with recorded or scaled latency"""
+
+    def __init__(self, name, model, store, latency_scale=1.0, match='exact'):
+        super().__init__(model)
+        self.name = name
+        self.store = store
+        self.latency_scale = latency_scale
+        self.match = match
+
+    def _fixture(self, key):
+        try:
+            return self.store.load(key)
+        except FixtureMissing:
+            keys = self.store.keys() if self.match == 'any' else None
+            if not keys:
+                raise
+            return self.store.load(keys[int(key, 16) % len(keys)])
+
+    def _complete(self, messages, temperature):
+        fixture = self._fixture(request_key(messages, temperature))
+        if self.latency_scale:
+            time.sleep(fixture['latency'] * self.latency_scale)
+        return Completion(fixture['response']['text'], fixture['response']['usage'])
+
+
+def wrap_backends(backends, mode, path, latency_scale=1.0, match='exact'):
+    """Wrap every backend for recording, or replace it for replay"""
+    if mode not in MODES:
+        raise ValueError(f"LLM_FIXTURES_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    if match not in MATCHES:
+        raise ValueError(f"LLM_FIXTURES_MATCH must be one of {', '.join(MATCHES)}, not {match!r}")
+    store = FixtureStore(path)
+    logger.info(f"LLM fixtures: {mode} at {path}")
+    if mode == 'record':
+        return [RecordingBackend(backend, store) for backend in backends]
+    return [ReplayBackend(backend.name, backend.model, store, latency_scale, match) for backend in backends]
+
+
+def wrap_from_env(backends):
+    mode = os.getenv('LLM_FIXTURES_MODE')
+    if not mode:
+        return backends
+    return wrap_backends(
+        backends, mode,
+        os.getenv('LLM_FIXTURES_PATH', 'fixtures/llm'),
+        latency_scale=float(os.getenv('LLM_FIXTURES_LATENCY_SCALE', 1.0)),
+        match=os.getenv('LLM_FIXTURES_MATCH', 'exact')
+    )
@@ -0,0 +1,189 @@
+"""Highlights of loaded, hyperbolic and fear-inducing words, with character offsets.
+
+The lexicon is a JSON file (``loaded_lexicon.json``, or ``LOADED_LEXICON_PATH``)
+of categories, each mapping a term to its inflected forms::
+
+    {"fear": {"απειλή": ["απειλή", "απειλής", "απειλές", "απειλών"]}, ...}
+
+Every form is folded and split into words (see ``greek_text.py``), and all
+forms are compiled into one Aho-Corasick automaton whose alphabet is words.
+One pass over the words of the text finds every form of every term,
+whatever the accents, case, punctuation or line breaks, and matches always
+start and end at word boundaries. Folding maps each character to one
+character, so word offsets in the folded text are offsets into the original.
+Where two matches overlap, the leftmost and then the longest is kept.
+
+Offsets count UTF-16 code units, as JavaScript strings do, so the web UI
+and the extension can slice the text with them directly.
+
+The file is checked for changes at most every ``RELOAD_CHECK_INTERVAL``
+seconds and recompiled when it changes, without a restart. A file that does
+not parse is logged and the previous automaton is kept.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from greek_text import fold_tokens, tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'loaded_lexicon.json')
+RELOAD_CHECK_INTERVAL = 5
+
+# Characters outside the BMP take two UTF-16 code units
+_ASTRAL = re.compile('[\U00010000-\U0010FFFF]')
+
+
+class Automaton:
+    """Aho-Corasick automaton over the folded words of lexicon forms"""
+
+    def __init__(self, lexicon):
+        # Node -> {word: node}, node -> failure node, node -> [(words in form, term, category)]
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.terms = 0
+        seen = set()
+        for category, terms in lexicon.items():
+            for term, forms in terms.items():
+                self.terms += 1
+                for form in {tuple(tokenize(form)) for form in [term, *forms]}:
+                    if form and form not in seen:
+                        seen.add(form)
+                        self._add(form, (len(form), term, category))
+        self.forms = len(seen)
+        self._link()
+
+    def _add(self, words, entry):
+        node = 0
+        for word in words:
+            following = self.goto[node].get(word)
+            if following is None:
+                following = len(self.goto)
+                self.goto[node][word] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = following
+        self.output[node].append(entry)
+
+    def _link(self):
+        """Failure links breadth first; each node also reports the forms ending at its failure node"""
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for word, following in self.goto[node].items():
+                queue.append(following)
+                fallback = self.fail[node]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[following] = self.goto[fallback].get(word, 0)
+                self.output[following] = self.output[following] + self.output[self.fail[following]]
+
+    def matches(self, text):
+        """``(start, end, term, category)`` of every form in ``text``, overlaps included"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = []
+        # Start offset of every word so far; splitting on single spaces keeps them countable
+        starts = []
+        node = 0
+        end = 0
+        for word in fold_tokens(text).split(' '):
+            start = end
+            end += len(word) + 1
+            if not word:
+                continue
+            starts.append(start)
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            for length, term, category in output[node]:
+                found.append((starts[-length], end - 1, term, category))
+        return found
+
+
+def select(matches):
+    """Leftmost, then longest, non-overlapping matches"""
+    selected = []
+    end = 0
+    for match in sorted(matches, key=lambda match: (match[0], -match[1])):
+        if match[0] >= end:
+            selected.append(match)
+            end = match[1]
+    return selected
+
+
+def utf16_offsets(text, spans):
+    """Re-express character offsets as UTF-16 code unit offsets"""
+    astral = [match.start() for match in _ASTRAL.finditer(text)]
+    if not astral:
+        return spans
+
+    def shift(offset):
+        return offset + sum(1 for position in astral if position < offset)
+
+    return [(shift(start), shift(end), *rest) for start, end, *rest in spans]
+
+
+class LoadedLanguage:
+    """The compiled lexicon, reloaded when its file changes"""
+
+    def __init__(self, path=DEFAULT_LEXICON_PATH, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._automaton = None
+        self._stat = None
+        self._checked_at = 0.0
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('LOADED_LEXICON_PATH') or DEFAULT_LEXICON_PATH)
+
+    def _current(self):
+        """The automaton, recompiled first if the lexicon file changed"""
+        now = time.time()
+        if self._automaton is not None and now - self._checked_at < self.check_interval:
+            return self._automaton
+        with self._lock:
+            if self._automaton is not None and now - self._checked_at < self.check_interval:
+                return self._automaton
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                if signature != self._stat:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        automaton = Automaton(json.load(f))
+                    self._automaton, self._stat, self._loaded_at = automaton, signature, now
+                    logger.info(f"Loaded {automaton.terms} lexicon terms ({automaton.forms} forms) from {self.path}")
+            except (OSError, ValueError, AttributeError, TypeError) as e:
+                logger.error(f"Could not load lexicon {self.path}: {str(e)}")
+            return self._automaton
+
+    def annotate(self, text):
+        """Highlights in ``text``: ``[{start, end, text, category, term}]``, offsets in UTF-16 code units.
+
+        ``text`` is the matched words as they appear, for clients that do not
+        hold the analyzed text (e.g. articles fetched by URL).
+        """
+        automaton = self._current()
+        if automaton is None or not text:
+            return []
+        spans = [(start, end, text[start:end], term, category)
+                 for start, end, term, category in select(automaton.matches(text))]
+        return [{'start': start, 'end': end, 'text': words, 'category': category, 'term': term}
+                for start, end, words, term, category in utf16_offsets(text, spans)]
+
+    def stats(self):
+        automaton = self._current()
+        return {
+            'path': self.path,
+            'terms': automaton.terms if automaton else 0,
+            'forms': automaton.forms if automaton else 0,
+            'loaded_at': self._loaded_at,
+        }
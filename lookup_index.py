@@ -0,0 +1,137 @@
+"""Analysis lookups by article URL and by content hash, shared by every worker.
+
+``url_index`` maps a canonical article URL, and ``content_index`` a
+``(content hash, source)`` pair, to ``{'key', 'text_length', 'highlights'}``
+of its analysis. The first lets a known article be answered without fetching
+it again, the second lets a client holding the text find its analysis before
+uploading it (see ``content_hash`` in ``app.py``).
+
+Both live in one SQLite file (``LOOKUP_DB_PATH``, by default next to
+``CACHE_SNAPSHOT_PATH``), so every gunicorn worker finds the same entries and
+they outlive restarts and deploys together with the snapshotted analyses.
+Without either path they are kept in process memory. Each index keeps at most
+``max_entries`` entries and evicts the least recently used.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from background import SQLiteConnections
+
+DEFAULT_MAX_ENTRIES = 50000
+# Surplus rows are trimmed on every Nth write per process
+TRIM_EVERY = 100
+# Reads refresh an entry's last use at most this often, so lookups rarely write
+TOUCH_INTERVAL = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lookups (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (kind, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lookups_used ON lookups (kind, used);
+"""
+
+
+def _row_id(key):
+    """Row id of a URL, or of a ``(content hash, source)`` pair"""
+    return '\t'.join(key) if isinstance(key, tuple) else key
+
+
+class LookupTable:
+    """Dict-like, size-capped index of one kind, in SQLite or (without a file) in memory"""
+
+    def __init__(self, kind, connections=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.kind = kind
+        self.max_entries = max_entries
+        self._connections = connections
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key, default=None):
+        if self._connections is None:
+            with self._lock:
+                entry = self._memory.get(_row_id(key))
+                if entry is not None:
+                    self._memory.move_to_end(_row_id(key))
+            return default if entry is None else entry
+        conn = self._connections.get()
+        row = conn.execute('SELECT entry, used FROM lookups WHERE kind = ? AND id = ?',
+                           (self.kind, _row_id(key))).fetchone()
+        if row is None:
+            return default
+        now = time.time()
+        if now - row[1] > TOUCH_INTERVAL:
+            with conn:
+                conn.execute('UPDATE lookups SET used = ? WHERE kind = ? AND id = ?', (now, self.kind, _row_id(key)))
+        return json.loads(row[0])
+
+    def __getitem__(self, key):
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, entry):
+        if self._connections is None:
+            with self._lock:
+                self._memory[_row_id(key)] = entry
+                self._memory.move_to_end(_row_id(key))
+                while len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+            return
+        conn = self._connections.get()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO lookups (kind, id, entry, used) VALUES (?, ?, ?, ?)',
+                         (self.kind, _row_id(key), json.dumps(entry, ensure_ascii=False), time.time()))
+        self._writes += 1
+        if self._writes % TRIM_EVERY == 0:
+            self.trim()
+
+    def trim(self):
+        """Drop the least recently used entries beyond ``max_entries``"""
+        if self._connections is None:
+            return 0
+        conn = self._connections.get()
+        with conn:
+            surplus = conn.execute('SELECT COUNT(*) FROM lookups WHERE kind = ?',
+                                   (self.kind,)).fetchone()[0] - self.max_entries
+            if surplus <= 0:
+                return 0
+            return conn.execute(
+                'DELETE FROM lookups WHERE kind = ? AND id IN '
+                '(SELECT id FROM lookups WHERE kind = ? ORDER BY used LIMIT ?)',
+                (self.kind, self.kind, surplus)).rowcount
+
+    def __len__(self):
+        if self._connections is None:
+            return len(self._memory)
+        return self._connections.get().execute('SELECT COUNT(*) FROM lookups WHERE kind = ?',
+                                               (self.kind,)).fetchone()[0]
+
+
+class LookupIndex:
+    """The URL and content-hash indexes, sharing one SQLite file when a path is given"""
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        connections = SQLiteConnections(path, SCHEMA) if path else None
+        self.urls = LookupTable('url', connections, max_entries)
+        self.contents = LookupTable('content', connections, max_entries)
+
+    @classmethod
+    def from_env(cls):
+        snapshot = os.getenv('CACHE_SNAPSHOT_PATH')
+        return cls(
+            os.getenv('LOOKUP_DB_PATH') or (f"{snapshot}.lookup.db" if snapshot else None),
+            max_entries=int(os.getenv('LOOKUP_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        )
@@ -0,0 +1,166 @@
+"""On-demand request profiling for ΕΠΑΠ.
+
+Profiles are captured per request, either because the caller asked for it
+(``X-Profile`` header from an admin) or because the request was picked by the
+1-in-N sampler. Two capture modes are supported:
+
+* ``sample`` - a background thread samples the request thread's stack and
+  writes collapsed stacks (``.folded``), the input format of flamegraph.pl,
+  speedscope and inferno.
+* ``cprofile`` - a deterministic ``cProfile`` run dumped as ``.prof``
+  (pstats), viewable with snakeviz or convertible with flameprof.
+
+The module is always imported, but no request hooks are registered and
+nothing is captured unless ``PROFILE_DIR`` is set.
+"""
+import cProfile
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('sample', 'cprofile')
+PROFILE_EXTENSIONS = {'sample': '.folded', 'cprofile': '.prof'}
+
+
+class StackSampler:
+    """Periodically sample one thread's Python stack into collapsed form"""
+
+    def __init__(self, thread_id, interval=0.002):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='epap-stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own_frames = sys._current_frames
+        while not self._stop.wait(self.interval):
+            frame = own_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def folded(self):
+        """Return the samples as flamegraph collapsed-stack lines"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Capture profiles for selected requests and keep the most recent ones on disk"""
+
+    def __init__(self, directory, mode='sample', sample_rate=0, max_profiles=50, interval=0.002):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.max_profiles = max_profiles
+        self.interval = interval
+        self._counter = itertools.count(1)
+        self._sequence = itertools.count(1)
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Build a profiler from PROFILE_* variables, or None when profiling is disabled"""
+        directory = os.getenv('PROFILE_DIR')
+        if not directory:
+            return None
+        return cls(
+            directory,
+            mode=os.getenv('PROFILE_MODE', 'sample'),
+            sample_rate=int(os.getenv('PROFILE_SAMPLE_RATE', '0')),
+            max_profiles=int(os.getenv('PROFILE_MAX_FILES', '50')),
+        )
+
+    def should_profile(self, forced=False):
+        """Decide whether the current request gets profiled"""
+        if forced:
+            return True
+        rate = self.sample_rate
+        return rate > 0 and next(self._counter) % rate == 0
+
+    def start(self):
+        """Start profiling the calling thread and return an opaque handle"""
+        if self.mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already active in this interpreter
+                logger.warning("Skipping profile: another profiler is active")
+                return None
+            return profile
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        return sampler
+
+    def stop(self, handle, label):
+        """Stop a running profile, write it to disk and return the file name"""
+        if handle is None:
+            return None
+        # The handle decides the format: the mode may have changed since start()
+        ext = PROFILE_EXTENSIONS['cprofile' if isinstance(handle, cProfile.Profile) else 'sample']
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', label).strip('-') or 'root'
+        # pid and sequence keep concurrent requests to one path from sharing a file
+        name = f"{int(time.time() * 1000)}-{os.getpid()}-{next(self._sequence)}-{slug}{ext}"
+        path = os.path.join(self.directory, name)
+        if isinstance(handle, cProfile.Profile):
+            handle.disable()
+            handle.dump_stats(path)
+        else:
+            handle.stop()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(handle.folded())
+        self._prune()
+        logger.info(f"Wrote profile {name}")
+        return name
+
+    def list_profiles(self):
+        """Return metadata for stored profiles, newest first"""
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(tuple(PROFILE_EXTENSIONS.values())):
+                stat = entry.stat()
+                profiles.append({
+                    'name': entry.name,
+                    'size': stat.st_size,
+                    'created': stat.st_mtime,
+                })
+        profiles.sort(key=lambda p: p['created'], reverse=True)
+        return profiles
+
+    def profile_path(self, name):
+        """Resolve a stored profile name to a path, rejecting anything outside the directory"""
+        if os.path.basename(name) != name or not name.endswith(tuple(PROFILE_EXTENSIONS.values())):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def _prune(self):
+        for stale in self.list_profiles()[self.max_profiles:]:
+            try:
+                os.remove(os.path.join(self.directory, stale['name']))
+            except OSError:
+                pass
@@ -0,0 +1,177 @@
+"""Inputs and popularity of cached analyses, for re-analysis after a prompt or model upgrade.
+
+Every cache entry is tagged with the version of the prompt and model that
+produced it (see ``cache_snapshot.py``). After an upgrade, old entries keep
+being served. A background job re-analyzes them, the most requested
+first, a few at a time and within a daily limit. It runs in the ``batch``
+scheduler lane, so token budgets and the spend cap also apply.
+
+To re-run an analysis the job needs what it was made from. The cache
+holds only the analysis text, so this store keeps, per cache key, the
+compressed article text, source, URL, metadata and backend, the entry's
+version and its hit count. Hits are counted in memory and written in
+batches (``background.BatchWriter``), so a cache hit never waits on disk.
+
+The store is one SQLite file shared by every worker. Entries are claimed
+with a lease under ``BEGIN IMMEDIATE``, so two workers never re-analyze
+the same entry. The least requested entries are evicted beyond
+``max_entries``.
+"""
+import json
+import os
+import time
+import zlib
+from collections import Counter
+
+from background import BatchWriter, SQLiteConnections
+
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_DAILY_LIMIT = 500
+DEFAULT_BATCH = 10
+DEFAULT_LEASE = 600
+# Surplus rows are pruned on every Nth recorded analysis per process
+PRUNE_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    lease REAL NOT NULL DEFAULT 0,
+    inputs BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_hits ON entries (hits);
+CREATE TABLE IF NOT EXISTS daily (
+    day INTEGER PRIMARY KEY,
+    reanalyzed INTEGER NOT NULL
+);
+"""
+
+
+class ReanalysisStore:
+    """SQLite-backed inputs, versions and hit counts of cached analyses"""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, daily_limit=DEFAULT_DAILY_LIMIT,
+                 lease=DEFAULT_LEASE):
+        self.path = path
+        self.max_entries = max_entries
+        self.daily_limit = daily_limit
+        self.lease = lease
+        self._connections = SQLiteConnections(path, SCHEMA, isolation_level=None)
+        self._recorded = 0
+        self.hits = BatchWriter('epap-reanalysis-hits', self._write_hits, flush_interval=5.0)
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv('REANALYSIS_DB_PATH')
+        if not path:
+            return None
+        return cls(
+            path,
+            max_entries=int(os.getenv('REANALYSIS_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+            daily_limit=int(os.getenv('REANALYSIS_DAILY_LIMIT', DEFAULT_DAILY_LIMIT))
+        )
+
+    def _write(self, func):
+        """Run ``func(conn)`` in one immediate transaction"""
+        conn = self._connections.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(conn)
+            conn.execute('COMMIT')
+            return result
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def record(self, key, version, backend, inputs):
+        """Remember how a fresh analysis was made; its hits are kept and any lease on it ends.
+
+        Ending a lease completes a re-analysis, so it is counted against today's limit.
+        """
+        blob = zlib.compress(json.dumps(inputs, ensure_ascii=False).encode('utf-8'))
+
+        def write(conn):
+            row = conn.execute('SELECT lease FROM entries WHERE key = ?', (key,)).fetchone()
+            if row and row[0] > 0:
+                conn.execute('INSERT INTO daily VALUES (?, 1) ON CONFLICT (day) DO UPDATE SET reanalyzed = reanalyzed + 1',
+                             (int(time.time() // 86400),))
+            conn.execute(
+                """INSERT INTO entries (key, version, backend, inputs) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (key) DO UPDATE SET
+                       version = excluded.version, backend = excluded.backend, inputs = excluded.inputs, lease = 0""",
+                (key, version, backend, blob))
+
+        self._write(write)
+        self._recorded += 1
+        if self._recorded % PRUNE_EVERY == 0:
+            self.prune()
+
+    def touch(self, key):
+        """Count a request served by the cached analysis; never blocks"""
+        self.hits.submit(key)
+
+    def _write_hits(self, keys):
+        counts = Counter(keys)
+        self._write(lambda conn: conn.executemany('UPDATE entries SET hits = hits + ? WHERE key = ?',
+                                                  [(n, key) for key, n in counts.items()]))
+
+    def flush(self):
+        """Write out queued hit counts (used at shutdown and in tests)"""
+        self.hits.drain()
+
+    def claim(self, current, limit=DEFAULT_BATCH):
+        """Lease up to ``limit`` outdated entries, the most requested first, within today's limit.
+
+        ``current`` maps each configured backend to its current version. Entries
+        of other backends are left alone. Leases still running count against the
+        limit until they are released or completed by ``record``. Returns
+        ``[(key, backend, inputs)]``.
+        """
+        if not current:
+            return []
+        now = time.time()
+        day = int(now // 86400)
+        outdated = ' OR '.join(['(backend = ? AND version != ?)'] * len(current))
+
+        def write(conn):
+            row = conn.execute('SELECT reanalyzed FROM daily WHERE day = ?', (day,)).fetchone()
+            leased = conn.execute('SELECT COUNT(*) FROM entries WHERE lease >= ?', (now,)).fetchone()[0]
+            allowed = min(limit, self.daily_limit - (row[0] if row else 0) - leased)
+            if allowed <= 0:
+                return []
+            rows = conn.execute(
+                f'SELECT key, backend, inputs FROM entries WHERE lease < ? AND ({outdated}) '
+                'ORDER BY hits DESC LIMIT ?',
+                [now, *[value for pair in current.items() for value in pair], allowed]).fetchall()
+            conn.executemany('UPDATE entries SET lease = ? WHERE key = ?', [(now + self.lease, key) for key, _, _ in rows])
+            return rows
+
+        return [(key, backend, json.loads(zlib.decompress(blob))) for key, backend, blob in self._write(write)]
+
+    def release(self, *keys):
+        """End the leases of entries that could not be re-analyzed, so a later run retries them"""
+        self._write(lambda conn: conn.executemany('UPDATE entries SET lease = 0 WHERE key = ?',
+                                                  [(key,) for key in keys]))
+
+    def prune(self):
+        """Drop the least requested entries beyond ``max_entries``"""
+        def write(conn):
+            surplus = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - self.max_entries
+            if surplus <= 0:
+                return 0
+            return conn.execute('DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY hits LIMIT ?)',
+                                (surplus,)).rowcount
+
+        return self._write(write)
+
+    def stats(self, current):
+        """Entries in total and still outdated, and re-analyses done today"""
+        conn = self._connections.get()
+        outdated = ' OR '.join(['(backend = ? AND version != ?)'] * len(current)) or '0'
+        total, stale = conn.execute(f'SELECT COUNT(*), COALESCE(SUM({outdated}), 0) FROM entries',
+                                    [value for pair in current.items() for value in pair]).fetchone()
+        row = conn.execute('SELECT reanalyzed FROM daily WHERE day = ?', (int(time.time() // 86400),)).fetchone()
+        return {'entries': total, 'outdated': stale, 'reanalyzed_today': row[0] if row else 0,
+                'daily_limit': self.daily_limit}
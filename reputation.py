@@ -0,0 +1,191 @@
+"""Per-outlet reputation index built incrementally from completed analyses.
+
+Every fresh analysis updates running aggregates (count, mean and variance via
+Welford's algorithm, overall and per section) for the article's domain. The
+index lives in memory as one small record per domain, so lookups are O(1),
+and nothing ever rescans past analyses. Workers persist only the delta they
+accumulated since their last save and merge it into the shared file with the
+parallel variance formula, so several gunicorn workers can share one index.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from background import file_lock
+
+logger = logging.getLogger(__name__)
+
+MIN_ANALYSES_FOR_CONTEXT = 3
+
+
+class RunningStats:
+    """Count, mean and sum of squared deviations of a stream of scores"""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Combine with another partial aggregate (Chan et al.)"""
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def to_list(self):
+        return [self.count, round(self.mean, 4), round(self.m2, 4)]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': round(self.mean, 2),
+            'stddev': round(math.sqrt(self.variance), 2),
+        }
+
+
+class DomainReputation:
+    """Aggregates for one domain"""
+
+    __slots__ = ('overall', 'sections', 'updated')
+
+    def __init__(self):
+        self.overall = RunningStats()
+        self.sections = {}
+        self.updated = 0
+
+    def add(self, overall, sections, timestamp):
+        if overall is not None:
+            self.overall.add(overall)
+        for title, score in sections.items():
+            self.sections.setdefault(title, RunningStats()).add(score)
+        self.updated = max(self.updated, timestamp)
+
+    def merge(self, other):
+        self.overall.merge(other.overall)
+        for title, stats in other.sections.items():
+            self.sections.setdefault(title, RunningStats()).merge(stats)
+        self.updated = max(self.updated, other.updated)
+
+    def to_dict(self):
+        return {
+            'o': self.overall.to_list(),
+            's': {title: stats.to_list() for title, stats in self.sections.items()},
+            'u': self.updated,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        reputation = cls()
+        reputation.overall = RunningStats.from_list(data['o'])
+        reputation.sections = {title: RunningStats.from_list(v) for title, v in data.get('s', {}).items()}
+        reputation.updated = data.get('u', 0)
+        return reputation
+
+
+class ReputationIndex:
+    """In-memory map of domain -> aggregates with optional JSON persistence"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.domains = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.domains = self._read(path)
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('REPUTATION_PATH') or None)
+
+    def record(self, domain, overall, sections=None, timestamp=None):
+        """Fold one completed analysis into the domain's aggregates"""
+        if not domain or (overall is None and not sections):
+            return
+        timestamp = timestamp or time.time()
+        sections = sections or {}
+        with self._lock:
+            self.domains.setdefault(domain, DomainReputation()).add(overall, sections, timestamp)
+            self._pending.setdefault(domain, DomainReputation()).add(overall, sections, timestamp)
+
+    def get(self, domain):
+        """Return a JSON-ready summary for a domain, or None if it is unknown"""
+        reputation = self.domains.get(domain)
+        if reputation is None:
+            return None
+        return {
+            'domain': domain,
+            'overall': reputation.overall.summary(),
+            'sections': {title: stats.summary() for title, stats in reputation.sections.items()},
+            'updated': reputation.updated,
+        }
+
+    def prompt_context(self, domain):
+        """Short precomputed line describing the outlet's track record for the prompt"""
+        reputation = self.domains.get(domain)
+        if reputation is None or reputation.overall.count < MIN_ANALYSES_FOR_CONTEXT:
+            return ""
+        stats = reputation.overall
+        return (
+            f"Ιστορικό πηγής ({domain}): μέση βαθμολογία {stats.mean:.0f}/100 "
+            f"(τυπική απόκλιση {math.sqrt(stats.variance):.0f}) σε {stats.count} προηγούμενες αναλύσεις."
+        )
+
+    def save(self):
+        """Merge this worker's new aggregates into the shared file"""
+        if not self.path:
+            return False
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return False
+        try:
+            with file_lock(self.path):
+                merged = self._read(self.path) if os.path.exists(self.path) else {}
+                for domain, delta in pending.items():
+                    merged.setdefault(domain, DomainReputation()).merge(delta)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({domain: rep.to_dict() for domain, rep in merged.items()},
+                              f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not save reputation index: {str(e)}")
+            with self._lock:
+                for domain, delta in pending.items():
+                    self._pending.setdefault(domain, DomainReputation()).merge(delta)
+            return False
+        with self._lock:
+            # Adopt the merged view (other workers' updates included), then
+            # re-apply anything recorded while the file was being written
+            for domain, delta in self._pending.items():
+                merged.setdefault(domain, DomainReputation()).merge(delta)
+            self.domains = merged
+        return True
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return {domain: DomainReputation.from_dict(data) for domain, data in json.load(f).items()}
@@ -0,0 +1,160 @@
+"""Response encoding: UTF-8 JSON, optional MessagePack and compression.
+
+Flask's default ``jsonify`` escapes every Greek character to ``\\uXXXX``.
+In UTF-8, a Greek letter is two bytes, but the escape is six ASCII bytes, so
+an analysis payload grows to roughly three times its size. ``JSONProvider``
+emits plain UTF-8 instead. It uses orjson when that is installed and the
+stdlib encoder otherwise. Clients that list ``application/msgpack`` in
+``Accept`` get MessagePack instead (used by the mobile app).
+``install_compression`` then gzip- or brotli-encodes responses above
+``MIN_COMPRESS_SIZE`` bytes according to ``Accept-Encoding``.
+
+``cacheable_response`` gives a response a strong ETag over its encoded body
+plus shared-cache ``Cache-Control``, and answers ``If-None-Match`` with 304.
+A compressed representation gets its own tag (``"<etag>-gzip"``) as strong
+ETags require, and revalidating with that tag also gets a 304.
+"""
+import gzip
+import hashlib
+import json
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+MSGPACK_MIMETYPE = 'application/msgpack'
+# Below this size the saving does not pay for the CPU time and extra header
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', MSGPACK_MIMETYPE, 'text/html', 'text/plain', 'text/css',
+    'application/javascript', 'text/javascript', 'application/xml', 'text/xml',
+    'application/manifest+json',
+}
+
+
+def dumps_bytes(obj):
+    """Compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib encoder handles them
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def packb(obj):
+    return msgpack.packb(obj, use_bin_type=True, default=str)
+
+
+def wants_msgpack():
+    """Whether the client explicitly prefers MessagePack over JSON"""
+    if msgpack is None:
+        return False
+    accept = request.accept_mimetypes
+    return accept[MSGPACK_MIMETYPE] > accept['application/json']
+
+
+def choose_encoding(accept_encoding):
+    """Best supported content coding from an ``Accept-Encoding`` header, or None"""
+    offered = {}
+    for part in (accept_encoding or '').lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            offered[coding] = quality
+    for coding in (('br', 'gzip') if brotli is not None else ('gzip',)):
+        if offered.get(coding, offered.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress(data, coding):
+    if coding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """``jsonify`` provider writing UTF-8 JSON (orjson when available) or MessagePack on request"""
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return dumps_bytes(obj).decode('utf-8')
+        kwargs.setdefault('ensure_ascii', False)
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if wants_msgpack():
+            response = self._app.response_class(packb(obj), mimetype=MSGPACK_MIMETYPE)
+        else:
+            response = self._app.response_class(dumps_bytes(obj), content_type=JSON_CONTENT_TYPE)
+        if msgpack is not None:
+            # Both encodings depend on Accept, so shared caches must key on it
+            response.vary.add('Accept')
+        return response
+
+
+def cacheable_response(obj, max_age, shared_max_age=None):
+    """``jsonify(obj)`` with a strong ETag and public Cache-Control, or 304 if the client's copy is current"""
+    response = current_app.json.response(obj)
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest()[:32])
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if shared_max_age is not None:
+        response.cache_control.s_maxage = shared_max_age
+    return response.make_conditional(request)
+
+
+def install_compression(flask_app, min_size=MIN_COMPRESS_SIZE):
+    """Compress eligible responses according to the request's Accept-Encoding"""
+
+    @flask_app.after_request
+    def compress_response(response):
+        if response.mimetype in COMPRESSIBLE_MIMETYPES:
+            response.vary.add('Accept-Encoding')
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        coding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if coding is None:
+            return response
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # Each content coding is a distinct representation with its own strong tag
+            response.set_etag(f"{etag}-{coding}")
+            if request.if_none_match.contains(f"{etag}-{coding}"):
+                response.status_code = 304
+                response.set_data(b'')
+                return response
+        response.set_data(compress(data, coding))
+        response.headers['Content-Encoding'] = coding
+        return response
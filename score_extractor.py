@@ -0,0 +1,38 @@
+"""Parse scores out of the markdown analysis (mirrors epap_mobile's score_extractor.dart)
+
+Labels are matched on folded text so the model's occasional "Συνολική
+Αξιολόγηση" or unaccented variants still parse; folding keeps offsets, so
+section titles are sliced from the original markdown.
+"""
+import re
+
+from greek_text import fold
+
+SCORE_REGEX = re.compile(fold(r'ΣΥΝΟΛΙΚΗ ΑΞΙΟΛΟΓΗΣΗ[:\s*]*(\d{1,3})'))
+SECTION_REGEX = re.compile(r'\*\*(\d+)\.\s*([^:*]+):\*\*')
+SECTION_SCORE_REGEX = re.compile(fold(r'Βαθμολογία ενότητας[:\s*]*(\d{1,3})'))
+
+
+def extract_score(markdown):
+    """Return the overall 1-100 score, or None if the analysis has none"""
+    match = SCORE_REGEX.search(fold(markdown or ''))
+    if not match:
+        return None
+    score = int(match.group(1))
+    return score if 1 <= score <= 100 else None
+
+
+def extract_section_scores(markdown):
+    """Return ``{section title: score}`` for sections that carry their own score"""
+    markdown = markdown or ''
+    folded = fold(markdown)
+    matches = list(SECTION_REGEX.finditer(markdown))
+    scores = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(markdown)
+        score_match = SECTION_SCORE_REGEX.search(folded, match.end(), end)
+        if score_match:
+            score = int(score_match.group(1))
+            if 1 <= score <= 100:
+                scores[match.group(2).strip()] = score
+    return scores
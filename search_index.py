@@ -0,0 +1,136 @@
+"""Full-text search over analyzed articles.
+
+Documents are stored in SQLite with an FTS5 index. SQLite's own tokenizers
+know nothing about Greek inflection, so text is run through
+``greek_text.index_terms`` (accent/case/final-sigma folding plus light
+stemming) before it is indexed, and queries go through the same function.
+The FTS table is contentless; display fields live in a regular table joined
+by rowid. New analyses are fed in batches from a background writer.
+
+A document replaces the earlier one with the same cache key (a
+re-analysis) or URL (an updated article). Rows of a contentless table
+cannot be deleted without their original text, so the replacement gets a
+new rowid and the stale FTS row, no longer joined to a document, simply
+stops matching.
+
+BM25 is computed only for the newest ``SEARCH_CANDIDATES`` matches of a
+query: FTS5 walks a doclist in rowid order and stops there, so a term that
+appears in most documents costs the same as a rare one. For news, the most
+relevant hit for a very common term is almost always a recent one anyway.
+Prefix indexes for 3 and 4 character prefixes keep short ``word*`` queries
+from merging the doclists of every matching term.
+"""
+import logging
+import os
+import time
+
+from background import BatchWriter, SQLiteConnections
+from greek_text import index_terms_many, stem, tokenize
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_LENGTH = 240
+
+# Ranking is computed over at most this many of the newest matching documents,
+# which keeps queries for very common terms bounded as the index grows
+SEARCH_CANDIDATES = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    cache_key TEXT NOT NULL UNIQUE,
+    url TEXT,
+    domain TEXT,
+    ts REAL NOT NULL,
+    score INTEGER,
+    snippet TEXT
+);
+CREATE INDEX IF NOT EXISTS documents_url ON documents (url);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    body, analysis, content='', prefix='3 4', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def build_match_query(query):
+    """Turn user input into a safe FTS5 expression requiring all terms.
+
+    A trailing ``*`` makes the (unstemmed) last word a prefix search. Prefix
+    queries merge the doclists of every matching term, so they are opt-in.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    prefix = query.rstrip().endswith('*')
+    last = tokens[-1] if prefix else stem(tokens[-1])
+    terms = [term for term in dict.fromkeys(stem(token) for token in tokens[:-1]) if term != last]
+    quoted = [f'"{term}"' for term in terms] + [f'"{last}"*' if prefix else f'"{last}"']
+    return ' AND '.join(quoted)
+
+
+class SearchIndex:
+    """Incrementally fed FTS5 index of article text and analysis output"""
+
+    def __init__(self, path, batch_size=200, flush_interval=1.0):
+        self.path = path
+        self._connections = SQLiteConnections(path, SCHEMA)
+        self.writer = BatchWriter('epap-search-indexer', self.add_batch,
+                                  batch_size=batch_size, flush_interval=flush_interval)
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv('SEARCH_DB_PATH')
+        return cls(path) if path else None
+
+    def add(self, document):
+        """Queue a document dict (cache_key, url, domain, ts, score, text, analysis)"""
+        self.writer.submit(document)
+
+    def add_batch(self, documents):
+        documents = list(documents)
+        # Fold and tokenize the whole batch in one pass
+        bodies = index_terms_many([doc.get('text') or '' for doc in documents])
+        analyses = index_terms_many([doc.get('analysis') or '' for doc in documents])
+        conn = self._connections.get()
+        with conn:
+            # Past every FTS row, so a replaced document's stale row never matches the new one
+            rowid = max(conn.execute('SELECT MAX(id) FROM documents').fetchone()[0] or 0,
+                        (conn.execute('SELECT rowid FROM documents_fts ORDER BY rowid DESC LIMIT 1').fetchone()
+                         or (0,))[0])
+            for doc, body, analysis in zip(documents, bodies, analyses):
+                rowid += 1
+                # Pasted text has no URL and replaces only its own key
+                conn.execute('DELETE FROM documents WHERE cache_key = ? OR url = ?',
+                             (doc['cache_key'], doc.get('url') or None))
+                conn.execute(
+                    'INSERT INTO documents (id, cache_key, url, domain, ts, score, snippet) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (rowid, doc['cache_key'], doc.get('url'), doc.get('domain'), doc.get('ts') or time.time(),
+                     doc.get('score'), (doc.get('text') or '')[:SNIPPET_LENGTH]))
+                conn.execute(
+                    'INSERT INTO documents_fts (rowid, body, analysis) VALUES (?, ?, ?)',
+                    (rowid, ' '.join(body), ' '.join(analysis)))
+
+    def flush(self):
+        self.writer.drain()
+
+    def search(self, query, limit=10, candidates=SEARCH_CANDIDATES):
+        """Return the best matching documents, ranked by BM25 (article text weighted higher)"""
+        match = build_match_query(query)
+        if match is None:
+            return []
+        rows = self._connections.get().execute(
+            """SELECT d.cache_key, d.url, d.domain, d.ts, d.score, d.snippet
+               FROM (SELECT rowid, bm25(documents_fts, 1.0, 0.4) AS rank
+                     FROM documents_fts WHERE documents_fts MATCH ?
+                     ORDER BY rowid DESC LIMIT ?) AS hits
+               JOIN documents AS d ON d.id = hits.rowid
+               ORDER BY hits.rank LIMIT ?""",
+            (match, candidates, limit))
+        return [
+            {'key': key, 'url': url, 'domain': domain, 'timestamp': ts, 'score': score, 'snippet': snippet}
+            for key, url, domain, ts, score, snippet in rows
+        ]
+
+    def count(self):
+        return self._connections.get().execute('SELECT COUNT(*) FROM documents').fetchone()[0]
@@ -0,0 +1,361 @@
+"""Incremental story clustering of analyzed articles.
+
+Every analyzed article becomes a sparse TF-IDF vector: its stemmed terms
+(``greek_text.index_terms``) are hashed into ``DIMENSIONS`` buckets, weighted
+by document frequencies maintained incrementally, and only the top
+``terms_per_article`` weights are kept. The article joins the most similar
+live story if the cosine similarity reaches ``threshold``; otherwise it
+starts a new story. Nothing is ever re-clustered. Assignment is a single
+NumPy gather over the padded matrix of story centroids, a few milliseconds
+even with thousands of live stories.
+
+Memory is bounded. An article's vector is folded into its story's centroid
+and discarded, and a story keeps at most ``terms_per_story`` centroid terms
+and ``members_per_story`` article records. Stories expire ``ttl_hours``
+after their last article, and at most ``max_stories`` are kept. Document
+frequencies decay by half every ``DF_HALF_LIFE`` documents, so the
+vocabulary tracks the current news cycle.
+
+Workers share one state file like the reputation index does. Each worker
+replays the articles it clustered since its last save onto the file's state
+under a lock, then adopts the merged result.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import deque
+
+from background import file_lock
+from greek_text import index_terms
+from lazy_imports import lazy_import
+from reputation import RunningStats
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = 1 << 18
+DF_HALF_LIFE = 50000
+MIN_TERM_LENGTH = 3
+HEADLINE_LENGTH = 160
+EXPIRE_INTERVAL = 60
+
+
+def hash_terms(terms):
+    """Stable bucket for each term (crc32, so all workers agree)"""
+    return np.fromiter((zlib.crc32(term.encode('utf-8')) for term in terms if len(term) >= MIN_TERM_LENGTH),
+                       dtype=np.uint32).astype(np.int32) & (DIMENSIONS - 1)
+
+
+def top_terms(indices, weights, k):
+    """Keep the ``k`` largest weights of a sparse vector"""
+    if len(indices) > k:
+        keep = np.argpartition(weights, -k)[-k:]
+        indices, weights = indices[keep], weights[keep]
+    return indices, weights
+
+
+class Story:
+    """One cluster: its centroid (unnormalised sum of member vectors) and members"""
+
+    __slots__ = ('id', 'headline', 'created', 'updated', 'size', 'terms', 'sums', 'members',
+                 'outlets', 'scores')
+
+    def __init__(self, story_id, headline, created, members_per_story):
+        self.id = story_id
+        self.headline = headline
+        self.created = created
+        self.updated = created
+        self.size = 0
+        self.terms = np.zeros(0, dtype=np.int32)
+        self.sums = np.zeros(0, dtype=np.float32)
+        self.members = deque(maxlen=members_per_story)
+        self.outlets = {}
+        self.scores = {}
+
+    def add(self, indices, weights, member, terms_per_story):
+        merged, inverse = np.unique(np.concatenate([self.terms, indices]), return_inverse=True)
+        sums = np.bincount(inverse, weights=np.concatenate([self.sums, weights])).astype(np.float32)
+        self.terms, self.sums = top_terms(merged.astype(np.int32), sums, terms_per_story)
+        self.size += 1
+        self.updated = max(self.updated, member['ts'])
+        self.members.append(member)
+        domain = member['domain'] or ''
+        self.outlets[domain] = self.outlets.get(domain, 0) + 1
+        if member.get('score') is not None:
+            self.scores.setdefault(domain, RunningStats()).add(member['score'])
+
+    def centroid(self):
+        norm = float(np.linalg.norm(self.sums))
+        return self.terms, (self.sums / norm if norm else self.sums)
+
+    def summary(self):
+        outlets = []
+        for domain, articles in self.outlets.items():
+            stats = self.scores.get(domain)
+            entry = {'domain': domain, 'articles': articles}
+            entry.update(stats.summary() if stats else {'count': 0, 'mean': None, 'stddev': None})
+            outlets.append(entry)
+        outlets.sort(key=lambda o: (-o['articles'], o['domain']))
+        means = [o['mean'] for o in outlets if o['mean'] is not None]
+        return {
+            'id': self.id,
+            'headline': self.headline,
+            'created': self.created,
+            'updated': self.updated,
+            'articles': self.size,
+            'outlets': outlets,
+            'score_spread': round(max(means) - min(means), 2) if len(means) > 1 else None,
+            'latest': list(self.members)[-5:][::-1],
+        }
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'h': self.headline, 'c': self.created, 'u': self.updated, 'n': self.size,
+            'm': list(self.members), 'o': self.outlets,
+            's': {domain: stats.to_list() for domain, stats in self.scores.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data, terms, sums, members_per_story):
+        story = cls(data['id'], data['h'], data['c'], members_per_story)
+        story.updated = data['u']
+        story.size = data['n']
+        story.terms, story.sums = terms, sums
+        story.members.extend(data['m'])
+        story.outlets = data['o']
+        story.scores = {domain: RunningStats.from_list(v) for domain, v in data['s'].items()}
+        return story
+
+
+class ClusterState:
+    """Document frequencies, live stories and the padded centroid matrix used for assignment"""
+
+    def __init__(self, config):
+        self.config = config
+        self.df = np.zeros(DIMENSIONS, dtype=np.float32)
+        self.docs = 0.0
+        self.stories = []
+        self._indices = np.zeros((0, config['terms_per_story']), dtype=np.int32)
+        self._weights = np.zeros((0, config['terms_per_story']), dtype=np.float32)
+        self._scratch = np.zeros(DIMENSIONS, dtype=np.float32)
+
+    def observe(self, buckets):
+        """Count one document's distinct buckets towards document frequency"""
+        self.df[buckets] += 1
+        self.docs += 1
+        if self.docs >= 2 * DF_HALF_LIFE:
+            self.df *= 0.5
+            self.docs *= 0.5
+
+    def vectorize(self, buckets):
+        """L2-normalised TF-IDF vector of a document's hashed terms, truncated to the top terms"""
+        indices, counts = np.unique(buckets, return_counts=True)
+        idf = np.log((1.0 + self.docs) / (1.0 + self.df[indices])) + 1.0
+        weights = ((1.0 + np.log(counts)) * idf).astype(np.float32)
+        indices, weights = top_terms(indices.astype(np.int32), weights, self.config['terms_per_article'])
+        norm = float(np.linalg.norm(weights))
+        return indices, (weights / norm if norm else weights)
+
+    def similarities(self, indices, weights):
+        if not self.stories:
+            return np.zeros(0, dtype=np.float32)
+        rows = len(self.stories)
+        self._scratch[indices] = weights
+        sims = (self._scratch[self._indices[:rows]] * self._weights[:rows]).sum(axis=1)
+        self._scratch[indices] = 0
+        return sims
+
+    def assign(self, indices, weights, member, headline):
+        """Add an article to its most similar story, or start a new one; returns the story"""
+        sims = self.similarities(indices, weights)
+        best = int(np.argmax(sims)) if len(sims) else -1
+        if best >= 0 and sims[best] >= self.config['threshold']:
+            story = self.stories[best]
+        else:
+            story = Story(member['key'], headline, member['ts'], self.config['members_per_story'])
+            if len(self.stories) >= self.config['max_stories']:
+                self._remove([min(range(len(self.stories)), key=lambda i: self.stories[i].updated)])
+            self.stories.append(story)
+            best = len(self.stories) - 1
+            self._grow()
+        story.add(indices, weights, member, self.config['terms_per_story'])
+        self._set_row(best, story)
+        return story
+
+    def expire(self, now):
+        cutoff = now - self.config['ttl_hours'] * 3600
+        stale = [i for i, story in enumerate(self.stories) if story.updated < cutoff]
+        if stale:
+            self._remove(stale)
+        return len(stale)
+
+    def _grow(self):
+        rows = len(self.stories)
+        if rows > len(self._indices):
+            capacity = max(64, 2 * len(self._indices))
+            width = self.config['terms_per_story']
+            self._indices = np.concatenate([self._indices, np.zeros((capacity - len(self._indices), width), np.int32)])
+            self._weights = np.concatenate([self._weights, np.zeros((capacity - len(self._weights), width), np.float32)])
+
+    def _set_row(self, row, story):
+        terms, weights = story.centroid()
+        self._indices[row] = 0
+        self._weights[row] = 0
+        self._indices[row, :len(terms)] = terms
+        self._weights[row, :len(weights)] = weights
+
+    def _remove(self, rows):
+        keep = np.ones(len(self.stories), dtype=bool)
+        keep[rows] = False
+        self.stories = [story for story, kept in zip(self.stories, keep) if kept]
+        self._indices = self._indices[:len(keep)][keep]
+        self._weights = self._weights[:len(keep)][keep]
+
+    def save(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        width = self.config['terms_per_story']
+        terms = np.zeros((len(self.stories), width), dtype=np.int32)
+        sums = np.zeros((len(self.stories), width), dtype=np.float32)
+        lengths = np.zeros(len(self.stories), dtype=np.int32)
+        for row, story in enumerate(self.stories):
+            lengths[row] = len(story.terms)
+            terms[row, :len(story.terms)] = story.terms
+            sums[row, :len(story.sums)] = story.sums
+        meta = json.dumps([story.to_dict() for story in self.stories], ensure_ascii=False)
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, df=self.df, docs=np.float64(self.docs), terms=terms, sums=sums,
+                     lengths=lengths, meta=np.array(meta))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, config):
+        state = cls(config)
+        with np.load(path) as data:
+            state.df = data['df'].astype(np.float32)
+            state.docs = float(data['docs'])
+            meta = json.loads(str(data['meta']))
+            for row, story in enumerate(meta):
+                length = int(data['lengths'][row])
+                state.stories.append(Story.from_dict(
+                    story, data['terms'][row, :length].copy(), data['sums'][row, :length].copy(),
+                    config['members_per_story']))
+        state._grow()
+        for row, story in enumerate(state.stories):
+            state._set_row(row, story)
+        return state
+
+
+class StoryClusterer:
+    """Thread-safe story clustering with optional state shared through a file"""
+
+    def __init__(self, path=None, threshold=0.2, ttl_hours=48, max_stories=5000,
+                 terms_per_article=64, terms_per_story=128, members_per_story=50):
+        self.path = path
+        self.config = {
+            'threshold': threshold, 'ttl_hours': ttl_hours, 'max_stories': max_stories,
+            'terms_per_article': terms_per_article, 'terms_per_story': terms_per_story,
+            'members_per_story': members_per_story,
+        }
+        self._state = None
+        self._pending = []
+        self._expired_at = 0
+        # Reentrant: the state is loaded on first access, often with the lock already held
+        self._lock = threading.RLock()
+
+    @property
+    def state(self):
+        """Cluster state, loaded (or allocated) on first use to keep imports cheap"""
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    state = None
+                    if self.path and os.path.exists(self.path):
+                        try:
+                            state = ClusterState.load(self.path, self.config)
+                        except (OSError, ValueError, KeyError) as e:
+                            logger.error(f"Could not load story clusters from {self.path}: {str(e)}")
+                    self._state = state or ClusterState(self.config)
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        self._state = state
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.getenv('STORIES_PATH') or None,
+            threshold=float(os.getenv('STORIES_THRESHOLD', '0.2')),
+            ttl_hours=float(os.getenv('STORIES_TTL_HOURS', '48'))
+        )
+
+    def add(self, key, text, url='', domain='', score=None, timestamp=None):
+        """Cluster one analyzed article; returns the id of the story it joined"""
+        buckets = hash_terms(index_terms(text))
+        if not len(buckets):
+            return None
+        member = {'key': key, 'url': url, 'domain': domain, 'score': score, 'ts': timestamp or time.time()}
+        headline = text[:HEADLINE_LENGTH]
+        with self._lock:
+            if member['ts'] - self._expired_at >= EXPIRE_INTERVAL:
+                self.state.expire(member['ts'])
+                self._expired_at = member['ts']
+            self.state.observe(np.unique(buckets))
+            indices, weights = self.state.vectorize(buckets)
+            story = self.state.assign(indices, weights, member, headline)
+            if self.path:
+                self._pending.append((buckets, indices, weights, member, headline))
+            return story.id
+
+    def stories(self, limit=20, min_outlets=1, since=None):
+        """Live stories, widest outlet coverage first"""
+        with self._lock:
+            self.state.expire(time.time())
+            stories = [s for s in self.state.stories
+                       if len(s.outlets) >= min_outlets and (since is None or s.updated >= since)]
+            stories.sort(key=lambda s: (len(s.outlets), s.updated), reverse=True)
+            return [story.summary() for story in stories[:limit]]
+
+    def get(self, story_id):
+        with self._lock:
+            for story in self.state.stories:
+                if story.id == story_id:
+                    return story.summary()
+        return None
+
+    def save(self):
+        """Replay this worker's new articles onto the shared file and adopt the result"""
+        if not self.path:
+            return False
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return False
+        try:
+            with file_lock(self.path):
+                merged = (ClusterState.load(self.path, self.config) if os.path.exists(self.path)
+                          else ClusterState(self.config))
+                self._replay(merged, pending)
+                merged.expire(time.time())
+                merged.save(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not save story clusters: {str(e)}")
+            with self._lock:
+                self._pending[:0] = pending
+            return False
+        with self._lock:
+            # Articles clustered while the file was being written stay pending
+            # for the next save but must also show up in the adopted state
+            self._replay(merged, self._pending)
+            self.state = merged
+        return True
+
+    @staticmethod
+    def _replay(state, pending):
+        for buckets, indices, weights, member, headline in pending:
+            state.observe(np.unique(buckets))
+            state.assign(indices, weights, member, headline)
@@ -0,0 +1,151 @@
+"""Per-device analysis history for the mobile app's delta sync.
+
+A client identifies its history with an opaque sync token, which it sends
+as ``X-Sync-Token``. A second device or a reinstall restores the history by
+reusing the token. Only a SHA-256 of the token is stored. Analyses are kept
+once per cache key in ``analyses``, and ``history`` links accounts to keys.
+
+Every insert, and every re-analysis of a key some history holds, gives the
+affected ``history`` rows a new ``seq`` from a counter that is incremented
+inside the write transaction. ``BEGIN IMMEDIATE`` serialises writers across
+workers, so ``seq`` grows in commit order. A client that pages with
+``seq > cursor`` therefore never misses a row committed after its last page.
+Pages are keyset reads on ``(account, seq)`` and cost the same at any depth.
+"""
+import hashlib
+import os
+import time
+
+from background import SQLiteConnections
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+MIN_TOKEN_LENGTH = 16
+MAX_TOKEN_LENGTH = 128
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    key TEXT PRIMARY KEY,
+    analysis TEXT NOT NULL,
+    text_length INTEGER,
+    source TEXT,
+    url TEXT,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS history (
+    account BLOB NOT NULL,
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (account, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS history_account_seq ON history (account, seq);
+CREATE INDEX IF NOT EXISTS history_key ON history (key);
+CREATE TABLE IF NOT EXISTS counter (id INTEGER PRIMARY KEY CHECK (id = 0), seq INTEGER NOT NULL);
+INSERT OR IGNORE INTO counter (id, seq) VALUES (0, 0);
+"""
+
+
+def valid_token(token):
+    return bool(token) and MIN_TOKEN_LENGTH <= len(token) <= MAX_TOKEN_LENGTH and token.isprintable()
+
+
+def account_id(token):
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+class SyncStore:
+    """SQLite-backed, keyset-paginated analysis history per sync token"""
+
+    def __init__(self, path):
+        self.path = path
+        self._connections = SQLiteConnections(path, SCHEMA, isolation_level=None)
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv('SYNC_DB_PATH')
+        return cls(path) if path else None
+
+    def _write(self, func):
+        """Run ``func(conn, next_seq)`` in one immediate transaction"""
+        conn = self._connections.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            seq = conn.execute('SELECT seq FROM counter WHERE id = 0').fetchone()[0]
+
+            def next_seq():
+                nonlocal seq
+                seq += 1
+                return seq
+
+            result = func(conn, next_seq)
+            conn.execute('UPDATE counter SET seq = ? WHERE id = 0', (seq,))
+            conn.execute('COMMIT')
+            return result
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def record(self, token, entries):
+        """Add analyses to a token's history.
+
+        ``entries`` are dicts with key, analysis, text_length, source and url.
+        A key already in the history is left in place and not resent to the client.
+        """
+        account = account_id(token)
+        now = time.time()
+
+        def write(conn, next_seq):
+            added = 0
+            for entry in entries:
+                conn.execute(
+                    'INSERT OR IGNORE INTO analyses (key, analysis, text_length, source, url, updated) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (entry['key'], entry['analysis'], entry.get('text_length'), entry.get('source'),
+                     entry.get('url'), now))
+                exists = conn.execute('SELECT 1 FROM history WHERE account = ? AND key = ?',
+                                      (account, entry['key'])).fetchone()
+                if not exists:
+                    conn.execute('INSERT INTO history (account, key, seq, created) VALUES (?, ?, ?, ?)',
+                                 (account, entry['key'], next_seq(), now))
+                    added += 1
+            return added
+
+        return self._write(write)
+
+    def update_analysis(self, key, analysis):
+        """Replace a re-analyzed key's text and resend it to every history holding it"""
+        now = time.time()
+
+        def write(conn, next_seq):
+            cursor = conn.execute('UPDATE analyses SET analysis = ?, updated = ? WHERE key = ?',
+                                  (analysis, now, key))
+            if not cursor.rowcount:
+                return 0
+            accounts = [row[0] for row in conn.execute('SELECT account FROM history WHERE key = ?', (key,))]
+            conn.executemany('UPDATE history SET seq = ? WHERE account = ? AND key = ?',
+                             [(next_seq(), account, key) for account in accounts])
+            return len(accounts)
+
+        return self._write(write)
+
+    def changes(self, token, cursor=0, limit=DEFAULT_LIMIT):
+        """One page of history entries created or updated after ``cursor``.
+
+        Returns ``(items, next cursor, more)``. The next cursor is the seq of
+        the last item, or ``cursor`` itself if nothing changed.
+        """
+        rows = self._connections.get().execute(
+            """SELECT h.seq, h.key, h.created, a.updated, a.analysis, a.text_length, a.source, a.url
+               FROM history AS h JOIN analyses AS a ON a.key = h.key
+               WHERE h.account = ? AND h.seq > ?
+               ORDER BY h.seq LIMIT ?""",
+            (account_id(token), cursor, limit + 1)).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        items = [
+            {'key': key, 'analysis': analysis, 'text_length': text_length, 'source': source, 'url': url,
+             'created': created, 'updated': updated}
+            for _, key, created, updated, analysis, text_length, source, url in rows
+        ]
+        return items, rows[-1][0] if rows else cursor, more
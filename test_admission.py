@@ -0,0 +1,128 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from admission import AdaptiveLimiter, AdmissionControl, Overloaded, Scheduler, parse_mapping
+
+def waiter(scheduler, order, lane, tenant='', cost=1):
+    """Start a thread that queues for a slot and records when it gets one"""
+    def run():
+        ticket = scheduler.acquire(lane, tenant, cost)
+        order.append((lane, tenant))
+        scheduler.release(ticket, 0.01)
+    thread = threading.Thread(target=run)
+    thread.start()
+    # Let it reach the queue before the next one arrives
+    time.sleep(0.02)
+    return thread
+
+def test_aimd_limit():
+    """Slow calls cut the limit once per latency; fast calls at the limit raise it again."""
+    limiter = AdaptiveLimiter(max_limit=8, latency_target=1.0)
+    first, second = limiter.acquire(), limiter.acquire()
+    limiter.release(first, 5.0)
+    limiter.release(second, 5.0)
+    assert limiter.limit == 6.0
+    limiter.limit = 2.0
+    tickets = [limiter.acquire(), limiter.acquire()]
+    limiter.release(tickets[0], 0.1)
+    assert limiter.limit == 2.5
+    limiter.release(tickets[1], 0.1, ok=False)
+    assert limiter.stats()['inflight'] == 0 and limiter.limit >= 1
+
+def test_full_queue_is_rejected_fast():
+    limiter = AdaptiveLimiter(max_limit=1, max_queue=0, latency_target=10)
+    limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(Overloaded) as error:
+        limiter.acquire()
+    assert time.monotonic() - started < 0.1 and 1 <= error.value.retry_after <= 120
+    assert limiter.stats()['rejected'] == 1
+
+def test_waiter_is_admitted_when_a_slot_frees():
+    limiter = AdaptiveLimiter(max_limit=1, max_queue=1, max_wait=5)
+    ticket = limiter.acquire()
+    threading.Timer(0.1, limiter.release, (ticket, 0.1)).start()
+    limiter.acquire()
+    assert limiter.stats()['admitted'] == 2
+    limiter.max_wait = 0.05
+    with pytest.raises(Overloaded):
+        limiter.acquire()
+
+def test_interactive_work_jumps_the_background_queue():
+    """Freed slots go to higher lanes first, whatever the arrival order."""
+    scheduler = Scheduler(max_limit=1, lane_caps={})
+    held = scheduler.acquire('batch')
+    order = []
+    threads = [waiter(scheduler, order, lane) for lane in ('prefetch', 'batch', 'api', 'interactive')]
+    scheduler.release(held, 0.01)
+    for thread in threads:
+        thread.join()
+    assert [lane for lane, _ in order] == ['interactive', 'api', 'batch', 'prefetch']
+    assert scheduler.stats()['lanes']['prefetch']['queue_p50'] > scheduler.stats()['lanes']['interactive']['queue_p50']
+
+def test_tenants_share_a_lane_fairly():
+    """A tenant's backlog takes turns with another tenant's requests instead of going first."""
+    scheduler = Scheduler(max_limit=1, max_queue=20, lane_caps={})
+    held = scheduler.acquire('batch', 'big')
+    order = []
+    threads = [waiter(scheduler, order, 'batch', 'big') for _ in range(4)]
+    threads += [waiter(scheduler, order, 'batch', 'small') for _ in range(2)]
+    scheduler.release(held, 0.01)
+    for thread in threads:
+        thread.join()
+    # 'big' already has a request in service, so 'small' goes first
+    assert [tenant for _, tenant in order] == ['small', 'big', 'small', 'big', 'big', 'big']
+
+def test_timed_out_requests_do_not_cost_their_tenant_its_turn():
+    """A tenant's requests that gave up waiting are not charged against its fair share."""
+    scheduler = Scheduler(max_limit=1, max_queue=20, max_wait=0.02, lane_caps={})
+    held = scheduler.acquire('batch', 'big')
+    finish = dict(scheduler.lanes['batch'].finish)
+    for _ in range(3):
+        with pytest.raises(Overloaded):
+            scheduler.acquire('batch', 'big')
+    assert scheduler.lanes['batch'].finish == finish
+    scheduler.max_wait = 5
+    order = []
+    threads = [waiter(scheduler, order, 'batch', tenant) for tenant in ('small', 'big', 'small')]
+    scheduler.release(held, 0.01)
+    for thread in threads:
+        thread.join()
+    assert [tenant for _, tenant in order] == ['small', 'big', 'small']
+
+def test_lane_caps_and_token_budgets():
+    scheduler = Scheduler(max_limit=4, max_wait=0.05, lane_caps={'prefetch': 1}, lane_tokens={'batch': 1000})
+    scheduler.acquire('prefetch')
+    with pytest.raises(Overloaded):
+        scheduler.acquire('prefetch')
+    ticket = scheduler.acquire('batch', cost=600)
+    ticket.tokens = 1500
+    scheduler.release(ticket, 0.01)
+    # The batch lane overspent its budget and waits for it to refill
+    with pytest.raises(Overloaded):
+        scheduler.acquire('batch', cost=600)
+    assert scheduler.acquire('interactive')
+    assert scheduler.stats()['lanes']['batch']['tokens'] == 1500
+    assert parse_mapping('batch=2, prefetch=1') == {'batch': 2, 'prefetch': 1}
+
+def test_analyze_sheds_load_or_degrades(app_with_backend, scripted_backend):
+    """Without capacity /analyze answers 503 with Retry-After, or uses the overflow backend."""
+    import app as app_module
+    client = app_module.app.test_client()
+    admission = AdmissionControl(max_limit=1, max_queue=0)
+    admission.limiter('mistral').acquire()
+    backends = [scripted_backend('Ανάλυση'), scripted_backend('Σύντομη ανάλυση', name='local', model='local-model')]
+    text = 'Κείμενο για τον έλεγχο της απόρριψης αιτήσεων σε υπερφόρτωση. ' * 2
+    with patch.object(app_module, 'admission', admission):
+        app_with_backend(backends=backends)
+        response = client.post('/analyze', json={'text': text})
+        assert response.status_code == 503 and int(response.headers['Retry-After']) >= 1
+        assert client.get('/health').status_code == 200
+        assert client.post('/analyze', headers={'X-Priority': 'urgent'}, json={'text': text}).status_code == 400
+        app_with_backend(backends=backends, lanes={'overflow': 'local'})
+        data = client.post('/analyze', json={'text': text}).get_json()
+        assert data['analysis'] == 'Σύντομη ανάλυση' and data['degraded']
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+import time
+import pytest
+from unittest.mock import patch
+from analytics import AnalyticsStore
+from url_utils import topic_of
+
+DAY = 86400
+
+def row(ts, domain='example.gr', topic='politiki', score=50, latency=4.0):
+    return {
+        'ts': ts, 'url': f'https://{domain}/{topic}/1', 'domain': domain, 'topic': topic,
+        'score': score, 'model': 'mistral-large-latest', 'prompt_tokens': 1000,
+        'completion_tokens': 500, 'latency': latency, 'cache_key': 'k'
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    return AnalyticsStore(str(tmp_path / 'analytics.db'))
+
+def test_rows_are_written_in_batches(store):
+    """Recorded rows are queued and only hit disk when the writer flushes."""
+    now = time.time()
+    with patch.object(store.writer, '_ensure_started'):
+        store.record(row(now))
+        store.record(row(now, score=70))
+        assert store.aggregate('example.gr', since=now - DAY) == []
+        store.flush()
+    (bucket,) = store.aggregate('example.gr', since=now - DAY, bucket='day')
+    assert bucket['count'] == 2
+    assert bucket['avg_score'] == 60
+    assert bucket['score_stddev'] == 10
+    assert bucket['prompt_tokens'] == 2000
+
+def test_aggregates_are_bucketed_and_filtered(store):
+    """Queries filter by outlet and topic and group rows into time buckets."""
+    base = (time.time() // DAY) * DAY - 3 * DAY
+    store.write_batch([tuple(r.values()) for r in [
+        row(base + 100, score=40),
+        row(base + DAY + 100, score=80),
+        row(base + DAY + 200, topic='kosmos', score=20),
+        row(base + 100, domain='other.gr', score=90),
+    ]])
+    daily = store.aggregate('example.gr', since=base, until=base + 3 * DAY, bucket='day')
+    assert [b['count'] for b in daily] == [1, 2]
+    assert [b['avg_score'] for b in daily] == [40, 50]
+    topic_only = store.aggregate('example.gr', 'kosmos', since=base, until=base + 3 * DAY)
+    assert [b['avg_score'] for b in topic_only] == [20]
+    hourly = store.aggregate('example.gr', since=base, until=base + 3 * DAY, bucket='hour')
+    assert sum(b['count'] for b in hourly) == 3
+    top = store.top_domains(since=base, until=base + 3 * DAY)
+    assert top[0] == {'domain': 'example.gr', 'count': 3, 'avg_score': 46.67}
+
+def test_rows_without_scores_do_not_skew_average(store):
+    """Analyses whose score could not be parsed count but do not affect the mean."""
+    now = time.time()
+    store.write_batch([tuple(row(now, score=None).values()), tuple(row(now, score=80).values())])
+    (bucket,) = store.aggregate('example.gr', since=now - DAY)
+    assert bucket['count'] == 2 and bucket['avg_score'] == 80
+
+def test_topic_of_uses_section_directory():
+    """The topic is the first word-like directory, never the article slug."""
+    assert topic_of('https://www.kathimerini.gr/politics/562900/titlos/') == 'politics'
+    assert topic_of('https://www.in.gr/2024/10/19/greece/arthro') == 'greece'
+    assert topic_of('https://www.example.gr/some-article-slug') == ''
+
+def test_analytics_endpoint_validates_bucket():
+    """GET /analytics rejects unknown bucket sizes."""
+    import app as app_module
+    with patch.object(app_module, 'analytics_store', AnalyticsStore(':memory:')):
+        client = app_module.app.test_client()
+        assert client.get('/analytics?bucket=month').status_code == 400
+        data = client.get('/analytics?domain=www.example.gr').get_json()
+        assert data['buckets'] == [] and data['top_domains'] is None
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -110,5 +110,46 @@ def test_analyze_route_success(client):
         assert 'source' in data
         assert data['success'] is True
 
+def test_analysis_lookup_is_cacheable(client):
+    """POST /analyze points at a GET resource with a strong ETag that revalidates to 304."""
+    import app as app_module
+    with patch('app.mistral_client.chat.complete') as mock_complete:
+        mock_complete.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content='Ανάλυση ' * 200))])
+        created = client.post('/analyze', json={'text': 'Κείμενο για τον έλεγχο της ανάγνωσης αναλύσεων με GET. ' * 3})
+    key = created.get_json()['key']
+    assert created.headers['Content-Location'] == f'/analysis/{key}'
+
+    response = client.get(f'/analysis/{key}')
+    assert response.get_json()['analysis'].startswith('Ανάλυση')
+    assert 'public' in response.headers['Cache-Control'] and 's-maxage' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/')
+    assert client.get(f'/analysis/{key}', headers={'If-None-Match': etag}).status_code == 304
+
+    gzipped = client.get(f'/analysis/{key}', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['ETag'] != etag
+    assert client.get(f'/analysis/{key}', headers={'Accept-Encoding': 'gzip',
+                                                  'If-None-Match': gzipped.headers['ETag']}).status_code == 304
+    assert client.get('/analysis/missing').status_code == 404
+
+    app_module.url_index[app_module.canonicalize_url('https://example.gr/arthro')] = {'key': key, 'text_length': 100}
+    by_url = client.get('/analysis?url=https://example.gr/arthro%3Futm_source%3Dx')
+    assert by_url.headers['Content-Location'] == f'/analysis/{key}'
+    assert client.get('/analysis?url=https://example.gr/other').status_code == 404
+
+def test_hash_first_lookup(client):
+    """A client holding the text finds its analysis by content hash, falling back to upload on a 404."""
+    import app as app_module
+    text = 'Κείμενο  για τον έλεγχο\n του πρωτοκόλλου hash-first με αρκετούς χαρακτήρες. ' * 3
+    digest = app_module.content_hash('\t' + text)
+    assert client.get(f'/analysis?hash={digest}&source=example.gr').status_code == 404
+    assert client.get('/analysis?hash=xyz').status_code == 400
+    with patch('app.mistral_client.chat.complete') as mock_complete:
+        mock_complete.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content='Ανάλυση'))])
+        client.post('/analyze', json={'text': text, 'source': 'example.gr'})
+    found = client.get(f'/analysis?hash={digest}&source=example.gr')
+    assert found.get_json()['analysis'] == 'Ανάλυση' and found.get_json()['success']
+    assert client.get(f'/analysis?hash={digest}&source=other.gr').status_code == 404
+
 if __name__ == '__main__':
     pytest.main([__file__])
@@ -0,0 +1,77 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+import article_metadata
+from article_metadata import prompt_context, public_fields, scan, usable_body
+
+BODY = 'Η κυβέρνηση ανακοίνωσε νέα μέτρα στήριξης &amp; επιδόματα για τα νοικοκυριά. ' * 8
+
+def page(body=BODY, charset='utf-8'):
+    ld = {'@context': 'https://schema.org', '@graph': [
+        {'@type': 'WebSite', 'name': 'Example'},
+        {'@type': ['NewsArticle'], 'headline': 'Νέα μέτρα', 'articleBody': f'<p>{body}</p>',
+         'datePublished': '2026-10-19T08:00:00+03:00',
+         'author': [{'@type': 'Person', 'name': 'Μαρία Π.'}, {'@type': 'Person', 'name': 'Γιώργος Κ.'}],
+         'publisher': {'@type': 'Organization', 'name': 'Η Καθημερινή'}},
+    ]}
+    return (f'<html><head><meta charset="{charset}">'
+            f'<meta property="og:site_name" content="Kathimerini">'
+            f'<script type="application/ld+json">{json.dumps(ld, ensure_ascii=False)}</script>'
+            f'</head><body><div>σελίδα</div></body></html>').encode(charset)
+
+def test_scan_reads_json_ld_article():
+    """Article fields come from JSON-LD (including @graph), entities and tags stripped."""
+    metadata = scan(page())
+    assert metadata['source'] == 'json-ld'
+    assert metadata['headline'] == 'Νέα μέτρα'
+    assert metadata['author'] == 'Μαρία Π., Γιώργος Κ.'
+    assert metadata['publisher'] == 'Η Καθημερινή'
+    assert usable_body(metadata).startswith('Η κυβέρνηση ανακοίνωσε νέα μέτρα στήριξης & επιδόματα')
+    assert public_fields(metadata) == {
+        'headline': 'Νέα μέτρα', 'author': 'Μαρία Π., Γιώργος Κ.',
+        'publisher': 'Η Καθημερινή', 'date_published': '2026-10-19T08:00:00+03:00'
+    }
+    assert 'Εκδότης: Η Καθημερινή' in prompt_context(metadata)
+
+def test_scan_falls_back_to_opengraph_and_legacy_charsets():
+    """Without JSON-LD the meta tags still provide metadata, decoded with the page charset."""
+    raw = ('<html><head><meta charset="windows-1253">'
+           '<meta property="og:site_name" content="Πρώτο Θέμα">'
+           '<meta property="article:published_time" content="2026-10-19">'
+           '<meta property="og:description" content="Σύντομη περίληψη"></head></html>').encode('windows-1253')
+    metadata = scan(raw)
+    assert metadata['publisher'] == 'Πρώτο Θέμα'
+    assert metadata['date_published'] == '2026-10-19'
+    assert metadata['source'] == 'opengraph'
+    assert usable_body(metadata) is None
+
+def test_teaser_bodies_are_not_used():
+    """A short articleBody (a teaser) sends extraction to the DOM path."""
+    assert usable_body(scan(page(body='Σύντομο κείμενο.'))) is None
+
+@patch('app.requests.get')
+def test_extract_article_skips_dom_parsing(mock_get):
+    """A usable JSON-LD body is returned without building a BeautifulSoup tree."""
+    import app as app_module
+    mock_get.return_value = MagicMock(content=page(), headers={'content-type': 'text/html; charset=utf-8'})
+    stats = article_metadata.FastPathStats()
+    with patch.object(app_module.bs4, 'BeautifulSoup', side_effect=AssertionError), \
+            patch.object(app_module, 'extraction_stats', stats):
+        text, metadata = app_module.extract_article('https://www.kathimerini.gr/politics/1/arthro')
+    assert text.startswith('Η κυβέρνηση') and metadata['publisher'] == 'Η Καθημερινή'
+    assert stats.summary()['domains'] == {'kathimerini.gr': {'structured': 1, 'dom': 0}}
+
+@patch('app.mistral_client.chat.complete')
+def test_metadata_reaches_prompt_and_cache_key(mock_complete):
+    """Publisher and date are part of the prompt and of the cache key."""
+    import app as app_module
+    mock_complete.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content='Ανάλυση'))])
+    metadata = {'publisher': 'Η Καθημερινή', 'date_published': '2026-10-19'}
+    text = 'Μοναδικό κείμενο για τον έλεγχο μεταδεδομένων. ' * 5
+    assert app_module.get_cache_key(text, '', metadata) != app_module.get_cache_key(text)
+    app_module.analyze_greek_news(text, '', 'https://www.kathimerini.gr/a', metadata)
+    prompt = mock_complete.call_args.kwargs['messages'][0]['content']
+    assert 'Εκδότης: Η Καθημερινή, Ημερομηνία δημοσίευσης: 2026-10-19' in prompt
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,111 @@
+import pytest
+from unittest.mock import patch
+from article_versions import UPDATE_NOTE, Change, VersionIndex, merge_update, split_paragraphs
+from score_extractor import extract_score, extract_section_scores
+
+SENTENCES = [f"Η πρόταση αριθμός {i} περιγράφει ένα γεγονός της ημέρας με αρκετές λεπτομέρειες για τον αναγνώστη."
+             for i in range(30)]
+UPDATE = "ΕΝΗΜΕΡΩΣΗ: Νέα στοιχεία ήρθαν στο φως σύμφωνα με την αστυνομία."
+
+def analysis(overall, emotional):
+    return (f"**ΣΥΝΟΛΙΚΗ ΑΞΙΟΛΟΓΗΣΗ: {overall}/100**\n\n"
+            f"**1. ΣΥΝΑΙΣΘΗΜΑΤΙΚΗ ΧΕΙΡΑΓΩΓΗΣΗ:**\n- Βαθμολογία ενότητας: {emotional}\n")
+
+def test_an_edit_changes_only_nearby_paragraphs():
+    index = VersionIndex()
+    original = ' '.join(SENTENCES)
+    first = index.compare('u', original)
+    assert len(first.paragraphs) > 3 and first.previous is None
+    index.add('u', first, 'k1', 'full', 60)
+    # Accent, case and whitespace edits are not changes
+    assert index.compare('u', original.replace('ημέρας', 'ΗΜΕΡΑΣ').replace(' ', '  ')).unchanged
+    change = index.compare('u', ' '.join(SENTENCES[:15] + [UPDATE] + SENTENCES[15:]))
+    assert len(change.changed) == 1 and UPDATE in change.changed_text()
+    assert 0 < change.share < 0.25
+    # Dropping a whole block leaves the blocks after it as they were
+    deleted = index.compare('u', ' '.join(first.paragraphs[:1] + first.paragraphs[2:]))
+    assert deleted.changed == [] and deleted.share == pytest.approx(len(first.paragraphs[1]) / len(original), abs=0.01)
+    assert split_paragraphs('Πρώτη παράγραφος.\n\n Δεύτερη  παράγραφος.') == ['Πρώτη παράγραφος.', 'Δεύτερη παράγραφος.']
+
+def test_scores_are_merged_by_changed_share():
+    merged = merge_update(analysis(80, 70), analysis(40, 30), 0.25)
+    assert extract_score(merged) == 70
+    assert extract_section_scores(merged) == {'ΣΥΝΑΙΣΘΗΜΑΤΙΚΗ ΧΕΙΡΑΓΩΓΗΣΗ': 60}
+    assert merged.startswith('**ΕΝΗΜΕΡΩΣΗ ΑΡΘΡΟΥ:**')
+
+@pytest.mark.parametrize('stored', [False, True], ids=['memory', 'sqlite'])
+def test_versions_are_bounded(tmp_path, stored):
+    index = VersionIndex(max_urls=2, max_versions=2, recheck_interval=60,
+                         path=str(tmp_path / 'versions.db') if stored else None)
+    for n in range(3):
+        index.add('a', Change([f'Παράγραφος {n}']), f'k{n}', 'full', None, now=100 + n)
+    assert [v['version'] for v in index.history('a')] == [2, 3]
+    index.add('b', Change(['Β']), 'kb', 'full', None, now=110)
+    index.add('c', Change(['Γ']), 'kc', 'full', None, now=110)
+    index.trim()
+    assert index.history('a') == [] and index.latest('c').key == 'kc'
+    assert not index.due('b', now=169) and index.due('b', now=170) and not index.due('new', now=1000)
+
+def test_workers_share_versions(tmp_path):
+    """Versions recorded by one worker are diffed against by another."""
+    path = str(tmp_path / 'versions.db')
+    first, second = VersionIndex(path=path), VersionIndex(path=path)
+    first.add('u', first.compare('u', ' '.join(SENTENCES)), 'k1', 'full', 60)
+    change = second.compare('u', ' '.join(SENTENCES + [UPDATE]))
+    assert change.previous.key == 'k1' and len(change.changed) == 1
+    second.add('u', change, 'k1', 'partial', 55)
+    assert [(v['version'], v['analysis'], v['score']) for v in first.history('u')] == [(1, 'full', 60), (2, 'partial', 55)]
+
+def test_updated_article_reanalyzes_only_changed_paragraphs(app_with_backend):
+    import app as app_module
+    client = app_module.app.test_client()
+    url = 'https://news.example.gr/article/1'
+    backend = app_with_backend(analysis(80, 70), analysis(40, 30))
+    pages = [' '.join(SENTENCES), ' '.join(SENTENCES), ' '.join(SENTENCES + [UPDATE])]
+    with patch.object(app_module, 'article_versions', VersionIndex(recheck_interval=0)), \
+            patch.object(app_module, 'analysis_listeners', []), \
+            patch.object(app_module, 'extract_article', side_effect=lambda *args: (pages.pop(0), {})):
+        first = client.post('/analyze', json={'url': url}).get_json()
+        unchanged = client.post('/analyze', json={'url': url}).get_json()
+        assert unchanged['key'] == first['key'] and len(backend.prompts) == 1
+        updated = client.post('/analyze', json={'url': url}).get_json()
+        assert app_module.analysis_cache[updated['key']] == updated['analysis']
+    assert len(backend.prompts) == 2
+    assert UPDATE in backend.prompts[1] and UPDATE_NOTE in backend.prompts[1]
+    assert SENTENCES[0] not in backend.prompts[1]
+    assert 40 < extract_score(updated['analysis']) < 80
+    assert [(v['version'], v['analysis']) for v in updated['versions']] == [(1, 'full'), (2, 'partial')]
+    # The update is past the text the cache key covers, so the key's analysis is replaced
+    assert updated['versions'][1]['changed_paragraphs'] and updated['key'] == first['key']
+
+def test_warm_cache_is_refreshed_for_a_url_without_history(app_with_backend):
+    """A worker with no versions of a URL does not take a same-key cached analysis of older text."""
+    import app as app_module
+    from lookup_index import LookupIndex
+    client = app_module.app.test_client()
+    url = 'https://news.example.gr/article/2'
+    backend = app_with_backend(analysis(80, 70), analysis(40, 30))
+    contents = LookupIndex().contents
+    pages = [' '.join(SENTENCES), ' '.join(SENTENCES + [UPDATE]), ' '.join(SENTENCES + [UPDATE])]
+    with patch.object(app_module, 'analysis_listeners', []), \
+            patch.object(app_module, 'content_index', contents), \
+            patch.object(app_module, 'extract_article', side_effect=lambda *args: (pages.pop(0), {})):
+        with patch.object(app_module, 'article_versions', VersionIndex()), \
+                patch.object(app_module, 'url_index', LookupIndex().urls):
+            first = client.post('/analyze', json={'url': url}).get_json()
+        # Another worker: the cache is warm, it knows neither the URL nor its versions, and the
+        # article was updated past the text the cache key covers
+        with patch.object(app_module, 'article_versions', VersionIndex()), \
+                patch.object(app_module, 'url_index', LookupIndex().urls):
+            updated = client.post('/analyze', json={'url': url}).get_json()
+        assert updated['key'] == first['key'] and len(backend.prompts) == 2
+        assert updated['analysis'] == analysis(40, 30) == app_module.analysis_cache[first['key']]
+        assert [(v['version'], v['analysis'], v['score']) for v in updated['versions']] == [(1, 'full', 40)]
+        # The same text again is known to match the cached analysis, so it is not re-analyzed
+        with patch.object(app_module, 'article_versions', VersionIndex()), \
+                patch.object(app_module, 'url_index', LookupIndex().urls):
+            again = client.post('/analyze', json={'url': url}).get_json()
+        assert again['analysis'] == analysis(40, 30) and len(backend.prompts) == 2
+
+if __name__ == '__main__':
+    pytest.main([__file__])
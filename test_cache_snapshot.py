@@ -0,0 +1,126 @@
+import hashlib
+import pytest
+import zlib
+from cache_snapshot import HEADER_FIXED, COUNT, LEGACY_INDEX_ENTRY, MAGIC, SnapshotCache, SnapshotTable, key_bytes, version_id
+
+def make_key(n):
+    return hashlib.md5(f"article-{n}".encode('utf-8')).hexdigest()
+
+def test_snapshot_round_trip(tmp_path):
+    """Entries written by one cache are served by a fresh one from the snapshot."""
+    path = str(tmp_path / 'cache.snap')
+    cache = SnapshotCache(path, tag='v1')
+    cache[make_key(1)] = 'Ανάλυση πρώτη'
+    cache[make_key(2)] = 'Ανάλυση δεύτερη'
+    assert cache.snapshot() is True
+
+    restarted = SnapshotCache(path, tag='v1')
+    assert make_key(1) in restarted
+    assert restarted.memory == {}
+    assert restarted[make_key(2)] == 'Ανάλυση δεύτερη'
+    assert restarted.stats['snapshot_hits'] == 1
+    assert make_key(3) not in restarted
+    assert len(restarted) == 2
+
+def test_entries_of_other_versions_are_served_until_replaced(tmp_path):
+    """A prompt/model change keeps serving old analyses, tagged with their version."""
+    path = str(tmp_path / 'cache.snap')
+    cache = SnapshotCache(path, tag='old-prompt')
+    cache[make_key(1)] = 'old analysis'
+    cache.snapshot()
+
+    upgraded = SnapshotCache(path, tag='new-prompt')
+    assert upgraded[make_key(1)] == 'old analysis'
+    assert upgraded.version_of(make_key(1)) == version_id('old-prompt')
+    upgraded[make_key(1)] = 'new analysis'
+    upgraded.set(make_key(2), 'by another model', 'other-model')
+    upgraded.snapshot()
+
+    restarted = SnapshotCache(path, tag='new-prompt')
+    assert restarted.version_of(make_key(1)) == version_id('new-prompt')
+    assert restarted.version_of(make_key(2)) == version_id('other-model')
+    assert restarted.version_of(make_key(3)) is None
+
+def test_format_1_snapshots_are_read_with_their_tag(tmp_path):
+    """Snapshots written before per-entry versions are served as entries of the header's version."""
+    path = str(tmp_path / 'cache.snap')
+    blob = zlib.compress('legacy'.encode('utf-8'))
+    tag = b'old-prompt'
+    with open(path, 'wb') as f:
+        f.write(HEADER_FIXED.pack(MAGIC, 1, len(tag)) + tag + COUNT.pack(1))
+        f.write(LEGACY_INDEX_ENTRY.pack(key_bytes(make_key(1)),
+                                        HEADER_FIXED.size + len(tag) + COUNT.size + LEGACY_INDEX_ENTRY.size, len(blob)))
+        f.write(blob)
+    cache = SnapshotCache(path, tag='new-prompt')
+    assert cache[make_key(1)] == 'legacy' and cache.version_of(make_key(1)) == version_id('old-prompt')
+
+def test_snapshots_from_workers_are_merged(tmp_path):
+    """Each worker's snapshot keeps entries written by the others."""
+    path = str(tmp_path / 'cache.snap')
+    worker_a = SnapshotCache(path, tag='v1')
+    worker_b = SnapshotCache(path, tag='v1')
+    worker_a[make_key(1)] = 'from a'
+    worker_b[make_key(2)] = 'from b'
+    worker_a.snapshot()
+    worker_b.snapshot()
+
+    table = SnapshotTable(path)
+    assert table.count == 2
+    assert key_bytes(make_key(1)) in table and key_bytes(make_key(2)) in table
+
+def test_entries_read_from_the_snapshot_are_not_written_back(tmp_path):
+    """A worker's promoted copy never overwrites a newer version written by another worker."""
+    path = str(tmp_path / 'cache.snap')
+    seed = SnapshotCache(path, tag='v1')
+    seed.set(make_key(1), 'old analysis', 'a' * 16)
+    seed.snapshot()
+    worker_a = SnapshotCache(path, tag='v1')
+    worker_b = SnapshotCache(path, tag='v1')
+    assert worker_a[make_key(1)] == 'old analysis'
+    worker_b.set(make_key(1), 'new analysis', 'b' * 16)
+    worker_b.snapshot()
+    worker_a[make_key(2)] = 'unrelated'
+    worker_a.snapshot()
+
+    reader = SnapshotCache(path, tag='v1')
+    assert reader[make_key(1)] == 'new analysis'
+    assert reader.version_of(make_key(1)) == 'b' * 16
+    # The stale copy was dropped when worker A picked up the new file
+    assert worker_a[make_key(1)] == 'new analysis'
+
+def test_snapshot_moves_entries_out_of_memory(tmp_path):
+    """After a snapshot the analyses live in the mapped file, not the heap."""
+    cache = SnapshotCache(str(tmp_path / 'cache.snap'), tag='v1')
+    cache[make_key(1)] = 'text'
+    cache.snapshot()
+    assert cache.memory == {}
+    assert cache[make_key(1)] == 'text'
+    assert cache.snapshot() is False
+
+def test_snapshot_respects_max_entries(tmp_path):
+    """Older entries are dropped first when the snapshot is over its limit."""
+    path = str(tmp_path / 'cache.snap')
+    old = SnapshotCache(path, tag='v1')
+    for n in range(5):
+        old[make_key(n)] = f'old {n}'
+    old.snapshot()
+
+    cache = SnapshotCache(path, tag='v1', max_entries=3)
+    # Read here, so used more recently than the other old entries
+    assert cache[make_key(0)] == 'old 0'
+    cache[make_key(10)] = 'new'
+    cache.snapshot()
+    table = SnapshotTable(path)
+    assert table.count == 3
+    assert [key for key, _ in table.items_raw()] == [key_bytes(make_key(n)) for n in (4, 0, 10)]
+
+def test_cache_without_path_behaves_like_dict():
+    """Without CACHE_SNAPSHOT_PATH the cache is a plain in-memory mapping."""
+    cache = SnapshotCache()
+    cache['k'] = 'v'
+    assert 'k' in cache and cache['k'] == 'v' and len(cache) == 1
+    assert cache.get('missing') is None
+    assert cache.snapshot() is False
+
+if __name__ == '__main__':
+    pytest.main([__file__])
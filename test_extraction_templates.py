@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import patch
+from bs4 import BeautifulSoup
+from extraction_templates import LEARN_PAGES, MAX_MISSES, TemplateStore
+
+ARTICLE = '<p>' + 'Η κυβέρνηση ανακοίνωσε νέα μέτρα στήριξης για τα νοικοκυριά. ' * 8 + '</p>'
+SIDEBAR = '<div class="related">' + '<p><a href="/x">Διαβάστε επίσης: άλλο θέμα της ημέρας</a></p>' * 6 + '</div>'
+
+def page(article=ARTICLE):
+    return BeautifulSoup(
+        f'<html><body><nav><a href="/">Αρχική</a></nav><main>'
+        f'<div class="article-body">{article}</div>{SIDEBAR}</main></body></html>', 'html.parser')
+
+def test_probe_prefers_tight_article_node_over_main():
+    """The article body wins over a main element that also wraps link-heavy teasers."""
+    text, selector = TemplateStore().extract(page(), 'example.gr')
+    assert selector == '.article-body'
+    assert 'Διαβάστε επίσης' not in text
+
+def test_template_is_learned_then_used_directly():
+    """After LEARN_PAGES consistent wins the domain skips probing."""
+    store = TemplateStore()
+    for _ in range(LEARN_PAGES):
+        store.extract(page(), 'example.gr')
+    assert store.get('example.gr')['selector'] == '.article-body'
+    with patch.object(store, '_probe') as probe:
+        text, selector = store.extract(page(), 'example.gr')
+    probe.assert_not_called()
+    assert selector == '.article-body' and 'κυβέρνηση' in text
+    assert store.get('example.gr')['hits'] == 1
+
+def test_template_is_relearned_after_repeated_misses():
+    """A learned selector that keeps failing is dropped."""
+    store = TemplateStore()
+    for _ in range(LEARN_PAGES):
+        store.extract(page(), 'example.gr')
+    redesigned = BeautifulSoup(f'<html><body><article>{ARTICLE}</article></body></html>', 'html.parser')
+    for _ in range(MAX_MISSES):
+        text, selector = store.extract(redesigned, 'example.gr')
+        assert selector == 'article'
+    summary = store.get('example.gr')
+    assert summary['misses'] == MAX_MISSES and summary['learning']
+
+def test_override_is_persisted_and_shared(tmp_path):
+    """A hand-set selector is written to the shared file and always used."""
+    path = str(tmp_path / 'templates.json')
+    TemplateStore(path).set_override('example.gr', 'main')
+    other = TemplateStore(path)
+    text, selector = other.extract(page(), 'example.gr')
+    assert selector == 'main' and 'Διαβάστε επίσης' in text
+    assert other.get('example.gr')['override']
+
+def test_admin_template_endpoints(monkeypatch):
+    """Templates can be listed, pinned and reset by an admin."""
+    import app as app_module
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    headers = {'X-Admin-Token': 'secret'}
+    with patch.object(app_module, 'extraction_templates', TemplateStore()):
+        client = app_module.app.test_client()
+        assert client.get('/admin/templates/example.gr', headers=headers).status_code == 404
+        assert client.put('/admin/templates/example.gr', json={'selector': 'div[['},
+                          headers=headers).status_code == 400
+        pinned = client.put('/admin/templates/www.example.gr', json={'selector': '.story'}, headers=headers)
+        assert pinned.get_json()['selector'] == '.story' and pinned.get_json()['override']
+        assert client.get('/admin/templates', headers=headers).get_json()['templates'][0]['domain'] == 'example.gr'
+        reset = client.delete('/admin/templates/example.gr', headers=headers).get_json()
+        assert reset['selector'] is None and not reset['override']
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,45 @@
+import random
+import pytest
+from unittest.mock import patch
+import greek_text
+from greek_text import (FOLD_TABLE, TOKEN_REGEX, fold, fold_many, from_code_units, normalize,
+                        normalize_many, normalize_whitespace, to_code_units, tokenize, tokenize_many)
+from score_extractor import extract_score, extract_section_scores
+
+def random_texts(count=200):
+    rng = random.Random(5)
+    alphabet = [chr(c) for c in range(0x20, 0x2100)] + ['😀', '𝔸', ' ', '\n', 'ς', 'Ά']
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 600))) for _ in range(count)]
+
+@pytest.mark.parametrize('numpy', [True, False])
+def test_batch_apis_match_reference_implementation(numpy):
+    """Batch and single-text paths, with or without NumPy, agree with translate + regex."""
+    texts = random_texts()
+    expected_fold = [text.translate(FOLD_TABLE) for text in texts]
+    expected_tokens = [TOKEN_REGEX.findall(text) for text in expected_fold]
+    with patch.object(greek_text, 'np', greek_text.np if numpy else None):
+        assert fold_many(texts) == expected_fold
+        assert [fold(text) for text in texts] == expected_fold
+        assert tokenize_many(texts) == expected_tokens
+        assert [tokenize(text) for text in texts] == expected_tokens
+
+def test_code_units_round_trip():
+    """Documents survive concatenation into one code unit array, astral characters included."""
+    texts = ['Καλημέρα', '', 'emoji 😀 μέσα', 'Ω']
+    units, offsets = to_code_units(texts)
+    assert len(units) == offsets[-1]
+    assert from_code_units(units, offsets) == texts
+
+def test_normalize_collapses_whitespace_and_folds():
+    assert normalize_whitespace('  Η\tκυβέρνηση \n\n ανακοίνωσε ') == 'Η κυβέρνηση ανακοίνωσε'
+    assert normalize('  ΝΈΑ\n μέτρα ') == 'νεα μετρα'
+    assert normalize_many(['Α  Β', 'Ά']) == ['α β', 'α']
+
+def test_score_labels_match_regardless_of_case_and_accents():
+    """Score labels written in title case still parse; section titles keep their original form."""
+    analysis = '**1. Αντικειμενικότητα:**\nΒΑΘΜΟΛΟΓΙΑ ΕΝΟΤΗΤΑΣ: 70\n\n**Συνολική Αξιολόγηση:** 65'
+    assert extract_score(analysis) == 65
+    assert extract_section_scores(analysis) == {'Αντικειμενικότητα': 70}
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,116 @@
+import multiprocessing
+import os
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from cache_snapshot import SnapshotCache
+from idempotency_store import CLAIMED, CONFLICT, DONE, PENDING, IdempotencyStore, fingerprint, valid_key
+
+KEY = fingerprint('/analyze', 'key-1')
+BODY = fingerprint('/analyze', b'{"text": "..."}')
+
+def test_claim_complete_and_replay(tmp_path):
+    """The first claim runs the request, later ones get its stored response or a conflict."""
+    store = IdempotencyStore(str(tmp_path / 'keys.db'))
+    assert store.claim(KEY, BODY) == (CLAIMED, None)
+    assert store.claim(KEY, BODY) == (PENDING, None)
+    store.complete(KEY, 200, {'Content-Type': 'application/json'}, b'{"ok": true}')
+    state, response = store.claim(KEY, BODY)
+    assert state == DONE and response == {'status': 200, 'headers': {'Content-Type': 'application/json'},
+                                          'body': b'{"ok": true}'}
+    assert store.claim(KEY, fingerprint('/analyze', b'other'))[0] == CONFLICT
+
+def test_duplicate_waits_for_the_running_request(tmp_path):
+    """A duplicate arriving mid-flight attaches to the first execution instead of running again."""
+    path = str(tmp_path / 'keys.db')
+    first, second = IdempotencyStore(path), IdempotencyStore(path, wait=5)
+    assert first.claim(KEY, BODY)[0] == CLAIMED
+    timer = threading.Timer(0.2, first.complete, (KEY, 200, {}, b'done'))
+    timer.start()
+    state, response = second.claim(KEY, BODY)
+    timer.join()
+    assert state == DONE and response['body'] == b'done'
+
+def claim_and_die(path, lease):
+    """A worker that claims the key and is killed before finishing"""
+    IdempotencyStore(path, lease=lease).claim(KEY, BODY)
+    os._exit(0)
+
+def test_released_and_expired_claims_can_be_retaken(tmp_path):
+    path = str(tmp_path / 'keys.db')
+    store = IdempotencyStore(path, lease=0.05)
+    assert store.claim(KEY, BODY)[0] == CLAIMED
+    store.release(KEY)
+    assert store.claim(KEY, BODY)[0] == CLAIMED
+    store.release(KEY)
+    # The worker holding the claim died: nothing renews it and the lease runs out
+    worker = multiprocessing.get_context('fork').Process(target=claim_and_die, args=(path, 0.05))
+    worker.start()
+    worker.join()
+    assert store.claim(KEY, BODY)[0] == PENDING
+    time.sleep(0.06)
+    assert store.claim(KEY, BODY)[0] == CLAIMED
+
+def test_running_claims_are_renewed(tmp_path):
+    """A request running longer than the lease keeps its claim until it completes."""
+    path = str(tmp_path / 'keys.db')
+    first, second = IdempotencyStore(path, lease=0.1), IdempotencyStore(path, lease=0.1)
+    assert first.claim(KEY, BODY)[0] == CLAIMED
+    time.sleep(0.3)
+    assert second.claim(KEY, BODY) == (PENDING, None)
+    first.complete(KEY, 200, {}, b'done')
+    assert second.claim(KEY, BODY)[0] == DONE
+
+def test_prune_bounds_the_store(tmp_path):
+    store = IdempotencyStore(str(tmp_path / 'keys.db'), max_entries=3)
+    for i in range(5):
+        key = fingerprint('/analyze', i)
+        store.claim(key, BODY)
+        store.complete(key, 200, {}, b'')
+    assert store.prune() == 2 and len(store) == 3
+    assert store.claim(fingerprint('/analyze', 0), BODY)[0] == CLAIMED
+    assert store.claim(fingerprint('/analyze', 4), BODY)[0] == DONE
+
+def test_key_validation():
+    assert valid_key('3f2c1a7e-0b4d-4c39-9a51-8d0e2f6b7c11')
+    assert not valid_key('') and not valid_key('x' * 300) and not valid_key('bad\nkey')
+
+def test_analyze_runs_once_per_idempotency_key(tmp_path):
+    """Retries with the same key replay the first analysis; reusing it for other text is rejected."""
+    import app as app_module
+    client = app_module.app.test_client()
+    headers = {'Idempotency-Key': 'retry-key-0001'}
+    text = 'Κείμενο για τον έλεγχο των επαναλαμβανόμενων υποβολών ανάλυσης. ' * 2
+    with patch.object(app_module, 'idempotency', IdempotencyStore(str(tmp_path / 'keys.db'))), \
+            patch('app.mistral_client.chat.complete') as mock_complete:
+        mock_complete.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content='Ανάλυση'))])
+        first = client.post('/analyze', headers=headers, json={'text': text})
+        # Not answered from the analysis cache either
+        with patch.object(app_module, 'analysis_cache', SnapshotCache()):
+            retry = client.post('/analyze', headers=headers, json={'text': text})
+        assert mock_complete.call_count == 1
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert retry.get_json() == first.get_json()
+        assert retry.headers['Content-Location'] == first.headers['Content-Location']
+        other = client.post('/analyze', headers=headers, json={'text': text + ' Άλλο.'})
+        assert other.status_code == 422
+        assert client.post('/analyze', headers={'Idempotency-Key': 'x' * 300}, json={'text': text}).status_code == 400
+
+def test_duplicate_of_a_running_analysis_is_told_to_retry(tmp_path):
+    """A duplicate arriving mid-flight gets 409 with Retry-After at once, and no LLM call."""
+    import app as app_module
+    store = IdempotencyStore(str(tmp_path / 'keys.db'))
+    body = '{"text": "Κείμενο που αναλύεται ήδη από άλλο αίτημα, με αρκετούς χαρακτήρες για έλεγχο."}'.encode('utf-8')
+    # Another worker is running the same submission
+    assert store.claim(fingerprint('/analyze', 'running-key-01'), fingerprint('/analyze', body))[0] == CLAIMED
+    with patch.object(app_module, 'idempotency', store), \
+            patch('app.mistral_client.chat.complete') as mock_complete:
+        started = time.monotonic()
+        response = app_module.app.test_client().post(
+            '/analyze', headers={'Idempotency-Key': 'running-key-01'}, data=body, content_type='application/json')
+    assert response.status_code == 409 and int(response.headers['Retry-After']) >= 1
+    assert time.monotonic() - started < 1 and mock_complete.call_count == 0
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,167 @@
+import time
+import pytest
+from unittest.mock import patch
+from ingestion import MAX_PREFETCH_ATTEMPTS, FeedIngester, FeedState, parse_feed, parse_sitemap_index
+from url_utils import canonicalize_url, domain_of
+
+RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel>
+  <title>Example</title><link>https://www.example.gr/</link>
+  <image><url>https://www.example.gr/logo.png</url></image>
+  <item><title>Old</title><link>https://www.example.gr/old</link>
+    <pubDate>Mon, 01 Jan 2024 10:00:00 +0200</pubDate></item>
+  <item><title>New</title><link>https://www.example.gr/new?utm_source=rss</link>
+    <pubDate>{recent}</pubDate></item>
+  <item><title>Newer</title><link>https://www.example.gr/newer</link>
+    <pubDate>{recent}</pubDate></item>
+</channel></rss>"""
+
+SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">
+  <url><loc>https://news.example.gr/a</loc>
+    <news:news><news:publication_date>2026-10-19T08:00:00+03:00</news:publication_date></news:news>
+  </url>
+</urlset>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry><link href="https://atom.example.gr/story"/><updated>2026-10-19T08:00:00Z</updated></entry>
+</feed>"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://news.example.gr/sitemap-2020.xml</loc><lastmod>2020-01-01T00:00:00Z</lastmod></sitemap>
+  <sitemap><loc>https://news.example.gr/sitemap-today.xml</loc><lastmod>{recent}</lastmod></sitemap>
+</sitemapindex>"""
+
+def recent_rss():
+    stamp = time.strftime('%a, %d %b %Y %H:%M:%S +0000', time.gmtime())
+    return RSS.replace(b'{recent}', stamp.encode())
+
+class FakeFetch:
+    def __init__(self, content, etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.calls = []
+
+    def __call__(self, url, headers):
+        self.calls.append(headers)
+        if self.etag and headers.get('If-None-Match') == self.etag:
+            return 304, {}, b''
+        return 200, {'ETag': self.etag}, self.content
+
+def test_parse_rss_atom_and_sitemap():
+    """Links and dates are read from RSS items, Atom entries and sitemap urls."""
+    rss_links = [link for link, _ in parse_feed(recent_rss())]
+    assert rss_links == [
+        'https://www.example.gr/old',
+        'https://www.example.gr/new?utm_source=rss',
+        'https://www.example.gr/newer',
+    ]
+    (link, published), = parse_feed(SITEMAP)
+    assert link == 'https://news.example.gr/a' and published is not None
+    assert parse_feed(ATOM)[0][0] == 'https://atom.example.gr/story'
+
+def test_sitemap_index_follows_recent_child_sitemaps():
+    """A sitemap index is followed to its recently modified children, each with its own validators."""
+    index = SITEMAP_INDEX.replace(b'{recent}', time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()).encode())
+    child = SITEMAP.replace(b'2026-10-19T08:00:00+03:00', time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()).encode())
+    responses = {'https://news.example.gr/sitemap.xml': index, 'https://news.example.gr/sitemap-today.xml': child}
+    requested = []
+
+    def fetch(url, headers):
+        requested.append((url, headers))
+        if headers.get('If-None-Match') == '"v1"':
+            return 304, {}, b''
+        return 200, {'ETag': '"v1"'}, responses[url]
+
+    assert [url for url, _ in parse_sitemap_index(index)][1] == 'https://news.example.gr/sitemap-today.xml'
+    assert parse_sitemap_index(SITEMAP) == []
+    feed = FeedState('https://news.example.gr/sitemap.xml')
+    ingester = FeedIngester([feed], lambda u, s: True, lambda c: False, fetch=fetch)
+    assert ingester.poll(feed) == 1 and ingester.pending[0][0] == 'https://news.example.gr/a'
+    # The 2020 child is outside the max age and never fetched
+    assert [url for url, _ in requested] == ['https://news.example.gr/sitemap.xml',
+                                             'https://news.example.gr/sitemap-today.xml']
+    feed.etag = None
+    assert ingester.poll(feed) == 0
+    assert requested[-1] == ('https://news.example.gr/sitemap-today.xml', {'If-None-Match': '"v1"'})
+
+def test_failed_prefetch_is_queued_again():
+    """A URL counts as seen only once pre-analyzed; failures are retried a bounded number of times."""
+    results = []
+    ingester = FeedIngester([FeedState('https://www.example.gr/rss')], lambda u, s: results.pop(0),
+                            lambda c: False, fetch=FakeFetch(recent_rss(), etag=None))
+    feed = ingester.feeds[0]
+    results.extend([False, True])
+    assert ingester.poll(feed) == 2
+    # Still queued, so not queued twice
+    assert ingester.poll(feed) == 0
+    ingester.drain_one()
+    ingester.drain_one()
+    assert ingester.stats['failed'] == 1 and ingester.stats['analyzed'] == 1
+    # The first failure was one attempt; the URL is given up after the last
+    results.extend([False] * (MAX_PREFETCH_ATTEMPTS - 1))
+    for _ in range(MAX_PREFETCH_ATTEMPTS - 1):
+        assert ingester.poll(feed) == 1
+        ingester.drain_one()
+    assert ingester.poll(feed) == 0
+
+def test_poll_uses_conditional_get():
+    """A second poll sends the stored ETag and a 304 queues nothing."""
+    fetch = FakeFetch(recent_rss())
+    ingester = FeedIngester([FeedState('https://www.example.gr/rss')], lambda u, s: True,
+                            lambda c: False, fetch=fetch)
+    assert ingester.poll(ingester.feeds[0]) == 2
+    assert ingester.poll(ingester.feeds[0]) == 0
+    assert fetch.calls[1]['If-None-Match'] == '"v1"'
+    assert ingester.stats['not_modified'] == 1
+
+def test_poll_skips_known_and_stale_items():
+    """Already-analyzed URLs and articles older than the max age are not queued."""
+    known = {canonicalize_url('https://www.example.gr/newer')}
+    ingester = FeedIngester([FeedState('https://www.example.gr/rss')], lambda u, s: True,
+                            lambda c: c in known, fetch=FakeFetch(recent_rss()))
+    assert ingester.poll(ingester.feeds[0]) == 1
+    assert ingester.pending[0] == ('https://www.example.gr/new?utm_source=rss', 'example.gr')
+
+def test_per_feed_budget_limits_queue():
+    """The per-poll and per-day budgets cap how many items a feed may queue."""
+    feed = FeedState('https://www.example.gr/rss', max_items_per_poll=1, max_items_per_day=1)
+    ingester = FeedIngester([feed], lambda u, s: True, lambda c: False,
+                            fetch=FakeFetch(recent_rss(), etag=None))
+    assert ingester.poll(feed) == 1
+    assert ingester.poll(feed) == 0
+
+def test_drain_one_runs_prefetch_callback():
+    """Queued items are handed to the prefetch callback one at a time."""
+    processed = []
+    ingester = FeedIngester([], lambda u, s: processed.append((u, s)) or True, lambda c: False)
+    ingester.pending.append(('https://www.example.gr/a', 'example.gr'))
+    assert ingester.drain_one() is True
+    assert ingester.drain_one() is False
+    assert processed == [('https://www.example.gr/a', 'example.gr')]
+    assert ingester.stats['analyzed'] == 1
+
+def test_canonicalize_url_drops_tracking():
+    """Tracking parameters, fragments and trailing slashes do not change the key."""
+    assert canonicalize_url('HTTPS://WWW.Example.gr/a/?utm_source=x&b=2&a=1#top') == \
+        'https://www.example.gr/a?a=1&b=2'
+    assert domain_of('https://www.kathimerini.gr/politics/1') == 'kathimerini.gr'
+
+def test_known_url_served_without_fetch():
+    """A URL analyzed earlier is answered from the cache without refetching."""
+    import app as app_module
+    app_module.app.config['TESTING'] = True
+    app_module.analysis_cache['k1'] = 'Cached analysis'
+    app_module.url_index[canonicalize_url('https://www.example.gr/cached')] = {'key': 'k1', 'text_length': 321}
+    with patch('app.requests.get') as mock_get:
+        response = app_module.app.test_client().post(
+            '/analyze', json={'url': 'https://www.example.gr/cached?utm_medium=social'})
+    assert response.status_code == 200
+    assert response.get_json()['analysis'] == 'Cached analysis'
+    mock_get.assert_not_called()
+
+if __name__ == '__main__':
+    pytest.main([__file__])
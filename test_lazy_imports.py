@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from lazy_imports import LazyObject, is_loaded, lazy_import
+
+def test_lazy_object_builds_on_first_use():
+    """The factory runs once, on the first attribute access."""
+    calls = []
+    proxy = LazyObject(lambda: calls.append(1) or {'a': 1})
+    assert not proxy.loaded and calls == []
+    assert proxy.get('a') == 1 and proxy.get('a') == 1
+    assert proxy.loaded and calls == [1]
+
+def test_lazy_import_defers_module_execution(monkeypatch):
+    """The module is imported on first attribute access, not before."""
+    monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+    module = lazy_import('colorsys')
+    assert 'colorsys' not in sys.modules and not is_loaded(module)
+    assert module.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert is_loaded(module) and 'colorsys' in sys.modules
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import('no_such_module_here')
+
+def test_lazy_module_executes_once_across_threads(tmp_path, monkeypatch):
+    """Threads touching a lazy module at once wait for it to execute rather than see it half-done."""
+    (tmp_path / 'slow_lazy_module.py').write_text(
+        'import time\nEXECUTIONS.append(1)\ntime.sleep(0.2)\nVALUE = 42\n', encoding='utf-8')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'slow_lazy_module', raising=False)
+    executions = []
+    monkeypatch.setattr('builtins.EXECUTIONS', executions, raising=False)
+    module = lazy_import('slow_lazy_module')
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(module.VALUE)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert values == [42] * 4 and executions == [1] and is_loaded(module)
+
+def test_app_import_does_not_load_mistral_client():
+    """Importing the app leaves the heavy modules unimported and the Mistral client unbuilt."""
+    # A fresh interpreter, since other tests load these modules in this one
+    script = ('import sys, app; '
+              'print(sorted(set(sys.modules) & {"mistralai", "requests", "bs4", "numpy"}), app.mistral_client.loaded)')
+    result = subprocess.run([sys.executable, '-W', 'ignore', '-c', script], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    assert result.stdout.split('\n')[-2] == '[] False'
+    import app as app_module
+    assert isinstance(app_module.mistral_client, LazyObject) and callable(app_module.warm_up)
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+import sys
+import types
+import pytest
+from unittest.mock import MagicMock, patch
+from llm_backends import (BackendRegistry, BackendStats, LocalBackend, MistralBackend, OpenAICompatibleBackend,
+                          parse_lanes)
+
+REPLY = {'choices': [{'message': {'content': 'Ανάλυση'}}],
+         'usage': {'prompt_tokens': 900, 'completion_tokens': 300, 'total_tokens': 1200}}
+MESSAGES = [{'role': 'user', 'content': 'Κείμενο'}]
+
+def test_registry_selects_by_name_lane_and_default(monkeypatch):
+    monkeypatch.setenv('LLM_OPENAI_BASE_URL', 'http://localhost:8000/v1/')
+    monkeypatch.setenv('LLM_LOCAL_MODEL_PATH', '/models/qwen2.5-7b-instruct-q4_k_m.gguf')
+    monkeypatch.setenv('LLM_LANE_BACKENDS', 'prefetch=local')
+    registry = BackendRegistry.from_env(MagicMock(), 'mistral-large-latest')
+    assert registry.get().name == 'mistral' and registry.get(lane='interactive').name == 'mistral'
+    assert registry.get(lane='prefetch').model_id == 'local:qwen2.5-7b-instruct-q4_k_m.gguf'
+    assert registry.get('openai').url == 'http://localhost:8000/v1/chat/completions'
+    with pytest.raises(KeyError):
+        registry.get('unknown')
+    with pytest.raises(ValueError):
+        BackendRegistry(list(registry), 'local', {'prefetch': 'missing'})
+    assert parse_lanes(' prefetch=local , interactive=openai ') == {'prefetch': 'local', 'interactive': 'openai'}
+
+@patch('llm_backends.requests.post')
+def test_openai_compatible_backend(mock_post):
+    mock_post.return_value = MagicMock(json=MagicMock(return_value=REPLY))
+    backend = OpenAICompatibleBackend('http://localhost:8000/v1', 'qwen', api_key='secret')
+    completion = backend.complete(MESSAGES, 0.7)
+    assert completion.text == 'Ανάλυση' and completion.usage['completion_tokens'] == 300
+    kwargs = mock_post.call_args.kwargs
+    assert kwargs['headers'] == {'Authorization': 'Bearer secret'} and kwargs['json']['model'] == 'qwen'
+
+def test_local_backend_loads_once_per_process(monkeypatch):
+    llama = MagicMock()
+    llama.create_chat_completion.return_value = REPLY
+    fake = types.SimpleNamespace(Llama=MagicMock(return_value=llama))
+    monkeypatch.setitem(sys.modules, 'llama_cpp', fake)
+    backend = LocalBackend('/models/model.gguf', threads=4)
+    backend.complete(MESSAGES, 0.2)
+    backend.complete(MESSAGES, 0.2)
+    fake.Llama.assert_called_once_with(model_path='/models/model.gguf', n_ctx=4096, n_threads=4, verbose=False)
+    assert llama.create_chat_completion.call_count == 2
+
+def test_mistral_backend_rejects_empty_responses():
+    client = MagicMock()
+    client.chat.complete.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content=''))])
+    backend = MistralBackend(client, 'mistral-large-latest')
+    with pytest.raises(ValueError):
+        backend.complete(MESSAGES, 0.7)
+    assert backend.stats.summary()['errors'] == 1
+
+def test_stats_report_latency_and_throughput():
+    stats = BackendStats()
+    for latency in (1.0, 2.0, 3.0, 4.0):
+        stats.record(latency, {'completion_tokens': 100})
+    summary = stats.summary()
+    assert summary['requests'] == 4 and summary['latency_p50'] == 3.0 and summary['latency_p95'] == 4.0
+    assert summary['latency_mean'] == 2.5 and summary['tokens_per_second'] == 40.0
+    assert summary['requests_per_minute'] == 4
+
+def test_analyze_uses_requested_backend(app_with_backend, scripted_backend):
+    """A per-request backend runs the analysis and caches it apart from the default model's."""
+    import app as app_module
+    stub = scripted_backend('Ανάλυση μοντέλου', name='stub', model='stub-1', usage={'completion_tokens': 10})
+    app_with_backend(backends=[app_module.llm.default, stub])
+    client = app_module.app.test_client()
+    text = 'Κείμενο για τον έλεγχο της επιλογής μοντέλου ανάλυσης ανά αίτηση. ' * 2
+    response = client.post('/analyze', json={'text': text, 'backend': 'stub'})
+    assert response.get_json()['analysis'] == 'Ανάλυση μοντέλου' and stub.calls == 1
+    assert response.get_json()['key'] != app_module.get_cache_key(text)
+    assert client.post('/analyze', json={'text': text, 'backend': 'gpt-9'}).status_code == 400
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import patch
+from llm_backends import BackendRegistry
+from llm_fixtures import (FixtureMissing, FixtureStore, RecordingBackend, ReplayBackend, request_key,
+                          wrap_backends)
+
+MESSAGES = [{'role': 'user', 'content': 'Αναλύστε αυτό το άρθρο'}]
+
+@pytest.fixture
+def echo(scripted_backend):
+    """A backend answering with the end of its prompt"""
+    return scripted_backend(lambda messages: f"Ανάλυση: {messages[0]['content'][-20:]}",
+                            usage={'completion_tokens': 42})
+
+def test_record_then_replay(tmp_path, echo):
+    """Recorded pairs replay exactly, with the recorded latency scaled."""
+    store = FixtureStore(str(tmp_path))
+    recorder = RecordingBackend(echo, store)
+    recorded = recorder.complete(MESSAGES, 0.7)
+    assert recorder.model_id == 'mistral:mistral-large-latest' and len(store) == 1
+    fixture = store.load(request_key(MESSAGES, 0.7))
+    assert fixture['response'] == {'text': recorded.text, 'usage': {'completion_tokens': 42}}
+
+    replay = ReplayBackend('mistral', 'mistral-large-latest', store, latency_scale=0.5)
+    with patch('llm_fixtures.time.sleep') as sleep:
+        assert replay.complete(MESSAGES, 0.7) == recorded
+    sleep.assert_called_once_with(fixture['latency'] * 0.5)
+    assert replay.stats.summary()['requests'] == 1
+
+def test_replay_misses(tmp_path, echo):
+    store = FixtureStore(str(tmp_path))
+    RecordingBackend(echo, store).complete(MESSAGES, 0.7)
+    other = [{'role': 'user', 'content': 'Άλλο άρθρο'}]
+    with pytest.raises(FixtureMissing):
+        ReplayBackend('mistral', 'm', store, latency_scale=0).complete(other, 0.7)
+    lenient = ReplayBackend('mistral', 'm', store, latency_scale=0, match='any')
+    assert lenient.complete(other, 0.7) == lenient.complete(other, 0.7)
+
+def test_fixtures_from_env(monkeypatch, tmp_path, echo):
+    monkeypatch.setenv('LLM_FIXTURES_MODE', 'replay')
+    monkeypatch.setenv('LLM_FIXTURES_PATH', str(tmp_path))
+    registry = BackendRegistry.from_env(object(), 'mistral-large-latest')
+    assert isinstance(registry.default, ReplayBackend)
+    assert registry.default.model_id == 'mistral:mistral-large-latest'
+    with pytest.raises(ValueError):
+        wrap_backends([echo], 'rewind', str(tmp_path))
+
+def test_analyze_pipeline_replays_offline(tmp_path, app_with_backend, echo):
+    """A recorded /analyze run replays through the whole pipeline without the real backend."""
+    import app as app_module
+    client = app_module.app.test_client()
+    store = FixtureStore(str(tmp_path))
+    text = 'Κείμενο για τον έλεγχο της καταγραφής και αναπαραγωγής αναλύσεων. ' * 2
+    app_with_backend(backends=[echo], wrap=lambda backends: wrap_backends(backends, 'record', store.path))
+    recorded = client.post('/analyze', json={'text': text}).get_json()
+    app_with_backend(backends=[echo], wrap=lambda backends: wrap_backends(backends, 'replay', store.path,
+                                                                          latency_scale=0))
+    replayed = client.post('/analyze', json={'text': text}).get_json()
+    assert echo.calls == 1 and replayed == recorded
+
+if __name__ == '__main__':
+    pytest.main([__file__])
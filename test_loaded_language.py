@@ -0,0 +1,74 @@
+import json
+import os
+import pytest
+from unittest.mock import patch
+from loaded_language import LoadedLanguage
+
+LEXICON = {
+    'fear': {
+        'απειλή': ['απειλής', 'απειλές', 'απειλών'],
+        'συναγερμός': ['συναγερμού', 'συναγερμό'],
+        'κόκκινος συναγερμός': ['κόκκινου συναγερμού', 'κόκκινο συναγερμό'],
+    },
+    'hyperbole': {'πρωτοφανής': ['πρωτοφανές', 'πρωτοφανή']},
+}
+
+def write(path, lexicon):
+    path.write_text(json.dumps(lexicon, ensure_ascii=False), encoding='utf-8')
+
+def spans(text, highlights):
+    units = text.encode('utf-16-le')
+    return [(units[2 * h['start']:2 * h['end']].decode('utf-16-le'), h['category'], h['term']) for h in highlights]
+
+def test_inflected_forms_are_found_regardless_of_accents_and_case(tmp_path):
+    write(tmp_path / 'lexicon.json', LEXICON)
+    lexicon = LoadedLanguage(str(tmp_path / 'lexicon.json'))
+    text = 'ΠΡΩΤΟΦΑΝΗ μέτρα για τις απειλες!\nΑπειλήθηκε κανείς; Σήμανε κόκκινο\n  συναγερμό 😀 και συναγερμός.'
+    highlights = lexicon.annotate(text)
+    assert all(spans(text, [h])[0][0] == h['text'] for h in highlights)
+    assert spans(text, highlights) == [
+        ('ΠΡΩΤΟΦΑΝΗ', 'hyperbole', 'πρωτοφανής'),
+        ('απειλες', 'fear', 'απειλή'),
+        # The longest overlapping term wins; words inside longer words never match
+        ('κόκκινο\n  συναγερμό', 'fear', 'κόκκινος συναγερμός'),
+        ('συναγερμός', 'fear', 'συναγερμός'),
+    ]
+    assert lexicon.stats()['terms'] == 4 and lexicon.annotate('Ήσυχη μέρα χωρίς ειδήσεις.') == []
+
+def test_lexicon_reloads_when_its_file_changes(tmp_path):
+    path = tmp_path / 'lexicon.json'
+    write(path, LEXICON)
+    lexicon = LoadedLanguage(str(path), check_interval=0)
+    assert lexicon.annotate('Ένα σκάνδαλο.') == []
+    write(path, {'loaded': {'σκάνδαλο': ['σκανδάλου', 'σκάνδαλα']}})
+    os.utime(path, ns=(1, 1))
+    assert spans('Ένα σκάνδαλο.', lexicon.annotate('Ένα σκάνδαλο.')) == [('σκάνδαλο', 'loaded', 'σκάνδαλο')]
+    # A broken file keeps the last good lexicon
+    path.write_text('{', encoding='utf-8')
+    assert len(lexicon.annotate('Ένα σκάνδαλο.')) == 1
+
+def test_default_lexicon_parses():
+    stats = LoadedLanguage().stats()
+    assert stats['terms'] > 0 and stats['forms'] > stats['terms']
+
+def test_every_analyze_answer_has_highlights(tmp_path, app_with_backend):
+    import app as app_module
+    write(tmp_path / 'lexicon.json', LEXICON)
+    text = 'Πρωτοφανής απειλή για την οικονομία σύμφωνα με τους αναλυτές της αγοράς.'
+    client = app_module.app.test_client()
+    app_with_backend('**ΣΥΝΟΛΙΚΗ ΑΞΙΟΛΟΓΗΣΗ: 70/100**')
+    with patch.object(app_module, 'analysis_listeners', []), \
+            patch.object(app_module, 'loaded_language', LoadedLanguage(str(tmp_path / 'lexicon.json'))), \
+            patch.object(app_module, 'extract_article', return_value=(text, {})):
+        pasted = client.post('/analyze', json={'text': text}).get_json()
+        fetched = client.post('/analyze', json={'url': 'https://news.example.gr/highlights'}).get_json()
+        # Served from the URL index without fetching the article again
+        known = client.post('/analyze', json={'url': 'https://news.example.gr/highlights'}).get_json()
+    assert pasted['highlights'] == [
+        {'start': 0, 'end': 10, 'text': 'Πρωτοφανής', 'category': 'hyperbole', 'term': 'πρωτοφανής'},
+        {'start': 11, 'end': 17, 'text': 'απειλή', 'category': 'fear', 'term': 'απειλή'},
+    ]
+    assert fetched['highlights'] == known['highlights'] == pasted['highlights']
+
+if __name__ == '__main__':
+    pytest.main([__file__])
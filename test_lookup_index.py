@@ -0,0 +1,41 @@
+import pytest
+from lookup_index import LookupIndex, LookupTable
+
+ENTRY = {'key': 'k1', 'text_length': 120, 'highlights': [{'start': 0, 'end': 4, 'text': 'Σοκ!', 'category': 'loaded', 'term': 'σοκ'}]}
+
+def test_workers_share_the_indexes(tmp_path):
+    """An entry stored by one worker is found by another, by URL and by (hash, source)."""
+    path = str(tmp_path / 'lookup.db')
+    first, second = LookupIndex(path), LookupIndex(path)
+    first.urls['https://example.gr/a'] = ENTRY
+    first.contents[('ab' * 32, 'example.gr')] = ENTRY
+    assert second.urls.get('https://example.gr/a') == ENTRY
+    assert second.contents[('ab' * 32, 'example.gr')]['key'] == 'k1'
+    # The two indexes do not see each other's keys
+    assert ('ab' * 32, '') not in second.contents and 'https://example.gr/b' not in second.urls
+    assert len(second.urls) == len(second.contents) == 1
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    """Each index stays within max_entries, dropping the least recently used first."""
+    import lookup_index
+    monkeypatch.setattr(lookup_index, 'TRIM_EVERY', 1)
+    monkeypatch.setattr(lookup_index, 'TOUCH_INTERVAL', 0)
+    for index in (LookupIndex(str(tmp_path / 'lookup.db'), max_entries=2), LookupIndex(max_entries=2)):
+        index.urls['a'] = ENTRY
+        index.urls['b'] = ENTRY
+        assert 'a' in index.urls
+        index.urls['c'] = ENTRY
+        assert 'b' not in index.urls and 'a' in index.urls and len(index.urls) == 2
+
+def test_without_a_path_the_indexes_stay_in_memory(monkeypatch):
+    """Without LOOKUP_DB_PATH or a snapshot path nothing is written to disk."""
+    monkeypatch.delenv('LOOKUP_DB_PATH', raising=False)
+    monkeypatch.delenv('CACHE_SNAPSHOT_PATH', raising=False)
+    assert LookupIndex.from_env().path is None
+    monkeypatch.setenv('CACHE_SNAPSHOT_PATH', '/var/lib/epap/cache.snap')
+    assert LookupIndex.from_env().path == '/var/lib/epap/cache.snap.lookup.db'
+    with pytest.raises(KeyError):
+        LookupTable('url')['missing']
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,98 @@
+import os
+import time
+import pytest
+from flask import Flask
+from profiling import RequestProfiler
+from app import app, install_profiling
+
+def busy_work(duration=0.05):
+    end = time.time() + duration
+    total = 0
+    while time.time() < end:
+        total += sum(range(100))
+    return total
+
+def test_profiler_disabled_without_profile_dir(monkeypatch):
+    """Profiling stays off unless PROFILE_DIR is configured."""
+    monkeypatch.delenv('PROFILE_DIR', raising=False)
+    assert RequestProfiler.from_env() is None
+
+def test_sample_mode_writes_folded_stacks(tmp_path):
+    """Sampling mode writes flamegraph collapsed stacks."""
+    profiler = RequestProfiler(str(tmp_path), mode='sample', interval=0.001)
+    handle = profiler.start()
+    busy_work()
+    name = profiler.stop(handle, '/analyze')
+    assert name.endswith('.folded')
+    content = (tmp_path / name).read_text(encoding='utf-8')
+    assert 'busy_work' in content
+    stack, count = content.splitlines()[0].rsplit(' ', 1)
+    assert ';' in stack and int(count) > 0
+
+def test_cprofile_mode_writes_pstats(tmp_path):
+    """cProfile mode writes a pstats dump."""
+    profiler = RequestProfiler(str(tmp_path), mode='cprofile')
+    handle = profiler.start()
+    busy_work(0.01)
+    name = profiler.stop(handle, '/analyze')
+    assert name.endswith('.prof')
+    assert profiler.profile_path(name) is not None
+
+def test_format_follows_the_handle_and_names_are_unique(tmp_path):
+    """A mode switch mid-request keeps the started format, and one path never shares a file."""
+    profiler = RequestProfiler(str(tmp_path), mode='sample', interval=0.001)
+    first, second = profiler.start(), profiler.start()
+    profiler.mode = 'cprofile'
+    names = {profiler.stop(first, '/analyze'), profiler.stop(second, '/analyze')}
+    assert len(names) == 2 and all(name.endswith('.folded') for name in names)
+
+def test_sample_rate_selects_one_in_n(tmp_path):
+    """A sample rate of N profiles every Nth request."""
+    profiler = RequestProfiler(str(tmp_path), sample_rate=3)
+    picks = [profiler.should_profile() for _ in range(9)]
+    assert picks.count(True) == 3
+    assert RequestProfiler(str(tmp_path)).should_profile() is False
+    assert RequestProfiler(str(tmp_path)).should_profile(forced=True) is True
+
+def test_old_profiles_are_pruned(tmp_path):
+    """Only the most recent profiles are kept."""
+    profiler = RequestProfiler(str(tmp_path), max_profiles=2, interval=0.001)
+    for i in range(4):
+        profiler.stop(profiler.start(), f'/req{i}')
+        time.sleep(0.01)
+    assert len(profiler.list_profiles()) == 2
+
+def test_profile_path_rejects_traversal(tmp_path):
+    """Profile names cannot escape the profile directory."""
+    profiler = RequestProfiler(str(tmp_path))
+    assert profiler.profile_path('../app.py') is None
+    assert profiler.profile_path('missing.folded') is None
+
+def test_header_forces_profile_for_admin(tmp_path, monkeypatch):
+    """X-Profile from an admin captures a profile for that single request."""
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    flask_app = Flask(__name__)
+    profiler = RequestProfiler(str(tmp_path), interval=0.001)
+    install_profiling(flask_app, profiler)
+
+    @flask_app.route('/work')
+    def work():
+        busy_work(0.01)
+        return 'ok'
+
+    client = flask_app.test_client()
+    assert 'X-Profile-Id' not in client.get('/work', headers={'X-Profile': '1'}).headers
+    response = client.get('/work', headers={'X-Profile': '1', 'X-Admin-Token': 'secret'})
+    assert os.path.exists(tmp_path / response.headers['X-Profile-Id'])
+
+def test_admin_profiles_endpoint_requires_token(monkeypatch):
+    """Admin endpoints are hidden without ADMIN_TOKEN and reject wrong tokens."""
+    app.config['TESTING'] = True
+    client = app.test_client()
+    monkeypatch.delenv('ADMIN_TOKEN', raising=False)
+    assert client.get('/admin/profiles').status_code == 404
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    assert client.get('/admin/profiles', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import patch
+from reanalysis import ReanalysisStore
+
+def inputs(n):
+    return {'text': f'Άρθρο {n}', 'source': '', 'url': '', 'metadata': {}}
+
+def test_most_requested_outdated_entries_are_claimed_first(tmp_path):
+    store = ReanalysisStore(str(tmp_path / 'reanalysis.db'), daily_limit=3)
+    for n in range(4):
+        store.record(f'key{n}', 'v1', 'mistral', inputs(n))
+    store.record('current', 'v2', 'mistral', inputs(9))
+    store.record('other-backend', 'v0', 'gone', inputs(8))
+    for key in ['key2'] * 3 + ['key1'] * 2 + ['current'] * 5:
+        store.touch(key)
+    store.flush()
+    claimed = store.claim({'mistral': 'v2'}, limit=2)
+    assert [key for key, _, _ in claimed] == ['key2', 'key1']
+    assert claimed[0][1:] == ('mistral', inputs(2))
+    # Leased entries are skipped until released, and running leases count against the daily limit
+    assert [key for key, _, _ in store.claim({'mistral': 'v2'})] in (['key0'], ['key3'])
+    assert store.claim({'mistral': 'v2'}) == []
+    # Only completed re-analyses (a record that ends a lease) are counted for the day
+    store.release('key2')
+    store.record('key1', 'v2', 'mistral', inputs(1))
+    assert store.stats({'mistral': 'v2'}) == {'entries': 6, 'outdated': 3, 'reanalyzed_today': 1, 'daily_limit': 3}
+    assert [key for key, _, _ in store.claim({'mistral': 'v2'})] == ['key2']
+
+def test_least_requested_entries_are_pruned(tmp_path):
+    store = ReanalysisStore(str(tmp_path / 'reanalysis.db'), max_entries=2)
+    for n in range(3):
+        store.record(f'key{n}', 'v1', 'mistral', inputs(n))
+    store.touch('key0')
+    store.touch('key2')
+    store.flush()
+    assert store.prune() == 1
+    assert {key for key, _, _ in store.claim({'mistral': 'v2'})} == {'key0', 'key2'}
+
+def test_prompt_upgrade_serves_old_analyses_until_reanalyzed(tmp_path, app_with_backend):
+    import app as app_module
+    client = app_module.app.test_client()
+    backend = app_with_backend('Ανάλυση 1', 'Ανάλυση 2')
+    store = ReanalysisStore(str(tmp_path / 'reanalysis.db'))
+    text = 'Κείμενο για τον έλεγχο της επανανάλυσης μετά από αλλαγή του prompt. ' * 2
+    with patch.object(app_module, 'reanalysis_store', store), \
+            patch.object(app_module, 'analysis_listeners', [app_module.remember_for_reanalysis]):
+        key = client.post('/analyze', json={'text': text}).get_json()['key']
+        old_version = app_module.analysis_cache.version_of(key)
+        with patch.object(app_module, 'ANALYSIS_PROMPT', app_module.ANALYSIS_PROMPT + '\nΝέα οδηγία.'):
+            # The old analysis is still served after the upgrade
+            assert client.post('/analyze', json={'text': text}).get_json()['analysis'] == 'Ανάλυση 1'
+            assert client.get(f'/analysis/{key}').get_json()['analysis_version'] == old_version
+            app_module.reanalyze_outdated()
+            data = client.get(f'/analysis/{key}').get_json()
+            assert data['analysis'] == 'Ανάλυση 2' and data['analysis_version'] != old_version
+            store.flush()
+            assert store.stats({'mistral': data['analysis_version']})['outdated'] == 0
+            app_module.reanalyze_outdated()
+        assert backend.calls == 2
+
+def test_overload_releases_the_whole_batch_without_using_the_daily_limit(tmp_path):
+    import app as app_module
+    from admission import Overloaded
+    store = ReanalysisStore(str(tmp_path / 'reanalysis.db'), daily_limit=3)
+    current = {backend.name: app_module.analysis_version(backend) for backend in app_module.llm}
+    for n in range(3):
+        store.record(f'key{n}', 'old', 'mistral', inputs(n))
+    with patch.object(app_module, 'reanalysis_store', store), \
+            patch.object(app_module, 'analyze_greek_news', side_effect=Overloaded(5)) as analyze:
+        app_module.reanalyze_outdated()
+    assert analyze.call_count == 1
+    assert store.stats(current)['reanalyzed_today'] == 0
+    assert len(store.claim(current)) == 3
+
+if __name__ == '__main__':
+    pytest.main([__file__])
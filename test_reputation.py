@@ -0,0 +1,92 @@
+import statistics
+import pytest
+from unittest.mock import patch, MagicMock
+from reputation import ReputationIndex, RunningStats
+from score_extractor import extract_score, extract_section_scores
+
+SAMPLE_ANALYSIS = """**ΣΥΝΟΛΙΚΗ ΑΞΙΟΛΟΓΗΣΗ: 72/100**
+
+**1. ΣΥΝΑΙΣΘΗΜΑΤΙΚΗ ΧΕΙΡΑΓΩΓΗΣΗ:**
+- Ήπια γλώσσα
+- Βαθμολογία ενότητας: 80
+
+**2. ΔΕΙΚΤΕΣ ΠΡΟΚΑΤΑΛΗΨΗΣ:**
+- Κάποια κλίση
+- Βαθμολογία ενότητας: 60/100
+
+**7. ΣΥΣΤΑΣΗ:**
+- Ελέγξτε κι άλλες πηγές
+"""
+
+def test_extract_scores_from_analysis():
+    """Overall and per-section scores are parsed from the markdown."""
+    assert extract_score(SAMPLE_ANALYSIS) == 72
+    assert extract_section_scores(SAMPLE_ANALYSIS) == {
+        'ΣΥΝΑΙΣΘΗΜΑΤΙΚΗ ΧΕΙΡΑΓΩΓΗΣΗ': 80,
+        'ΔΕΙΚΤΕΣ ΠΡΟΚΑΤΑΛΗΨΗΣ': 60,
+    }
+    assert extract_score('Σφάλμα στην ανάλυση') is None
+
+def test_running_stats_match_batch_statistics():
+    """Incremental and merged aggregates equal a full recomputation."""
+    values = [55, 72, 64, 90, 38, 71]
+    left, right, whole = RunningStats(), RunningStats(), RunningStats()
+    for v in values[:2]:
+        left.add(v)
+    for v in values[2:]:
+        right.add(v)
+    for v in values:
+        whole.add(v)
+    left.merge(right)
+    for stats in (left, whole):
+        assert stats.count == len(values)
+        assert stats.mean == pytest.approx(statistics.mean(values))
+        assert stats.variance == pytest.approx(statistics.variance(values))
+
+def test_prompt_context_needs_history():
+    """Outlets get a prompt line only after a few analyses."""
+    index = ReputationIndex()
+    index.record('example.gr', 60, {'ΔΕΙΚΤΕΣ ΠΡΟΚΑΤΑΛΗΨΗΣ': 50})
+    index.record('example.gr', 70)
+    assert index.prompt_context('example.gr') == ''
+    index.record('example.gr', 80)
+    assert 'μέση βαθμολογία 70/100' in index.prompt_context('example.gr')
+    summary = index.get('example.gr')
+    assert summary['overall']['count'] == 3
+    assert summary['sections']['ΔΕΙΚΤΕΣ ΠΡΟΚΑΤΑΛΗΨΗΣ']['count'] == 1
+    assert index.get('unknown.gr') is None
+
+def test_workers_merge_deltas_into_shared_file(tmp_path):
+    """Each worker saves only its delta, so nothing is double counted."""
+    path = str(tmp_path / 'reputation.json')
+    worker_a, worker_b = ReputationIndex(path), ReputationIndex(path)
+    worker_a.record('example.gr', 40)
+    worker_b.record('example.gr', 80)
+    worker_a.save()
+    worker_b.save()
+    worker_a.record('example.gr', 60)
+    worker_a.save()
+    assert ReputationIndex(path).get('example.gr')['overall'] == {'count': 3, 'mean': 60.0, 'stddev': 20.0}
+    assert worker_a.get('example.gr')['overall']['count'] == 3
+
+@patch('app.mistral_client.chat.complete')
+def test_sources_endpoint_reflects_analyses(mock_complete):
+    """A completed URL analysis shows up under GET /sources/<domain>."""
+    from app import app, analyze_greek_news
+    mock_message = MagicMock()
+    mock_message.content = SAMPLE_ANALYSIS
+    mock_choice = MagicMock()
+    mock_choice.message = mock_message
+    mock_response = MagicMock()
+    mock_response.choices = [mock_choice]
+    mock_complete.return_value = mock_response
+
+    analyze_greek_news("Κείμενο για την πηγή reputation-test", "", "https://www.reputation-test.gr/a")
+    client = app.test_client()
+    data = client.get('/sources/www.reputation-test.gr').get_json()
+    assert data['domain'] == 'reputation-test.gr'
+    assert data['overall']['mean'] == 72
+    assert client.get('/sources/never-seen.gr').status_code == 404
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,64 @@
+import gzip
+import importlib.util
+import json
+import os
+import pytest
+import response_encoding
+from response_encoding import choose_encoding, dumps_bytes
+
+ANALYSIS = {'analysis': 'Το άρθρο παρουσιάζει μονόπλευρα την κυβερνητική θέση. ' * 40, 'success': True}
+
+@pytest.fixture
+def client():
+    from app import app
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_json_is_utf8_not_escaped():
+    """Greek text is written as UTF-8, well under the size of the \\u-escaped form."""
+    body = dumps_bytes(ANALYSIS)
+    assert json.loads(body) == ANALYSIS
+    assert len(body) * 2 < len(json.dumps(ANALYSIS).encode())
+
+def test_choose_encoding_respects_quality():
+    """Brotli is preferred when available, and q=0 refuses a coding."""
+    assert choose_encoding('') is None
+    assert choose_encoding('gzip;q=0, identity') is None
+    assert choose_encoding('gzip, deflate') == 'gzip'
+    assert choose_encoding('gzip, br') == ('br' if response_encoding.brotli else 'gzip')
+
+def test_vercel_function_negotiates_gzip_like_the_app(monkeypatch):
+    """The Vercel handler's gzip check agrees with choose_encoding, q-values included."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api', 'index.py')
+    spec = importlib.util.spec_from_file_location('vercel_index', path)
+    vercel = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(vercel)
+    # The Vercel function only offers gzip
+    monkeypatch.setattr(response_encoding, 'brotli', None)
+    for header in ('', 'gzip', 'gzip;q=0', 'gzip; q=0.0, identity', 'deflate, *', '*;q=0', 'GZIP;q=0.5', 'gzip;q=x'):
+        assert vercel.accepts_gzip(header) == (choose_encoding(header) == 'gzip'), header
+    assert not vercel.accepts_gzip('gzip;q=0')
+
+def test_responses_are_compressed_above_threshold(client):
+    """Large responses are gzipped on request; small ones and other clients get plain bytes."""
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert 'ΕΠΑΠ' in gzip.decompress(response.data).decode('utf-8')
+    assert 'Content-Encoding' not in client.get('/').headers
+    health = client.get('/health', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in health.headers
+    assert health.headers['Content-Type'] == 'application/json; charset=utf-8'
+
+def test_msgpack_is_negotiated(client):
+    """Clients preferring MessagePack get it; browsers sending */* keep JSON."""
+    msgpack = pytest.importorskip('msgpack')
+    response = client.get('/health', headers={'Accept': 'application/msgpack, application/json;q=0.9'})
+    assert response.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(response.data)['status'] == 'healthy'
+    assert 'Accept' in response.vary
+    assert client.get('/health', headers={'Accept': '*/*'}).mimetype == 'application/json'
+
+if __name__ == '__main__':
+    pytest.main([__file__])
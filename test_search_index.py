@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import patch
+from greek_text import fold, index_terms, stem
+from search_index import SearchIndex, build_match_query
+
+def doc(key, text, analysis='', url=''):
+    return {'cache_key': key, 'url': url, 'domain': 'example.gr', 'ts': 1.0,
+            'score': 50, 'text': text, 'analysis': analysis}
+
+@pytest.fixture
+def index(tmp_path):
+    return SearchIndex(str(tmp_path / 'search.db'))
+
+def test_fold_removes_accents_case_and_final_sigma():
+    """Accented, uppercase and final-sigma forms fold to the same string."""
+    assert fold('Κυβέρνησης ΚΥΒΕΡΝΗΣΗΣ προϋπολογισμός') == 'κυβερνησησ κυβερνησησ προυπολογισμοσ'
+    assert len(fold('Ἀθῆναι Ϊ')) == len('Ἀθῆναι Ϊ')
+
+def test_stemming_merges_inflected_forms():
+    """Common inflections of a word share one index term."""
+    assert len({stem(fold(w)) for w in ['κυβέρνηση', 'κυβέρνησης', 'ΚΥΒΕΡΝΗΣΕΙΣ']}) == 1
+    assert stem('2024') == '2024'
+    assert index_terms('Οι πολιτικοί') == ['οι', 'πολιτ']
+
+def test_match_query_is_escaped():
+    """User input cannot inject FTS5 syntax."""
+    assert build_match_query('ΥΠΟΥΡΓΟΣ "OR" NEAR(') == '"υπουργ" AND "or" AND "near"'
+    assert build_match_query('κυβερν*') == '"κυβερν"*'
+    assert build_match_query('  ') is None
+
+def test_search_finds_inflected_and_unaccented_queries(index):
+    """Searches match regardless of accents, case and inflection."""
+    index.add_batch([
+        doc('a', 'Η κυβέρνηση ανακοίνωσε νέα μέτρα για την ακρίβεια.'),
+        doc('b', 'Ο Ολυμπιακός κέρδισε τον Παναθηναϊκό στο ντέρμπι.'),
+        doc('c', 'Συζήτηση στη Βουλή.', analysis='Η ανάλυση αναφέρει μέτρα της κυβέρνησης.'),
+    ])
+    keys = [r['key'] for r in index.search('ΚΥΒΕΡΝΗΣΗΣ μετρα')]
+    assert keys == ['a', 'c']
+    assert [r['key'] for r in index.search('παναθηναικος')] == ['b']
+    assert index.search('ανύπαρκτος όρος') == []
+
+def test_documents_are_indexed_once(index):
+    """Re-adding the same analysis does not duplicate it."""
+    index.add_batch([doc('a', 'Πρώτη εκδοχή κειμένου')])
+    index.add_batch([doc('a', 'Πρώτη εκδοχή κειμένου')])
+    assert index.count() == 1
+
+def test_reanalyses_and_updated_articles_replace_the_document(index):
+    """A new analysis under the same key, or a new version of the same URL, replaces the old one."""
+    index.add_batch([doc('a', 'Η βουλή ψήφισε τον προϋπολογισμό', url='https://example.gr/a')])
+    index.add_batch([doc('a', 'Η βουλή ψήφισε τον προϋπολογισμό', url='https://example.gr/a', analysis='Σεισμός')])
+    assert [r['key'] for r in index.search('σεισμος')] == ['a']
+    index.add_batch([doc('b', 'Η βουλή απέρριψε την τροπολογία', url='https://example.gr/a')])
+    assert index.search('προϋπολογισμός') == []
+    assert [r['key'] for r in index.search('τροπολογια')] == ['b'] and index.count() == 1
+
+def test_search_endpoint(index):
+    """GET /search returns ranked results with timing."""
+    import app as app_module
+    index.add_batch([doc('a', 'Η κυβέρνηση ανακοίνωσε νέα μέτρα.', url='https://example.gr/a')])
+    with patch.object(app_module, 'search_index', index):
+        client = app_module.app.test_client()
+        assert client.get('/search').status_code == 400
+        data = client.get('/search?q=κυβερνηση').get_json()
+    assert data['results'][0]['url'] == 'https://example.gr/a'
+    assert 'took_ms' in data
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,13 @@
+"""The service worker is deployed twice: by the Flask app and by the Vercel function."""
+import os
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_vercel_copy_matches_the_app_service_worker():
+    """api/static/sw.js is a copy of static/sw.js; edit both or neither."""
+    with open(os.path.join(ROOT, 'static', 'sw.js'), encoding='utf-8') as f:
+        app_worker = f.read()
+    with open(os.path.join(ROOT, 'api', 'static', 'sw.js'), encoding='utf-8') as f:
+        vercel_worker = f.read()
+    assert vercel_worker == app_worker
@@ -0,0 +1,88 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from stories import ClusterState, StoryClusterer
+
+FIRE = ('Μεγάλη πυρκαγιά στην Αττική: εκκενώνονται οικισμοί στα Μεσόγεια, '
+        'ισχυροί άνεμοι δυσκολεύουν την πυροσβεστική, ενεργοποιήθηκε το 112')
+FIRE_2 = ('Η πυρκαγιά στα Μεσόγεια της Αττικής καίει ανεξέλεγκτη, μηνύματα 112 για εκκένωση, '
+          'η πυροσβεστική ζητά ενισχύσεις λόγω ισχυρών ανέμων')
+FOOTBALL = ('Ο Ολυμπιακός νίκησε τον Παναθηναϊκό στο ντέρμπι του Πειραιά με γκολ στις καθυστερήσεις, '
+            'πανηγυρισμοί στο Καραϊσκάκη')
+
+def test_related_articles_share_a_story():
+    """Coverage of the same event by different outlets lands in one story with per-outlet scores."""
+    clusterer = StoryClusterer()
+    now = time.time()
+    fire = clusterer.add('a' * 32, FIRE, domain='kathimerini.gr', score=80, timestamp=now)
+    assert clusterer.add('b' * 32, FIRE_2, domain='protothema.gr', score=40, timestamp=now) == fire
+    assert clusterer.add('c' * 32, FOOTBALL, domain='sport24.gr', score=60, timestamp=now) != fire
+    (story,) = clusterer.stories(min_outlets=2)
+    assert story['id'] == fire
+    assert story['articles'] == 2
+    assert story['score_spread'] == 40
+    assert {o['domain']: o['mean'] for o in story['outlets']} == {'kathimerini.gr': 80, 'protothema.gr': 40}
+
+def test_stories_expire_and_stay_bounded():
+    """Old stories expire and the number of live stories is capped."""
+    clusterer = StoryClusterer(ttl_hours=1, max_stories=2, members_per_story=1)
+    now = time.time()
+    clusterer.add('a' * 32, FIRE, domain='a.gr', timestamp=now - 7200)
+    clusterer.add('b' * 32, FIRE_2, domain='b.gr', timestamp=now - 7200)
+    assert clusterer.stories() == []
+    for i, text in enumerate([FIRE, FOOTBALL, 'Η Βουλή ψήφισε τον νέο προϋπολογισμό του κράτους']):
+        clusterer.add(f'{i:032x}', text, domain='a.gr', timestamp=now + i)
+    assert len(clusterer.stories()) == 2
+    assert all(len(story['latest']) == 1 for story in clusterer.stories())
+
+def test_workers_merge_through_shared_file(tmp_path):
+    """Two workers saving to one file end up with the same clusters."""
+    path = str(tmp_path / 'stories.npz')
+    first, second = StoryClusterer(path), StoryClusterer(path)
+    now = time.time()
+    fire = first.add('a' * 32, FIRE, domain='kathimerini.gr', score=80, timestamp=now)
+    second.add('c' * 32, FOOTBALL, domain='sport24.gr', score=60, timestamp=now)
+    assert first.save() and second.save()
+    second.add('b' * 32, FIRE_2, domain='protothema.gr', score=40, timestamp=now)
+    assert second.save()
+    assert StoryClusterer(path).get(fire)['articles'] == 2
+    assert len(StoryClusterer(path).stories()) == 2
+
+def test_state_loads_once_across_threads(tmp_path):
+    """Threads reading the state at once share the one loaded from the file."""
+    path = str(tmp_path / 'stories.npz')
+    writer = StoryClusterer(path)
+    writer.add('a' * 32, FIRE, domain='a.gr')
+    writer.save()
+    clusterer = StoryClusterer(path)
+    load, loads = ClusterState.load, []
+
+    def slow_load(*args):
+        loads.append(1)
+        time.sleep(0.1)
+        return load(*args)
+
+    states = []
+    threads = [threading.Thread(target=lambda: states.append(clusterer.state)) for _ in range(8)]
+    with patch.object(ClusterState, 'load', slow_load):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert loads == [1] and len({id(state) for state in states}) == 1 and len(clusterer.stories()) == 1
+
+def test_stories_endpoint():
+    """GET /stories validates parameters and returns clusters."""
+    import app as app_module
+    clusterer = StoryClusterer()
+    clusterer.add('a' * 32, FIRE, domain='kathimerini.gr', score=80)
+    with patch.object(app_module, 'story_clusterer', clusterer):
+        client = app_module.app.test_client()
+        assert client.get('/stories?limit=x').status_code == 400
+        assert client.get('/stories/unknown').status_code == 404
+        data = client.get('/stories').get_json()
+    assert data['stories'][0]['outlets'][0]['domain'] == 'kathimerini.gr'
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from sync_store import SyncStore, valid_token
+
+TOKEN = 'device-token-0123456789'
+
+def entry(i):
+    return {'key': f'key{i:03d}', 'analysis': f'Ανάλυση {i}', 'text_length': 100 + i, 'source': 'example.gr'}
+
+def test_changes_are_paginated_by_cursor(tmp_path):
+    """Pages follow the cursor and a drained history returns the same cursor with no items."""
+    store = SyncStore(str(tmp_path / 'sync.db'))
+    assert store.record(TOKEN, [entry(i) for i in range(5)]) == 5
+    assert store.record(TOKEN, [entry(0)]) == 0
+    items, cursor, more = store.changes(TOKEN, 0, limit=3)
+    assert [item['key'] for item in items] == ['key000', 'key001', 'key002'] and more
+    items, cursor, more = store.changes(TOKEN, cursor, limit=3)
+    assert [item['key'] for item in items] == ['key003', 'key004'] and not more
+    assert store.changes(TOKEN, cursor) == ([], cursor, False)
+    assert store.changes('other-device-token-000', 0)[0] == []
+
+def test_reanalysis_is_resent_to_every_history(tmp_path):
+    """Updating an analysis moves it past every holder's cursor."""
+    store = SyncStore(str(tmp_path / 'sync.db'))
+    other = 'second-device-token-42'
+    store.record(TOKEN, [entry(1), entry(2)])
+    store.record(other, [entry(1)])
+    cursor = store.changes(TOKEN)[1]
+    other_cursor = store.changes(other)[1]
+    assert store.update_analysis('key001', 'Νέα ανάλυση') == 2
+    assert store.update_analysis('unknown', 'x') == 0
+    assert [item['analysis'] for item in store.changes(TOKEN, cursor)[0]] == ['Νέα ανάλυση']
+    assert [item['key'] for item in store.changes(other, other_cursor)[0]] == ['key001']
+
+def test_token_validation():
+    assert valid_token(TOKEN)
+    assert not valid_token('short') and not valid_token('x' * 200) and not valid_token('')
+
+def test_sync_endpoint(tmp_path):
+    """Analyses made with a sync token can be restored from another client with the same token."""
+    import app as app_module
+    client = app_module.app.test_client()
+    headers = {'X-Sync-Token': TOKEN}
+    with patch.object(app_module, 'sync_store', SyncStore(str(tmp_path / 'sync.db'))), \
+            patch('app.mistral_client.chat.complete') as mock_complete:
+        mock_complete.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content='Ανάλυση συγχρονισμού'))])
+        key = client.post('/analyze', headers=headers,
+                          json={'text': 'Κείμενο για τον έλεγχο του συγχρονισμού ιστορικού αναλύσεων. ' * 2}
+                          ).get_json()['key']
+        assert client.get('/sync').status_code == 400
+        page = client.get('/sync?limit=10', headers=headers).get_json()
+        assert [item['key'] for item in page['items']] == [key] and not page['more']
+        assert client.get(f"/sync?cursor={page['cursor']}", headers=headers).get_json()['items'] == []
+        pushed = client.post('/sync', headers={'X-Sync-Token': 'another-device-token-1'},
+                             json={'keys': [key, 'missing']}).get_json()
+        assert pushed == {'added': 1, 'missing': ['missing']}
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,72 @@
+import pytest
+from unittest.mock import patch
+from usage_meter import MAX_TENANTS, OTHER_TENANTS, SpendCapReached, UsageMeter, parse_prices
+
+DAY = 20000 * 86400
+
+def test_calls_are_priced_and_counted_per_dimension():
+    meter = UsageMeter({'big': (2.0, 6.0)})
+    usage = meter.record('big', 'analyze', '10.0.0.1', {'prompt_tokens': 1000, 'completion_tokens': 500}, now=DAY)
+    assert usage == {'prompt_tokens': 1000, 'completion_tokens': 500, 'total_tokens': 1500, 'cost': 0.005}
+    meter.record('free', 'prefetch', 'feed.gr', {'prompt_tokens': 800}, now=DAY + 60)
+    summary = meter.summary(now=DAY + 60)
+    assert summary['model']['big']['cost'] == 0.005 and summary['model']['free']['cost'] == 0
+    assert summary['route']['prefetch']['prompt_tokens'] == 800
+    assert summary['tenant']['10.0.0.1']['calls'] == 1
+    assert summary['spent_today'] == 0.005 and not summary['cache_only']
+    # Counters roll over by UTC day
+    assert meter.summary(now=DAY + 86400)['model'] == {}
+    assert meter.summary(days=2, now=DAY + 86400)['model']['big']['calls'] == 1
+    assert parse_prices('big=2:6, flat=1') == {'big': (2.0, 6.0), 'flat': (1.0, 1.0)}
+
+def test_tenants_beyond_the_limit_are_pooled():
+    meter = UsageMeter({})
+    for i in range(MAX_TENANTS + 5):
+        meter.record('m', 'analyze', f'10.0.{i}', {}, now=DAY)
+    assert meter.counters[(20000, 'tenant', OTHER_TENANTS)][0] == 5
+
+def test_spend_cap_switches_to_cache_only_until_the_next_day():
+    meter = UsageMeter({'big': (10.0, 10.0)}, daily_cap=0.01)
+    meter.check(now=DAY)
+    meter.record('big', 'analyze', '', {'prompt_tokens': 1000}, now=DAY)
+    with pytest.raises(SpendCapReached) as error:
+        meter.check(now=DAY + 86400 - 30)
+    assert error.value.retry_after == 30
+    meter.check(now=DAY + 86400)
+
+def test_workers_share_spend_through_the_store(tmp_path):
+    path = str(tmp_path / 'usage.db')
+    first = UsageMeter({'big': (10.0, 10.0)}, daily_cap=0.015, path=path)
+    second = UsageMeter({'big': (10.0, 10.0)}, daily_cap=0.015, path=path)
+    first.record('big', 'analyze', 'a', {'prompt_tokens': 1000})
+    second.record('big', 'analyze', 'b', {'prompt_tokens': 1000})
+    assert not second.cache_only()
+    first.flush()
+    second.flush()
+    assert second.spent_today() == pytest.approx(0.02) and second.cache_only()
+    summary = first.summary()
+    assert summary['model']['big']['calls'] == 2 and set(summary['tenant']) == {'a', 'b'}
+
+def test_analyze_reports_usage_and_serves_only_cached_analyses_past_the_cap(app_with_backend, scripted_backend):
+    import app as app_module
+    client = app_module.app.test_client()
+    meter = UsageMeter(daily_cap=0.005)
+    text = 'Κείμενο για τον έλεγχο του ημερήσιου ορίου δαπάνης των αναλύσεων. ' * 2
+    app_with_backend(backends=[scripted_backend(
+        '**ΣΥΝΟΛΙΚΗ ΑΞΙΟΛΟΓΗΣΗ: 60/100**',
+        usage={'prompt_tokens': 1500, 'completion_tokens': 500, 'total_tokens': 2000})])
+    with patch.object(app_module, 'usage_meter', meter):
+        data = client.post('/analyze', json={'text': text, 'include_usage': True}).get_json()
+        assert data['usage'] == {'prompt_tokens': 1500, 'completion_tokens': 500, 'total_tokens': 2000,
+                                 'cost': 0.006}
+        assert 'usage' not in client.post('/analyze', json={'text': text}).get_json()
+        # Over the cap: the cached analysis is still served, new ones are refused
+        assert client.post('/analyze', json={'text': text, 'include_usage': True}).get_json()['usage'] is None
+        response = client.post('/analyze', json={'text': text + ' Νέο άρθρο.'})
+        assert response.status_code == 503 and 'Retry-After' in response.headers
+        assert meter.summary()['route']['analyze']['calls'] == 1
+    with patch.object(app_module, 'usage_meter', meter):
+        assert client.get('/status').get_json()['cache_only']
+
+if __name__ == '__main__':
+    pytest.main([__file__])
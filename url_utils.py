@@ -0,0 +1,43 @@
+"""URL helpers used to recognise the same article behind different links"""
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track the visitor and never change the article
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'amp', 'output',
+}
+
+
+def canonicalize_url(url):
+    """Normalise an article URL so tracking variants map to one key"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'https'
+    netloc = parts.netloc.lower()
+    if netloc.endswith(':80') and scheme == 'http':
+        netloc = netloc[:-3]
+    elif netloc.endswith(':443') and scheme == 'https':
+        netloc = netloc[:-4]
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ''))
+
+
+def domain_of(url):
+    """Return the bare host of a URL (lowercase, without www.)"""
+    host = (urlsplit(url.strip()).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def topic_of(url):
+    """Best-effort section of an article: the first word-like directory in its path"""
+    # The last segment is normally the article slug or id, never the section
+    for segment in urlsplit(url.strip()).path.strip('/').split('/')[:-1]:
+        segment = segment.lower()
+        if segment and not segment.isdigit() and '.' not in segment and len(segment) <= 40:
+            return segment
+    return ''
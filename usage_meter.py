@@ -0,0 +1,231 @@
+"""Token usage and cost accounting for LLM calls, with a daily spend cap.
+
+Every completed LLM call is priced from its prompt and completion tokens
+(``LLM_PRICES``, USD per million tokens per model) and added to in-memory
+counters per UTC day for each model, route (the endpoint, or the lane for
+background work) and tenant. Recording is a dict update under a lock, so
+the request path never touches disk.
+
+With ``USAGE_DB_PATH`` set, each worker periodically flushes the counts it
+accumulated since its last flush into a shared SQLite table, and reads back
+the day's total spend of all workers. Without it the counters are per
+worker and reset on restart.
+
+Once the day's spend reaches ``LLM_DAILY_SPEND_CAP``, ``check`` raises
+``SpendCapReached`` until the next UTC day, and the service answers only
+from the cache. The spend of workers that have not flushed yet is seen
+after their next flush, so the cap can be overshot by about one flush
+interval of traffic.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from admission import Overloaded, parse_mapping
+from background import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+# USD per million (prompt, completion) tokens; models not listed cost nothing
+DEFAULT_PRICES = {
+    'mistral-large-latest': (2.0, 6.0),
+    'mistral-medium-latest': (0.4, 2.0),
+    'mistral-small-latest': (0.1, 0.3),
+}
+DIMENSIONS = ('model', 'route', 'tenant')
+# Days of counters kept in memory
+ROLLING_DAYS = 7
+# Distinct tenants counted per day; the rest are pooled
+MAX_TENANTS = 1000
+OTHER_TENANTS = '(other)'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_daily (
+    day INTEGER NOT NULL,
+    dimension TEXT NOT NULL,
+    name TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    PRIMARY KEY (day, dimension, name)
+) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO usage_daily VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, dimension, name) DO UPDATE SET
+    calls = calls + excluded.calls,
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens,
+    cost = cost + excluded.cost
+"""
+
+
+class SpendCapReached(Overloaded):
+    """The daily spend cap is used up; only cached analyses are served until the next UTC day"""
+
+    def __init__(self, retry_after):
+        Exception.__init__(self, f"Daily LLM spend cap reached, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def parse_prices(spec):
+    """``'mistral-large-latest=2:6,local=0:0'`` -> ``{'mistral-large-latest': (2.0, 6.0), ...}``"""
+    def pair(value):
+        prompt, _, completion = value.partition(':')
+        return float(prompt), float(completion or prompt)
+    return parse_mapping(spec, pair)
+
+
+def today(now=None):
+    """The UTC day number of ``now``"""
+    return int((time.time() if now is None else now) // 86400)
+
+
+class UsageMeter:
+    """Rolling per-day token and cost counters with an optional shared SQLite store"""
+
+    def __init__(self, prices=None, daily_cap=None, path=None):
+        self.prices = dict(DEFAULT_PRICES if prices is None else prices)
+        self.daily_cap = daily_cap
+        self.path = path
+        # (day, dimension, name) -> [calls, prompt_tokens, completion_tokens, cost]
+        self.counters = {}
+        # Counts and spend per day not yet flushed to the store
+        self._pending = {}
+        self._unflushed = {}
+        # day -> USD spent by this worker
+        self._spent = {}
+        # Spend of the day in the shared store at the last flush, including ours
+        self._shared = (None, 0.0)
+        self._day = None
+        self._tenants = set()
+        self._lock = threading.Lock()
+        self._connections = SQLiteConnections(path, SCHEMA, pragmas=('journal_mode=WAL',))
+
+    @classmethod
+    def from_env(cls):
+        prices = dict(DEFAULT_PRICES, **parse_prices(os.getenv('LLM_PRICES', '')))
+        cap = float(os.getenv('LLM_DAILY_SPEND_CAP', '0'))
+        return cls(prices, cap or None, os.getenv('USAGE_DB_PATH') or None)
+
+    def cost(self, model, usage):
+        """USD cost of one call's token usage"""
+        prompt_price, completion_price = self.prices.get(model, (0.0, 0.0))
+        return (usage.get('prompt_tokens', 0) * prompt_price
+                + usage.get('completion_tokens', 0) * completion_price) / 1e6
+
+    def record(self, model, route, tenant, usage, now=None):
+        """Count one call and return its token counts and cost"""
+        usage = usage or {}
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        cost = self.cost(model, usage)
+        day = today(now)
+        with self._lock:
+            if day != self._day:
+                # A new day: drop the days that fell out of the window
+                self._day, self._tenants = day, set()
+                for key in [key for key in self.counters if key[0] <= day - ROLLING_DAYS]:
+                    del self.counters[key]
+                self._spent = {d: spent for d, spent in self._spent.items() if d > day - ROLLING_DAYS}
+            if tenant not in self._tenants:
+                if len(self._tenants) >= MAX_TENANTS:
+                    tenant = OTHER_TENANTS
+                self._tenants.add(tenant)
+            self._spent[day] = self._spent.get(day, 0.0) + cost
+            if self.path:
+                self._unflushed[day] = self._unflushed.get(day, 0.0) + cost
+            for dimension, name in zip(DIMENSIONS, (model, route, tenant)):
+                for counters in ((self.counters, self._pending) if self.path else (self.counters,)):
+                    counts = counters.setdefault((day, dimension, name), [0, 0, 0, 0.0])
+                    counts[0] += 1
+                    counts[1] += prompt_tokens
+                    counts[2] += completion_tokens
+                    counts[3] += cost
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': usage.get('total_tokens', prompt_tokens + completion_tokens),
+            'cost': round(cost, 6),
+        }
+
+    def spent_today(self, now=None):
+        """USD spent today: the shared total at the last flush plus what this worker has not flushed"""
+        day = today(now)
+        with self._lock:
+            if self.path:
+                shared = self._shared[1] if self._shared[0] == day else 0.0
+                return shared + self._unflushed.get(day, 0.0)
+            return self._spent.get(day, 0.0)
+
+    def cache_only(self, now=None):
+        return self.daily_cap is not None and self.spent_today(now) >= self.daily_cap
+
+    def check(self, now=None):
+        """Raise SpendCapReached once today's spend has reached the cap"""
+        if self.cache_only(now):
+            now = time.time() if now is None else now
+            raise SpendCapReached(max(1, int((today(now) + 1) * 86400 - now)))
+
+    def flush(self):
+        """Add this worker's counts since the last flush to the shared store and read back today's spend"""
+        if not self.path:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            unflushed, self._unflushed = self._unflushed, {}
+        day = today()
+        try:
+            conn = self._connections.get()
+            with conn:
+                conn.executemany(UPSERT, [key + tuple(counts) for key, counts in pending.items()])
+            spent = conn.execute("SELECT COALESCE(SUM(cost), 0) FROM usage_daily WHERE day = ? AND dimension = 'model'",
+                                 (day,)).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Could not flush LLM usage: {str(e)}")
+            # Keep the counts for the next attempt
+            with self._lock:
+                for key, counts in pending.items():
+                    merged = self._pending.setdefault(key, [0, 0, 0, 0.0])
+                    for i, value in enumerate(counts):
+                        merged[i] += value
+                for d, spent in unflushed.items():
+                    self._unflushed[d] = self._unflushed.get(d, 0.0) + spent
+            return
+        with self._lock:
+            self._shared = (day, spent)
+
+    def summary(self, days=1, now=None):
+        """Totals per model, route and tenant over the last ``days`` days (this worker's, or all with a store)"""
+        day = today(now)
+        days = max(1, min(days, ROLLING_DAYS))
+        if self.path:
+            self.flush()
+            rows = self._connections.get().execute(
+                """SELECT dimension, name, SUM(calls), SUM(prompt_tokens), SUM(completion_tokens), SUM(cost)
+                   FROM usage_daily WHERE day > ? GROUP BY dimension, name""", (day - days,)).fetchall()
+        else:
+            totals = {}
+            with self._lock:
+                for (d, dimension, name), counts in self.counters.items():
+                    if d > day - days:
+                        merged = totals.setdefault((dimension, name), [0, 0, 0, 0.0])
+                        for i, value in enumerate(counts):
+                            merged[i] += value
+            rows = [key + tuple(counts) for key, counts in totals.items()]
+        result = {dimension: {} for dimension in DIMENSIONS}
+        for dimension, name, calls, prompt_tokens, completion_tokens, cost in rows:
+            result[dimension][name] = {
+                'calls': calls,
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'cost': round(cost, 4),
+            }
+        # The heaviest tenants only
+        result['tenant'] = dict(sorted(result['tenant'].items(), key=lambda item: -item[1]['cost'])[:20])
+        return dict(result, days=days, spent_today=round(self.spent_today(now), 4), daily_cap=self.daily_cap,
+                    cache_only=self.cache_only(now))